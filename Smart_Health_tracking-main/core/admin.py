@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, PatientTask, HealthLog, PatientVisit
-from .models import Location, Hospital, SOSAlert, ExerciseVideo
+from .models import User, PatientTask, HealthLog, PatientVisit, Visit
+from .models import Location, Hospital, SOSAlert, ExerciseVideo, TaskAlert, BackgroundJob, CareAssignment
+from .models import VideoProgress
 
 # 🔹 Register the custom User model
 @admin.register(User)
@@ -32,6 +33,47 @@ class SOSAlertAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'acknowledged_at', 'resolved_at')
     ordering = ('-created_at',)
 
+# 🔹 Register Visit Model (doctor records and patient-submitted visits)
+@admin.register(Visit)
+class VisitAdmin(admin.ModelAdmin):
+    list_display = ('patient', 'visit_date', 'source', 'doctor_name', 'hospital_name', 'current_status')
+    list_filter = ('source', 'current_status')
+    search_fields = ('patient__username', 'patient__unique_id', 'doctor_name', 'hospital_name')
+    raw_id_fields = ('patient', 'doctor')
+    ordering = ('-visit_date',)
+
+# 🔹 Register Care Assignment Model (clinician caseloads)
+@admin.register(CareAssignment)
+class CareAssignmentAdmin(admin.ModelAdmin):
+    list_display = ('clinician', 'patient', 'role', 'source', 'created_at')
+    list_filter = ('role', 'source')
+    search_fields = ('clinician__username', 'patient__username', 'patient__unique_id')
+    raw_id_fields = ('clinician', 'patient')
+    exclude = ('role',)
+    ordering = ('-created_at',)
+
+    def save_model(self, request, obj, form, change):
+        obj.role = obj.clinician.role
+        super().save_model(request, obj, form, change)
+
+# 🔹 Register Task Alert Model
+@admin.register(TaskAlert)
+class TaskAlertAdmin(admin.ModelAdmin):
+    list_display = ('patient', 'kind', 'task', 'detail', 'created_at', 'resolved_at')
+    list_filter = ('kind', 'resolved_at')
+    search_fields = ('patient__username', 'patient__unique_id', 'task__task_name')
+    raw_id_fields = ('patient', 'task')
+    ordering = ('-created_at',)
+
+# 🔹 Register Background Job Model
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'priority', 'attempts', 'run_after', 'locked_by', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'idempotency_key', 'last_error')
+    readonly_fields = ('created_at', 'locked_at', 'finished_at')
+    ordering = ('-created_at',)
+
 # 🔹 Register Exercise Video Model
 @admin.register(ExerciseVideo)
 class ExerciseVideoAdmin(admin.ModelAdmin):
@@ -53,4 +95,12 @@ class ExerciseVideoAdmin(admin.ModelAdmin):
         ('Statistics', {
             'fields': ('views_count', 'created_at', 'updated_at')
         }),
-    )
\ No newline at end of file
+    )
+# 🔹 Register Video Progress Model (written in batches by core.watch)
+@admin.register(VideoProgress)
+class VideoProgressAdmin(admin.ModelAdmin):
+    list_display = ('patient', 'video', 'position_seconds', 'watched_seconds', 'completed_at', 'last_watched_at')
+    list_filter = ('completed_at',)
+    search_fields = ('patient__username', 'patient__unique_id', 'video__title')
+    raw_id_fields = ('patient', 'video')
+    ordering = ('-last_watched_at',)
@@ -0,0 +1,130 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+
+# Per-process state: each worker process admits against its own share of the server's threads
+
+
+class Ticket:
+    """A held concurrency slot; release() is safe to call more than once"""
+
+    def __init__(self, lanes, view, priority):
+        self.lanes = lanes
+        self.view = view
+        self.priority = priority
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.lanes.release(self)
+
+
+# 🔹 Concurrency lanes
+class Lanes:
+    """In-flight request accounting with a reserved lane for critical views
+
+    Normal and low-priority requests share ``capacity - reserved`` slots, and low priority
+    may hold at most ``low_share`` of them, so it is shed first. Critical requests are
+    always admitted: the reserved slots are what keeps a worker free for them.
+    """
+
+    def __init__(self, capacity, reserved, low_share, endpoint_limits):
+        self.shared = max(1, capacity - reserved)
+        self.low_limit = max(1, int(self.shared * low_share))
+        self.endpoint_limits = endpoint_limits
+        self.lock = threading.Lock()
+        self.in_flight = {'critical': 0, 'normal': 0, 'low': 0}
+        self.per_view = {}
+
+    def try_acquire(self, view, priority):
+        with self.lock:
+            if priority != 'critical':
+                shared = self.in_flight['normal'] + self.in_flight['low']
+                if shared >= self.shared:
+                    return None
+                if priority == 'low' and self.in_flight['low'] >= self.low_limit:
+                    return None
+                if self.per_view.get(view, 0) >= self.endpoint_limits.get(view, math.inf):
+                    return None
+            self.in_flight[priority] += 1
+            self.per_view[view] = self.per_view.get(view, 0) + 1
+        return Ticket(self, view, priority)
+
+    def release(self, ticket):
+        with self.lock:
+            self.in_flight[ticket.priority] -= 1
+            self.per_view[ticket.view] -= 1
+
+
+# 🔹 Per-client rate limits
+class TokenBuckets:
+    """One token bucket per client: ``rate`` requests per second, bursts up to ``burst``"""
+    MAX_CLIENTS = 10000
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def take(self, key):
+        """Spend a token; returns 0 if allowed, else seconds until one is available"""
+        now = time.monotonic()
+        with self.lock:
+            tokens, stamp = self.buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - stamp) * self.rate)
+            if tokens < 1:
+                self.buckets[key] = (tokens, now)
+                return (1 - tokens) / self.rate
+            self.buckets[key] = (tokens - 1, now)
+            if len(self.buckets) > self.MAX_CLIENTS:
+                self._forget_idle(now)
+        return 0
+
+    def _forget_idle(self, now):
+        # A bucket that has refilled completely is the same as no bucket
+        self.buckets = {
+            key: (tokens, stamp) for key, (tokens, stamp) in self.buckets.items()
+            if tokens + (now - stamp) * self.rate < self.burst
+        }
+
+
+# 🔹 Process-wide controller, rebuilt when ADMISSION_* settings change (override_settings)
+_lock = threading.Lock()
+_state = {}
+
+
+def priority_of(view):
+    if view in settings.ADMISSION_CRITICAL_VIEWS:
+        return 'critical'
+    if view in settings.ADMISSION_LOW_PRIORITY_VIEWS:
+        return 'low'
+    return 'normal'
+
+
+def lanes():
+    with _lock:
+        if 'lanes' not in _state:
+            _state['lanes'] = Lanes(settings.ADMISSION_CAPACITY, settings.ADMISSION_RESERVED,
+                                    settings.ADMISSION_LOW_PRIORITY_SHARE, settings.ADMISSION_ENDPOINT_LIMITS)
+        return _state['lanes']
+
+
+def buckets():
+    with _lock:
+        if 'buckets' not in _state:
+            _state['buckets'] = TokenBuckets(settings.ADMISSION_RATE, settings.ADMISSION_BURST)
+        return _state['buckets']
+
+
+def reset(setting=None, **kwargs):
+    if setting is None or setting.startswith('ADMISSION_'):
+        with _lock:
+            _state.clear()
+
+
+setting_changed.connect(reset, dispatch_uid='core.admission.reset')
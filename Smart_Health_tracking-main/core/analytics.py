@@ -0,0 +1,193 @@
+import time
+
+from django.utils import timezone
+
+from core.archive import history
+from core.models import CohortReport, VisitRecord, ImprovementScore, PatientTask, MoodLog
+from core.series import MOOD_SCORES
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:  # numpy/pandas are optional; the dashboard says so when they are missing
+    np = None
+    pd = None
+
+# Rows fetched per round trip while filling the frames
+CHUNK_SIZE = 5000
+# Trajectories are reported for this many months after a patient's first visit
+TRAJECTORY_MONTHS = 24
+# Largest groups shown per breakdown
+TOP_GROUPS = 15
+TASK_LABELS = dict(PatientTask.TASK_TYPE_CHOICES)
+
+# 🔹 Source tables: name → (model, columns)
+SOURCES = {
+    'visits': (VisitRecord, ['patient_id', 'doctor_id', 'doctor_name', 'hospital_name',
+                             'visit_date', 'current_status', 'improvement_score']),
+    'scores': (ImprovementScore, ['patient_id', 'recorded_at', 'score']),
+    'tasks': (PatientTask, ['patient_id', 'task_type', 'status', 'started_at', 'duration_minutes']),
+    'moods': (MoodLog, ['patient_id', 'logged_at', 'mood']),
+}
+
+
+def available():
+    return pd is not None
+
+
+def fetch_frames():
+    """One columnar read per table: tuples straight into DataFrames, no model instances"""
+    frames = {}
+    for name, (model, columns) in SOURCES.items():
+        # Whole cohort history, archived rows included
+        rows = history(model, columns).iterator(chunk_size=CHUNK_SIZE)
+        frames[name] = pd.DataFrame.from_records(rows, columns=columns)
+    visits, tasks = frames['visits'], frames['tasks']
+    visits['visit_date'] = pd.to_datetime(visits['visit_date'])
+    for column in ('current_status', 'hospital_name', 'doctor_name'):
+        visits[column] = visits[column].astype('category')
+    tasks['task_type'] = tasks['task_type'].astype('category')
+    tasks['status'] = tasks['status'].astype('category')
+    tasks['started_at'] = pd.to_datetime(tasks['started_at'], utc=True)
+    frames['scores']['recorded_at'] = pd.to_datetime(frames['scores']['recorded_at'], utc=True)
+    frames['moods']['logged_at'] = pd.to_datetime(frames['moods']['logged_at'], utc=True)
+    return frames
+
+
+def _records(frame):
+    """DataFrame → list of plain dicts (picklable, template-friendly, NaN as None)"""
+    frame = frame.round(1).astype(object)
+    return frame.where(frame.notna(), None).to_dict('records')
+
+
+def _month(timestamps):
+    # Truncate to calendar month with a dtype cast; per-row strftime is ~50x slower
+    return timestamps.dt.tz_convert(None).to_numpy().astype('datetime64[M]')
+
+
+# 🔹 Statistics
+def adherence(tasks):
+    """Completion rate and duration spread per task type, plus completed tasks per patient-week"""
+    completed = tasks['status'].eq('completed')
+    by_type = tasks.assign(completed=completed, duration=tasks['duration_minutes'].where(completed)).groupby(
+        'task_type', observed=True
+    ).agg(
+        tasks=('completed', 'size'),
+        completed=('completed', 'sum'),
+        patients=('patient_id', 'nunique'),
+        median_minutes=('duration', 'median'),
+        p90_minutes=('duration', lambda s: s.quantile(0.9)),
+    )
+    by_type['adherence_pct'] = by_type['completed'] / by_type['tasks'] * 100
+    by_type = by_type.sort_values('tasks', ascending=False).reset_index()
+    by_type['task_type'] = by_type['task_type'].map(TASK_LABELS)
+
+    done = tasks.loc[completed & tasks['started_at'].notna(), ['patient_id', 'started_at']]
+    span = done.groupby('patient_id')['started_at'].agg(['min', 'max', 'size'])
+    weeks = np.maximum((span['max'] - span['min']).dt.days.to_numpy() / 7, 1)
+    per_week = span['size'].to_numpy() / weeks
+    return {
+        'by_type': _records(by_type),
+        'overall_pct': round(float(completed.mean() * 100), 1) if len(tasks) else None,
+        'per_patient_week': {
+            'median': round(float(np.median(per_week)), 2) if len(per_week) else None,
+            'p25': round(float(np.percentile(per_week, 25)), 2) if len(per_week) else None,
+            'p75': round(float(np.percentile(per_week, 75)), 2) if len(per_week) else None,
+            'three_plus_pct': round(float((per_week >= 3).mean() * 100), 1) if len(per_week) else None,
+        },
+    }
+
+
+def trajectories(visits, scores, moods):
+    """Improvement score by month since each patient's first visit, plus monthly self-reports"""
+    first = visits.groupby('patient_id')['visit_date'].transform('min')
+    month = ((visits['visit_date'] - first).dt.days // 30).rename('month')
+    in_range = month <= TRAJECTORY_MONTHS
+    by_month = visits.loc[in_range, 'improvement_score'].groupby(month[in_range]).agg(
+        patients='size',
+        mean='mean',
+        p25=lambda s: s.quantile(0.25),
+        p75=lambda s: s.quantile(0.75),
+    ).reset_index()
+
+    calendar = scores['score'].groupby(_month(scores['recorded_at'])).mean().rename('score')
+    mood = moods['mood'].map(MOOD_SCORES).groupby(_month(moods['logged_at'])).mean().rename('mood')
+    monthly = pd.concat([calendar, mood], axis=1).sort_index().tail(12)
+    # Format only the dozen labels kept, not every row
+    monthly.index = pd.DatetimeIndex(monthly.index).strftime('%Y-%m').rename('month')
+    return {
+        'by_month': _records(by_month),
+        'monthly': _records(monthly.reset_index()),
+    }
+
+
+def recovery(visits, tasks):
+    """Days from first visit to first 'recovered' visit, by hospital, doctor and main task type"""
+    ordered = visits.sort_values('visit_date')
+    patients = ordered.groupby('patient_id', observed=True).agg(
+        first_visit=('visit_date', 'first'),
+        hospital=('hospital_name', 'first'),
+        doctor_id=('doctor_id', 'first'),
+        doctor=('doctor_name', 'first'),
+    )
+    recovered_on = ordered.loc[ordered['current_status'].eq('recovered')].groupby('patient_id')['visit_date'].min()
+    patients['days'] = (recovered_on.reindex(patients.index) - patients['first_visit']).dt.days
+
+    # Each patient's most-completed task type
+    done = tasks.loc[tasks['status'].eq('completed'), ['patient_id', 'task_type']]
+    counts = done.groupby(['patient_id', 'task_type'], observed=True).size().reset_index(name='n')
+    main_type = counts.sort_values('n').drop_duplicates('patient_id', keep='last').set_index('patient_id')['task_type']
+    patients['task_type'] = main_type.reindex(patients.index).map(TASK_LABELS)
+
+    def breakdown(column):
+        grouped = patients.groupby(column, observed=True).agg(
+            patients=('days', 'size'),
+            recovered=('days', 'count'),
+            median_days=('days', 'median'),
+            mean_days=('days', 'mean'),
+        )
+        grouped['recovered_pct'] = grouped['recovered'] / grouped['patients'] * 100
+        return _records(grouped.sort_values('patients', ascending=False).head(TOP_GROUPS).reset_index().rename(columns={column: 'group'}))
+
+    return {
+        'patients': int(len(patients)),
+        'recovered': int(patients['days'].notna().sum()),
+        'median_days': float(patients['days'].median()) if patients['days'].notna().any() else None,
+        'by_hospital': breakdown('hospital'),
+        'by_doctor': breakdown('doctor'),
+        'by_task_type': breakdown('task_type'),
+    }
+
+
+def compute_cohort_analytics():
+    started = time.perf_counter()
+    frames = fetch_frames()
+    fetched = time.perf_counter()
+    result = {
+        'rows': {name: int(len(frame)) for name, frame in frames.items()},
+        'adherence': adherence(frames['tasks']),
+        'trajectories': trajectories(frames['visits'], frames['scores'], frames['moods']),
+        'recovery': recovery(frames['visits'], frames['tasks']),
+        'computed_at': timezone.now(),
+    }
+    result['timings'] = {
+        'fetch_seconds': round(fetched - started, 3),
+        'compute_seconds': round(time.perf_counter() - fetched, 3),
+    }
+    return result
+
+
+def refresh_cohort_analytics():
+    """Compute the report and store it for every worker to read; run by `manage.py cohort_analytics`"""
+    result = compute_cohort_analytics()
+    report = CohortReport.objects.create(report=result, computed_at=result['computed_at'])
+    CohortReport.objects.exclude(pk=report.pk).delete()
+    return result
+
+
+def latest_cohort_analytics():
+    """The last stored report, or None before the first run; never computes"""
+    row = CohortReport.objects.order_by('-computed_at').first()
+    if row is None:
+        return None
+    return {**row.report, 'computed_at': row.computed_at}
@@ -0,0 +1,114 @@
+import math
+from collections import deque
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from core.models import PatientTask, TaskAlert
+
+LONG_RUNNING_MINUTES = 60
+# Completed history read per scan; rolling means and streaks are computed over it
+LOOKBACK_DAYS = 30
+# Durations are compared against the patient's previous N completed tasks
+ROLLING_WINDOW = 10
+MIN_HISTORY = 5
+OUTLIER_SIGMAS = 3
+MIN_SPREAD_MINUTES = 5
+# A run of at least this many consecutive active days counts as a streak
+STREAK_DAYS = 3
+BATCH_SIZE = 1000
+
+
+def _open_task_alerts(now):
+    """Long-running and never-started tasks, read by (status, started_at) index range"""
+    cutoff = now - timedelta(minutes=LONG_RUNNING_MINUTES)
+    alerts = []
+    running = PatientTask.objects.filter(status='in_progress', started_at__lt=cutoff).values_list(
+        'id', 'patient_id', 'started_at'
+    )
+    for task_id, patient_id, started_at in running.iterator(chunk_size=BATCH_SIZE):
+        minutes = int((now - started_at).total_seconds() // 60)
+        alerts.append(TaskAlert(task_id=task_id, patient_id=patient_id, kind='long_running',
+                                detail=f"Running for {minutes} min"))
+    missed = PatientTask.objects.filter(status='pending', started_at__isnull=True).values_list('id', 'patient_id')
+    for task_id, patient_id in missed.iterator(chunk_size=BATCH_SIZE):
+        alerts.append(TaskAlert(task_id=task_id, patient_id=patient_id, kind='missed', detail="Not started"))
+    return alerts
+
+
+def _history_alerts(now):
+    """Duration outliers and broken streaks from one ordered pass over recent completed tasks"""
+    completed = PatientTask.objects.filter(
+        status='completed', started_at__gte=now - timedelta(days=LOOKBACK_DAYS),
+    ).order_by('patient_id', 'started_at').values_list('id', 'patient_id', 'started_at', 'duration_minutes')
+
+    alerts = []
+    today = timezone.localdate(now)
+
+    def close_patient(patient_id, last_task_id, days):
+        # Streak ending on the last active day, broken if neither today nor yesterday has a task
+        if last_task_id is None or (today - days[-1]).days < 2:
+            return
+        streak = 1
+        for earlier, later in zip(reversed(days[:-1]), reversed(days[1:])):
+            if (later - earlier).days != 1:
+                break
+            streak += 1
+        if streak >= STREAK_DAYS:
+            alerts.append(TaskAlert(task_id=last_task_id, patient_id=patient_id, kind='streak_break',
+                                    detail=f"{streak}-day streak ended {days[-1]:%d %b}"))
+
+    current, last_task_id, days, window = None, None, [], deque(maxlen=ROLLING_WINDOW)
+    for task_id, patient_id, started_at, duration in completed.iterator(chunk_size=BATCH_SIZE):
+        if patient_id != current:
+            close_patient(current, last_task_id, days)
+            current, last_task_id, days = patient_id, None, []
+            window.clear()
+        day = timezone.localdate(started_at)
+        if not days or days[-1] != day:
+            days.append(day)
+        last_task_id = task_id
+        if duration is None:
+            continue
+        if len(window) >= MIN_HISTORY:
+            mean = sum(window) / len(window)
+            spread = max(math.sqrt(sum((d - mean) ** 2 for d in window) / len(window)), MIN_SPREAD_MINUTES)
+            if abs(duration - mean) > OUTLIER_SIGMAS * spread:
+                alerts.append(TaskAlert(task_id=task_id, patient_id=patient_id, kind='duration_outlier',
+                                        detail=f"{duration} min vs usual {mean:.0f} min"))
+        window.append(duration)
+    close_patient(current, last_task_id, days)
+    return alerts
+
+
+def _resolve_cleared(now):
+    """Close alerts whose condition no longer holds; returns the number closed"""
+    open_alerts = TaskAlert.objects.filter(resolved_at__isnull=True)
+    newer_task = PatientTask.objects.filter(
+        patient_id=OuterRef('patient_id'), status='completed', started_at__gt=OuterRef('task__started_at'),
+    )
+    return sum([
+        open_alerts.filter(kind='long_running').exclude(task__status='in_progress').update(resolved_at=now),
+        open_alerts.filter(kind='missed').exclude(task__status='pending', task__started_at__isnull=True)
+        .update(resolved_at=now),
+        open_alerts.filter(kind='streak_break').filter(Exists(newer_task)).update(resolved_at=now),
+        open_alerts.filter(kind='duration_outlier', created_at__lt=now - timedelta(days=LOOKBACK_DAYS))
+        .update(resolved_at=now),
+    ])
+
+
+def scan_task_anomalies(now=None):
+    """Flag anomalies across all patients; safe to rerun, existing (task, kind) alerts are kept"""
+    now = now or timezone.now()
+    found = _open_task_alerts(now) + _history_alerts(now)
+    with transaction.atomic():
+        before = TaskAlert.objects.count()
+        TaskAlert.objects.bulk_create(found, batch_size=BATCH_SIZE, ignore_conflicts=True)
+        created = TaskAlert.objects.count() - before
+        resolved = _resolve_cleared(now)
+    counts = {kind: 0 for kind, _ in TaskAlert.KIND_CHOICES}
+    for alert in found:
+        counts[alert.kind] += 1
+    return {'found': counts, 'created': created, 'resolved': resolved}
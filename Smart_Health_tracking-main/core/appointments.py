@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.utils import timezone
+
+from core import changes
+from core.models import Appointment
+
+# Appointments expired per transaction
+EXPIRE_BATCH_SIZE = 1000
+
+# Target status → statuses an appointment may move from
+TRANSITIONS = {
+    'confirmed': ('pending',),
+    'cancelled': ('pending', 'confirmed'),
+}
+
+
+def set_status(doctor, appointment_ids, status):
+    """Move the doctor's appointments to ``status`` in one UPDATE; returns how many changed
+
+    Appointments of other doctors, or not in a status allowed to make the move, are left alone.
+    """
+    return changes.update(
+        Appointment.objects.filter(doctor=doctor, id__in=appointment_ids, status__in=TRANSITIONS[status]),
+        status=status,
+    )
+
+
+def expire_stale(today=None, batch_size=None):
+    """Mark pending appointments dated before ``today`` expired, one short transaction per batch
+
+    Only a batch of (id, patient, doctor) rows is held at a time for the change events,
+    however many appointments have piled up. Returns the rows expired.
+    """
+    today = today or timezone.localdate()
+    batch_size = batch_size or EXPIRE_BATCH_SIZE
+    stale = Appointment.objects.filter(status='pending', date__lt=today).order_by('pk')
+    expired = 0
+    while True:
+        with transaction.atomic():
+            rows = list(stale.select_for_update().values_list('id', 'patient_id', 'doctor_id')[:batch_size])
+            if not rows:
+                return expired
+            expired += Appointment.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(status='expired')
+            # Bulk updates send no post_save
+            changes.record(Appointment, [Appointment(id=pk, patient_id=patient_id, doctor_id=doctor_id)
+                                         for pk, patient_id, doctor_id in rows])
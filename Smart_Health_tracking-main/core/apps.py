@@ -4,3 +4,30 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_save
+        from .auth import invalidate_cached_user
+        from .caseload import assign_from_booking
+        from .changes import FEEDS, on_delete, on_save
+        from .db import configure_sqlite
+        from .metrics import install_query_recorder
+        from .geo import invalidate as invalidate_hospital_index
+        from .models import Appointment, Hospital, Location, PatientVisit, User, VisitRecord
+
+        connection_created.connect(configure_sqlite, dispatch_uid='core.configure_sqlite')
+        connection_created.connect(install_query_recorder, dispatch_uid='core.install_query_recorder')
+        post_save.connect(invalidate_cached_user, sender=User, dispatch_uid='core.invalidate_cached_user')
+        post_delete.connect(invalidate_cached_user, sender=User, dispatch_uid='core.invalidate_cached_user')
+        for model in (Appointment, VisitRecord):
+            post_save.connect(assign_from_booking, sender=model, dispatch_uid=f'core.assign_from_{model.__name__}')
+        # Change feed; proxies send signals under their own class
+        for model in [*FEEDS, VisitRecord, PatientVisit]:
+            post_save.connect(on_save, sender=model, dispatch_uid=f'core.changes.save_{model.__name__}')
+            post_delete.connect(on_delete, sender=model, dispatch_uid=f'core.changes.delete_{model.__name__}')
+        # Nearest-hospital index (core.geo)
+        for model in (Hospital, Location):
+            post_save.connect(invalidate_hospital_index, sender=model, dispatch_uid=f'core.geo.save_{model.__name__}')
+            post_delete.connect(invalidate_hospital_index, sender=model,
+                                dispatch_uid=f'core.geo.delete_{model.__name__}')
@@ -0,0 +1,136 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import (
+    HealthLog, MoodLog, ImprovementScore, Message, SOSAlert,
+    ArchivedHealthLog, ArchivedMoodLog, ArchivedImprovementScore, ArchivedMessage, ArchivedSOSAlert,
+)
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Hot model → (archive model, time column, rows allowed to move)
+TIERS = {
+    HealthLog: (ArchivedHealthLog, 'date', Q()),
+    MoodLog: (ArchivedMoodLog, 'logged_at', Q()),
+    ImprovementScore: (ArchivedImprovementScore, 'recorded_at', Q()),
+    # Soft-deleted messages are purged by purge_deleted_messages rather than archived
+    Message: (ArchivedMessage, 'timestamp', Q(is_deleted=False)),
+    # Open alerts stay hot however old they are
+    SOSAlert: (ArchivedSOSAlert, 'created_at', Q(status='resolved')),
+}
+
+
+def horizon(model, days=None):
+    """Oldest time still kept in the hot table, typed to match the model's time column"""
+    time_field = TIERS[model][1]
+    cutoff = timezone.now() - timedelta(days=settings.ARCHIVE_HORIZON_DAYS if days is None else days)
+    if isinstance(model._meta.get_field(time_field), models.DateTimeField):
+        return cutoff
+    return cutoff.date()
+
+
+# 🔹 Reads: recent history stays on the hot table, deep history unions in the archive
+def history(model, columns, condition=Q(), since=None, named=False):
+    """Tuples (dicts with ``named``) of ``columns`` over both tiers, or just the hot tier
+    when ``since`` is within the horizon
+
+    Order the result by selected column names, e.g. ``.order_by('logged_at', 'id')``.
+    """
+    def select(queryset):
+        return queryset.values(*columns) if named else queryset.values_list(*columns)
+
+    if model not in TIERS:
+        return select(model.objects.filter(condition))
+    archive, time_field, _ = TIERS[model]
+    if since is not None:
+        condition &= Q(**{f'{time_field}__gte': since})
+    hot = select(model.objects.filter(condition))
+    if since is not None and since >= horizon(model):
+        return hot
+    return hot.union(select(archive.objects.filter(condition)), all=True)
+
+
+def recent(model, columns, condition=Q(), named=False):
+    """Rows within the horizon: the hot tier only, never the archive"""
+    time_field = TIERS[model][1]
+    rows = model.objects.filter(condition, **{f'{time_field}__gte': horizon(model)})
+    return rows.values(*columns) if named else rows.values_list(*columns)
+
+
+# 🔹 Moving rows to the cold tier
+def _delete_quietly(queryset):
+    # Nothing references the tiered models, so a plain DELETE is safe; skipping the collector
+    # also skips post_delete, as archived and purged rows are not deletions for the change feed
+    return queryset._raw_delete(queryset.db)
+
+
+def archive_table(model, days=None, batch_size=None, stop=lambda: False):
+    """Move rows older than the horizon into the archive, one short transaction per batch
+
+    Copy and delete share a transaction, so each row is in exactly one tier at any time;
+    an interrupted run simply resumes with the next batch. Returns the rows moved.
+    """
+    archive, time_field, movable = TIERS[model]
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    # Hot-only bookkeeping (Message.deleted_at) has no archive column
+    kept = {field.attname for field in archive._meta.concrete_fields}
+    columns = [field.attname for field in model._meta.concrete_fields if field.attname in kept]
+    old_rows = model.objects.filter(movable, **{f'{time_field}__lt': horizon(model, days)})
+    moved = 0
+    while not stop():
+        ids = list(old_rows.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            rows = model.objects.filter(pk__in=ids).values(*columns)
+            archive.objects.bulk_create([archive(**row) for row in rows], ignore_conflicts=True)
+            _delete_quietly(model.objects.filter(pk__in=ids))
+        moved += len(ids)
+    return moved
+
+
+def archive_all(days=None, batch_size=None, models=None):
+    """Archive every tiered table (or ``models``); returns {model name: rows moved}"""
+    moved = {}
+    for model in models or TIERS:
+        moved[model.__name__] = archive_table(model, days=days, batch_size=batch_size)
+        if moved[model.__name__]:
+            logger.info("Archived %s %s rows", moved[model.__name__], model.__name__)
+    return moved
+
+
+# 🔹 Purging soft-deleted messages
+def purge_deleted_messages(days=None, batch_size=None, pause=0.0, dry_run=False):
+    """Hard-delete messages soft-deleted more than ``days`` ago, in short batched deletes
+
+    Rows deleted before deleted_at existed fall back to their timestamp. Archived copies
+    of deleted messages are past any retention window and go too. Returns rows purged.
+    """
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    cutoff = timezone.now() - timedelta(days=settings.MESSAGE_PURGE_DAYS if days is None else days)
+    expired = Q(deleted_at__lt=cutoff) | Q(deleted_at__isnull=True, timestamp__lt=cutoff)
+    targets = [
+        Message.objects.filter(expired, is_deleted=True),
+        ArchivedMessage.objects.filter(is_deleted=True),
+    ]
+    if dry_run:
+        return sum(queryset.count() for queryset in targets)
+
+    purged = 0
+    for queryset in targets:
+        while True:
+            ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            # Each batch commits on its own, so writers wait at most one batch
+            _delete_quietly(queryset.model.objects.filter(pk__in=ids))
+            purged += len(ids)
+            if pause:
+                time.sleep(pause)
+    return purged
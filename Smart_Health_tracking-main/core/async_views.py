@@ -0,0 +1,39 @@
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse
+from django.utils import timezone
+
+from core import changes
+from core.auth import aget_cached_user
+from core.models import Hospital, Message
+
+# 🔹 Async versions of high-fanout endpoints, routed when settings.ASYNC_VIEWS is on (asgi.py).
+# Under an ASGI server they wait on the database without holding a worker thread each.
+
+
+async def load_hospitals(request):
+    location_id = request.GET.get('location')
+    hospitals = [row async for row in Hospital.objects.filter(location_id=location_id).values('id', 'name')]
+    return JsonResponse(hospitals, safe=False)
+
+
+@login_required
+async def send_message(request):
+    if request.method == 'POST':
+        receiver = await aget_cached_user(request.POST.get('receiver_id'))
+        if receiver is None:
+            raise Http404("No such user")
+        sender = await request.auser()
+        await Message.objects.acreate(sender=sender, receiver=receiver, content=request.POST.get('content'))
+        return JsonResponse({'status': 'success'})
+    return JsonResponse({'status': 'error'})
+
+
+@login_required
+async def delete_message(request, message_id):
+    sender = await request.auser()
+    deleted = await changes.aupdate(
+        Message.objects.filter(id=message_id, sender=sender), is_deleted=True, deleted_at=timezone.now()
+    )
+    if not deleted:
+        raise Http404("No such message")
+    return JsonResponse({'status': 'deleted'})
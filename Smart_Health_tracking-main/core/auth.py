@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from core.models import User
+
+
+def _key(user_id):
+    return f"auth_user:{user_id}"
+
+
+def cache_is_shared():
+    """Whether every worker process sees the same default cache
+
+    Invalidation deletes the entry in the cache it can reach. With a per-process cache, the
+    other workers would keep a deactivated user, old role or old password hash (sessions
+    stay valid) for AUTH_USER_CACHE_SECONDS, so users are then read from the database.
+    """
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+# 🔹 Cached user lookups; entries are dropped whenever the user is saved or deleted
+def get_cached_user(user_id):
+    """User by primary key from the cache, falling back to one query; None if there is no such user"""
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    if not cache_is_shared():
+        return User.objects.filter(pk=user_id).first()
+    user = cache.get(_key(user_id))
+    if user is None:
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None:
+            cache.set(_key(user_id), user, settings.AUTH_USER_CACHE_SECONDS)
+    return user
+
+
+async def aget_cached_user(user_id):
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    if not cache_is_shared():
+        return await User.objects.filter(pk=user_id).afirst()
+    user = await cache.aget(_key(user_id))
+    if user is None:
+        user = await User.objects.filter(pk=user_id).afirst()
+        if user is not None:
+            await cache.aset(_key(user_id), user, settings.AUTH_USER_CACHE_SECONDS)
+    return user
+
+
+def invalidate_cached_user(sender, instance, **kwargs):
+    cache.delete(_key(instance.pk))
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose per-request user load (request.user) is served from a shared cache
+
+    Without one (see cache_is_shared) it behaves exactly like ModelBackend.
+    """
+
+    def get_user(self, user_id):
+        user = get_cached_user(user_id)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        user = await aget_cached_user(user_id)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,89 @@
+from django.apps import apps as global_apps
+from django.db.models import Exists, OuterRef
+
+from core.models import CareAssignment, SOSAlert, User
+
+CLINICIAN_ROLES = ('doctor', 'therapist')
+BATCH_SIZE = 2000
+
+
+# 🔹 Caseload queries: every clinician view reads through the (clinician, patient) index
+def patients_of(clinician):
+    return User.objects.filter(role='patient', care_team__clinician=clinician)
+
+
+def care_team_of(patient, role):
+    return User.objects.filter(role=role, caseload__patient=patient)
+
+
+def in_caseload(clinician, patient):
+    return CareAssignment.objects.filter(clinician=clinician, patient=patient).exists()
+
+
+def can_view_patient(user, patient):
+    """The patient themself, or a doctor/therapist with the patient in their caseload"""
+    if user.pk == patient.pk:
+        return True
+    return user.role in CLINICIAN_ROLES and in_caseload(user, patient)
+
+
+def visible_sos_alerts(clinician):
+    """Alerts from the clinician's caseload, plus patients nobody is assigned to yet, so no SOS goes unseen"""
+    mine = Exists(CareAssignment.objects.filter(clinician=clinician, patient=OuterRef('patient')))
+    unassigned = ~Exists(CareAssignment.objects.filter(patient=OuterRef('patient')))
+    return SOSAlert.objects.filter(mine | unassigned).select_related('patient')
+
+
+# 🔹 Writing assignments
+def assign(clinician_id, patient_id, role, source='manual'):
+    """Add a patient to a caseload; already being there is not an error"""
+    CareAssignment.objects.bulk_create(
+        [CareAssignment(clinician_id=clinician_id, patient_id=patient_id, role=role, source=source)],
+        ignore_conflicts=True,
+    )
+
+
+def assign_from_booking(sender, instance, created, **kwargs):
+    """post_save for Appointment and VisitRecord: the doctor now cares for the patient"""
+    if created and instance.doctor_id is not None:
+        assign(instance.doctor_id, instance.patient_id, 'doctor',
+               'visit' if sender.__name__ == 'VisitRecord' else 'appointment')
+
+
+def backfill(apps=global_apps, feedback_therapist_id=None, batch_size=BATCH_SIZE):
+    """Create assignments from existing appointments, visit records and task feedback
+
+    Task feedback does not record which therapist wrote it, so it is attributed to
+    ``feedback_therapist_id``, or to the only therapist when there is exactly one.
+    Safe to re-run. Returns the number of candidate links per source.
+    """
+    Assignment = apps.get_model('core', 'CareAssignment')
+    Appointment = apps.get_model('core', 'Appointment')
+    VisitRecord = apps.get_model('core', 'VisitRecord')
+    PatientTask = apps.get_model('core', 'PatientTask')
+    UserModel = apps.get_model('core', 'User')
+
+    pairs = {}
+    for source, model in [('appointment', Appointment), ('visit', VisitRecord)]:
+        rows = model.objects.filter(doctor__role='doctor', patient__role='patient').values_list(
+            'doctor_id', 'patient_id'
+        ).distinct()
+        pairs[source] = [(doctor_id, patient_id, 'doctor') for doctor_id, patient_id in rows.iterator()]
+
+    if feedback_therapist_id is None:
+        therapists = list(UserModel.objects.filter(role='therapist').values_list('id', flat=True)[:2])
+        feedback_therapist_id = therapists[0] if len(therapists) == 1 else None
+    pairs['feedback'] = []
+    if feedback_therapist_id is not None:
+        patient_ids = PatientTask.objects.exclude(feedback='').filter(patient__role='patient').values_list(
+            'patient_id', flat=True
+        ).distinct()
+        pairs['feedback'] = [(feedback_therapist_id, patient_id, 'therapist') for patient_id in patient_ids.iterator()]
+
+    for source, links in pairs.items():
+        for start in range(0, len(links), batch_size):
+            Assignment.objects.bulk_create([
+                Assignment(clinician_id=clinician_id, patient_id=patient_id, role=role, source=source)
+                for clinician_id, patient_id, role in links[start:start + batch_size]
+            ], ignore_conflicts=True)
+    return {source: len(links) for source, links in pairs.items()}
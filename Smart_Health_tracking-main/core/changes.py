@@ -0,0 +1,171 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from core.models import (
+    Appointment, CareAssignment, ChangeEvent, ExerciseVideo, Message, PatientTask, SOSAlert, Visit,
+)
+
+
+# 🔹 Audiences: objects → {pk: (user ids, roles)} for one batch, so bulk writes stay a single query
+def _parties(*fields):
+    def audience(objs):
+        return {obj.pk: ({getattr(obj, field) for field in fields} - {None}, ()) for obj in objs}
+    return audience
+
+
+def _patient_and_care_team(unassigned_roles=()):
+    """The patient and their caseload clinicians; ``unassigned_roles`` when nobody is assigned"""
+    def audience(objs):
+        team = defaultdict(set)
+        rows = CareAssignment.objects.filter(patient_id__in={obj.patient_id for obj in objs})
+        for patient_id, clinician_id in rows.values_list('patient_id', 'clinician_id'):
+            team[patient_id].add(clinician_id)
+        return {
+            obj.pk: ({obj.patient_id} | team[obj.patient_id], () if team[obj.patient_id] else unassigned_roles)
+            for obj in objs
+        }
+    return audience
+
+
+def _everyone(objs):
+    return {obj.pk: ((), (ChangeEvent.EVERYONE,)) for obj in objs}
+
+
+# Feed name, columns sent to clients, audience; VisitRecord/PatientVisit share the Visit feed
+FEEDS = {
+    Appointment: ('appointment', ['id', 'patient_id', 'doctor_id', 'hospital_id', 'date', 'time', 'status',
+                                  'reason'], _parties('patient_id', 'doctor_id')),
+    PatientTask: ('task', ['id', 'patient_id', 'task_name', 'task_type', 'status', 'started_at',
+                           'duration_minutes', 'completed_at', 'feedback'], _patient_and_care_team()),
+    Message: ('message', ['id', 'sender_id', 'receiver_id', 'content', 'timestamp', 'is_deleted'],
+              _parties('sender_id', 'receiver_id')),
+    # Alerts without a caseload reach every clinician, as on the dashboards
+    SOSAlert: ('sos_alert', ['id', 'patient_id', 'message', 'status', 'created_at', 'acknowledged_at',
+                             'resolved_at'], _patient_and_care_team(unassigned_roles=('doctor', 'therapist'))),
+    Visit: ('visit', ['id', 'source', 'patient_id', 'doctor_id', 'visit_date', 'hospital_name', 'doctor_name',
+                      'current_status', 'improvement_score', 'summary'], _parties('patient_id', 'doctor_id')),
+    ExerciseVideo: ('video', ['id', 'therapist_id', 'title', 'exercise_type', 'difficulty_level',
+                              'duration_minutes', 'is_active', 'updated_at'], _everyone),
+}
+MODELS_BY_NAME = {name: model for model, (name, _, _) in FEEDS.items()}
+# Soft-deleted rows keep their columns in the table; the feed reports them as deletes instead
+HIDDEN = {
+    Message: Q(is_deleted=True),
+}
+
+
+def _feed_model(model):
+    return model._meta.concrete_model if model._meta.proxy else model
+
+
+# 🔹 Writing events
+def record(model, objs, action='upsert'):
+    """Append one event per recipient of each object; returns the events written"""
+    name, _, audience = FEEDS[_feed_model(model)]
+    events = []
+    for object_id, (user_ids, roles) in audience(objs).items():
+        events += [ChangeEvent(user_id=user_id, model=name, object_id=object_id, action=action)
+                   for user_id in user_ids]
+        events += [ChangeEvent(role=role, model=name, object_id=object_id, action=action) for role in roles]
+    return ChangeEvent.objects.bulk_create(events)
+
+
+def on_save(sender, instance, raw=False, **kwargs):
+    if not raw:  # fixtures
+        record(sender, [instance])
+
+
+def on_delete(sender, instance, **kwargs):
+    record(sender, [instance], action='delete')
+
+
+def update(queryset, **values):
+    """queryset.update() that also records the change; bulk updates send no post_save
+
+    The rows are locked and read first (for their recipients), then changed by one
+    set-based UPDATE. Returns the rows updated, like update().
+    """
+    with transaction.atomic():
+        objs = list(queryset.select_for_update())
+        if not objs:
+            return 0
+        updated = queryset.update(**values)
+        record(queryset.model, objs)
+    return updated
+
+
+async def aupdate(queryset, **values):
+    return await sync_to_async(update)(queryset, **values)
+
+
+# 🔹 Reading the feed
+def latest_seq():
+    return ChangeEvent.objects.aggregate(seq=Max('seq'))['seq'] or 0
+
+
+def is_expired(since):
+    """True when events after ``since`` may have been pruned, so the client must reload in full"""
+    oldest = ChangeEvent.objects.aggregate(seq=Min('seq'))['seq']
+    return oldest is not None and since < oldest - 1
+
+
+def changes_for(user, since, limit=None):
+    """Events visible to ``user`` after ``since``, collapsed to the newest per object
+
+    Returns (changes, next seq, more pending). Upserts carry the object's current columns;
+    an object gone from its table (or soft-deleted, see HIDDEN) by the time of the read is
+    reported as a delete.
+    """
+    limit = limit or settings.CHANGE_FEED_PAGE_SIZE
+    visible = Q(user=user) | Q(user__isnull=True, role__in=[ChangeEvent.EVERYONE, user.role])
+    events = list(
+        ChangeEvent.objects.filter(visible, seq__gt=since).order_by('seq')
+        .values_list('seq', 'model', 'object_id', 'action')[:limit + 1]
+    )
+    more = len(events) > limit
+    events = events[:limit]
+
+    latest = {}
+    for seq, name, object_id, action in events:
+        latest[name, object_id] = (seq, action)
+    wanted = defaultdict(list)
+    for (name, object_id), (_, action) in latest.items():
+        if action == 'upsert':
+            wanted[name].append(object_id)
+    rows = {}
+    for name, ids in wanted.items():
+        model = MODELS_BY_NAME[name]
+        shown = model.objects.filter(pk__in=ids)
+        if model in HIDDEN:
+            shown = shown.exclude(HIDDEN[model])
+        for row in shown.values(*FEEDS[model][1]):
+            rows[name, row['id']] = row
+
+    changes = []
+    for (name, object_id), (seq, action) in sorted(latest.items(), key=lambda item: item[1][0]):
+        data = rows.get((name, object_id)) if action == 'upsert' else None
+        changes.append({
+            'seq': seq,
+            'model': name,
+            'id': object_id,
+            'action': 'upsert' if data else 'delete',
+            'data': data,
+        })
+    return changes, events[-1][0] if events else since, more
+
+
+# 🔹 Retention
+def prune(days=None):
+    """Delete events older than ``days``, keeping the newest of them as the resync marker; returns rows deleted"""
+    cutoff = timezone.now() - timedelta(days=settings.CHANGE_FEED_RETENTION_DAYS if days is None else days)
+    marker = ChangeEvent.objects.filter(created_at__lt=cutoff).aggregate(seq=Max('seq'))['seq']
+    if marker is None:
+        return 0
+    deleted, _ = ChangeEvent.objects.filter(seq__lt=marker).delete()
+    return deleted
@@ -0,0 +1,39 @@
+from django.conf import settings
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply settings.SQLITE_PRAGMAS to every new SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def incremental_vacuum(connection, pages=0):
+    """Return free pages to the filesystem (all of them when ``pages`` is 0)
+
+    Returns the pages released, or None when the database is not SQLite with
+    auto_vacuum=INCREMENTAL (see enable_incremental_vacuum).
+    """
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA auto_vacuum")
+        if cursor.fetchone()[0] != 2:
+            return None
+        cursor.execute("PRAGMA freelist_count")
+        before = cursor.fetchone()[0]
+        # The pragma frees one page per step and sqlite3's execute() steps only once;
+        # executescript() runs it to completion
+        connection.connection.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+        cursor.execute("PRAGMA freelist_count")
+        return before - cursor.fetchone()[0]
+
+
+def enable_incremental_vacuum(connection):
+    """Switch an existing SQLite file to auto_vacuum=INCREMENTAL; rewrites the file once with VACUUM"""
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        cursor.execute("VACUUM")
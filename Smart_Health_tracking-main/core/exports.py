@@ -0,0 +1,193 @@
+import csv
+import os
+
+from django.db.models import Q
+
+from core.archive import history
+from core.models import (
+    PatientTask, PatientVisit, VisitRecord, HealthLog,
+    MoodLog, ImprovementScore, Message,
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; CSV is always available
+    pa = None
+    pq = None
+
+# Rows fetched per round trip; memory use is bounded by this, not by history length
+CHUNK_SIZE = 2000
+
+# 🔹 Exported tables: name → (model, columns, patient filter)
+EXPORT_TABLES = {
+    'tasks': (
+        PatientTask,
+        ['id', 'task_name', 'task_type', 'status', 'started_at', 'completed_at',
+         'duration_minutes', 'feedback'],
+        lambda patient: Q(patient=patient),
+    ),
+    'visits': (
+        PatientVisit,
+        ['id', 'visit_date', 'hospital_name', 'doctor_name', 'doctor_id',
+         'report_file', 'prescription_file', 'medicine_details', 'therapist_notes'],
+        lambda patient: Q(patient=patient),
+    ),
+    'visit_records': (
+        VisitRecord,
+        ['id', 'visit_date', 'hospital_name', 'doctor_name', 'doctor_id', 'current_status',
+         'improvement_score', 'doctor_notes', 'summary', 'report_file', 'prescription_file'],
+        lambda patient: Q(patient=patient),
+    ),
+    'health_logs': (
+        HealthLog,
+        ['id', 'date', 'blood_pressure', 'heart_rate', 'notes'],
+        lambda patient: Q(patient=patient),
+    ),
+    'moods': (
+        MoodLog,
+        ['id', 'mood', 'logged_at'],
+        lambda patient: Q(patient=patient),
+    ),
+    'scores': (
+        ImprovementScore,
+        ['id', 'score', 'recorded_at'],
+        lambda patient: Q(patient=patient),
+    ),
+    'messages': (
+        Message,
+        ['id', 'sender_id', 'receiver_id', 'timestamp', 'content', 'is_deleted'],
+        lambda patient: Q(sender=patient) | Q(receiver=patient),
+    ),
+}
+
+FORMATS = ['csv', 'parquet'] if pa is not None else ['csv']
+
+
+def iter_table_rows(patient, table):
+    """Yield one tuple per row of ``table`` for ``patient`` without caching the queryset"""
+    model, columns, condition = EXPORT_TABLES[table]
+    # Full history, so archived rows are included
+    queryset = history(model, columns, condition(patient)).order_by('id')
+    return queryset.iterator(chunk_size=CHUNK_SIZE)
+
+
+class Echo:
+    """File-like object whose write() hands the value straight back (for streaming CSV)"""
+
+    def write(self, value):
+        return value
+
+
+def stream_patient_csv(patient, tables=None):
+    """Yield CSV lines for every requested table, one section per table"""
+    writer = csv.writer(Echo())
+    for table in tables or EXPORT_TABLES:
+        columns = EXPORT_TABLES[table][1]
+        yield writer.writerow(['table'] + columns)
+        for row in iter_table_rows(patient, table):
+            yield writer.writerow((table,) + row)
+
+
+def _record_batches(patient, table, batch_size=CHUNK_SIZE):
+    """Group rows into column-oriented Arrow record batches"""
+    schema = arrow_schema(table)
+    rows = []
+    for row in iter_table_rows(patient, table):
+        rows.append(row)
+        if len(rows) >= batch_size:
+            yield _to_batch(schema, rows)
+            rows = []
+    if rows:
+        yield _to_batch(schema, rows)
+
+
+def _to_batch(schema, rows):
+    arrays = [
+        pa.array([row[i] for row in rows], type=schema.field(i).type)
+        for i in range(len(schema))
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def arrow_schema(table):
+    """Build a fixed Arrow schema from the model fields so every batch agrees on types"""
+    model, columns, condition = EXPORT_TABLES[table]
+    types = {
+        'DateField': pa.date32(),
+        'DateTimeField': pa.timestamp('us', tz='UTC'),
+        'BooleanField': pa.bool_(),
+        'CharField': pa.string(),
+        'TextField': pa.string(),
+        'FileField': pa.string(),
+        'ImageField': pa.string(),
+    }
+    fields = []
+    for column in columns:
+        internal_type = model._meta.get_field(column).get_internal_type()
+        fields.append(pa.field(column, types.get(internal_type, pa.int64())))
+    return pa.schema(fields)
+
+
+class _ChunkSink:
+    """Collects bytes written by pyarrow so they can be yielded to the client"""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_patient_arrow(patient, table):
+    """Yield a single table as an Arrow IPC stream, batch by batch"""
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, arrow_schema(table))
+    for batch in _record_batches(patient, table):
+        writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def write_patient_export(patient, output_dir, fmt='csv'):
+    """Write every table for ``patient`` into ``output_dir``; returns {table: row count}"""
+    os.makedirs(output_dir, exist_ok=True)
+    counts = {}
+    for table, (model, columns, condition) in EXPORT_TABLES.items():
+        if fmt == 'parquet':
+            path = os.path.join(output_dir, f'{table}.parquet')
+            counts[table] = _write_parquet(patient, table, path)
+        else:
+            path = os.path.join(output_dir, f'{table}.csv')
+            with open(path, 'w', newline='', encoding='utf-8') as handle:
+                writer = csv.writer(handle)
+                writer.writerow(columns)
+                count = 0
+                for row in iter_table_rows(patient, table):
+                    writer.writerow(row)
+                    count += 1
+            counts[table] = count
+    return counts
+
+
+def _write_parquet(patient, table, path):
+    count = 0
+    with pq.ParquetWriter(path, arrow_schema(table)) as writer:
+        for batch in _record_batches(patient, table):
+            writer.write_batch(batch)
+            count += batch.num_rows
+    return count
@@ -2,10 +2,12 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from core.models import (
     PatientVisit, HealthLog, PatientTask,
-    VisitRecord, Location, Hospital, Appointment, ExerciseVideo
+    VisitRecord, Visit, Location, Hospital, Appointment, ExerciseVideo
 )
+from core.tasks import delete_stored_files
 
 User = get_user_model()
 
@@ -92,7 +94,7 @@ class TherapistFeedbackForm(forms.ModelForm):
 # 🔹 Therapist Notes Form
 class TherapistNotesForm(forms.ModelForm):
     class Meta:
-        model = PatientVisit
+        model = Visit
         fields = ['therapist_notes']
         widgets = {
             'therapist_notes': forms.Textarea(attrs={'rows': 3, 'placeholder': 'Enter therapist notes here...'})
@@ -141,13 +143,46 @@ class VisitUpdateForm(forms.ModelForm):
         model = VisitRecord
         fields = ['current_status', 'improvement_score', 'doctor_notes']
 
+# 🔹 Profile photo handling shared by the profile forms
+class ProfilePhotoMixin:
+    """Deletes a removed photo's file only after the user row without it is committed
+
+    With ``commit=False`` the deletion waits for ``form.save_m2m()``, as Django's own
+    commit=False saves do.
+    """
+
+    def save(self, commit=True):
+        user = super().save(commit=False)
+        old_photo = self.initial.get('profile_photo')
+        self.removed_photo = None
+
+        # Handle photo deletion
+        if self.cleaned_data.get('delete_photo') and old_photo:
+            self.removed_photo = old_photo.name
+            user.profile_photo = None
+
+        # Handle photo upload (with none, the field cleans to the current photo)
+        if 'profile_photo' in self.changed_data and self.cleaned_data.get('profile_photo'):
+            user.profile_photo = self.cleaned_data['profile_photo']
+
+        if commit:
+            user.save()
+            self._save_m2m()
+        return user
+
+    def _save_m2m(self):
+        super()._save_m2m()
+        if self.removed_photo:
+            names = [self.removed_photo]
+            transaction.on_commit(lambda: delete_stored_files.delay(names))
+
 # 🔹 Doctor Profile Form
 from django import forms
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
-class DoctorProfileForm(forms.ModelForm):
+class DoctorProfileForm(ProfilePhotoMixin, forms.ModelForm):
     delete_photo = forms.BooleanField(
         required=False,
         label="Delete Profile Photo",
@@ -180,28 +215,12 @@ class DoctorProfileForm(forms.ModelForm):
             'role': forms.TextInput(attrs={'readonly': 'readonly'}),
         }
 
-    def save(self, commit=True):
-        user = super().save(commit=False)
-
-        # Handle photo deletion
-        if self.cleaned_data.get('delete_photo'):
-            if user.profile_photo:
-                user.profile_photo.delete(save=False)
-                user.profile_photo = None
-
-        # Handle photo upload
-        if self.cleaned_data.get('profile_photo'):
-            user.profile_photo = self.cleaned_data['profile_photo']
-
-        if commit:
-            user.save()
-        return user
 
 
         
 
 # 🔹 Patient Profile Form (Reusable for All Roles)
-class PatientProfileForm(forms.ModelForm):
+class PatientProfileForm(ProfilePhotoMixin, forms.ModelForm):
     delete_photo = forms.BooleanField(
         required=False,
         label="Delete Profile Photo",
@@ -240,23 +259,6 @@ class PatientProfileForm(forms.ModelForm):
             'role': forms.TextInput(attrs={'readonly': 'readonly'}),
         }
 
-    def save(self, commit=True):
-        user = super().save(commit=False)
-
-        # Handle photo deletion
-        if self.cleaned_data.get('delete_photo'):
-            if user.profile_photo:
-                user.profile_photo.delete(save=False)
-                user.profile_photo = None
-
-        # Handle photo upload
-        uploaded_photo = self.cleaned_data.get('profile_photo')
-        if uploaded_photo:
-            user.profile_photo = uploaded_photo
-
-        if commit:
-            user.save()
-        return user
 
 # 🔹 Exercise Video Upload Form
 class ExerciseVideoForm(forms.ModelForm):
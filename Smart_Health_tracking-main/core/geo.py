@@ -0,0 +1,168 @@
+import heapq
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count, F
+from django.db.models.functions import Coalesce
+
+from core.models import Appointment, DataVersion, Hospital
+
+EARTH_RADIUS_KM = 6371.0
+VERSION_NAME = 'hospital_index'
+BOOKED_STATUSES = ('pending', 'confirmed')
+# Ids per IN (...) query; SQLite caps the variables in one statement
+QUERY_CHUNK_SIZE = 500
+
+
+def to_xyz(latitude, longitude):
+    """Point on the unit sphere; straight-line distance between two grows with great-circle distance"""
+    lat, lng = math.radians(latitude), math.radians(longitude)
+    return (math.cos(lat) * math.cos(lng), math.cos(lat) * math.sin(lng), math.sin(lat))
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+# 🔹 KD-tree over unit-sphere points
+class KDTree:
+    """Static 3-d tree; nodes live in flat lists, children of a median-split range [lo, hi)"""
+
+    def __init__(self, points, ids):
+        order = list(range(len(points)))
+        self.points = [None] * len(points)
+        self.ids = [None] * len(points)
+        self.axes = [0] * len(points)
+        # Iterative build: sort each range on its widest axis and put the median in its slot
+        stack = [(0, len(points))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            chunk = order[lo:hi]
+            spans = [max(points[i][axis] for i in chunk) - min(points[i][axis] for i in chunk) for axis in range(3)]
+            axis = spans.index(max(spans))
+            chunk.sort(key=lambda i: points[i][axis])
+            order[lo:hi] = chunk
+            mid = (lo + hi) // 2
+            self.points[mid] = points[order[mid]]
+            self.ids[mid] = ids[order[mid]]
+            self.axes[mid] = axis
+            stack += [(lo, mid), (mid + 1, hi)]
+
+    def __len__(self):
+        return len(self.points)
+
+    def nearest(self, target, k):
+        """[(chord distance, id)] of the ``k`` points closest to ``target``, nearest first"""
+        if k <= 0:
+            return []
+        best = []  # max-heap of (-squared distance, id)
+        stack = [(0, len(self.points))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            point, axis = self.points[mid], self.axes[mid]
+            squared = sum((a - b) ** 2 for a, b in zip(point, target))
+            if len(best) < k:
+                heapq.heappush(best, (-squared, self.ids[mid]))
+            elif squared < -best[0][0]:
+                heapq.heapreplace(best, (-squared, self.ids[mid]))
+            offset = target[axis] - point[axis]
+            near, far = ((mid + 1, hi), (lo, mid)) if offset > 0 else ((lo, mid), (mid + 1, hi))
+            # Visit the far side only if the splitting plane is closer than the current k-th best
+            if len(best) < k or offset * offset < -best[0][0]:
+                stack.append(far)
+            stack.append(near)
+        return [(math.sqrt(-negative), hospital_id) for negative, hospital_id in sorted(best, reverse=True)]
+
+
+# 🔹 Process-wide index, rebuilt when hospitals change or it gets old
+_lock = threading.Lock()
+_index = {}
+
+
+def invalidate(sender=None, **kwargs):
+    """post_save/post_delete on Hospital and Location: every process rebuilds on its next query
+
+    The version is a database row, not a cache key, so it reaches every worker and
+    rolls back with the change that bumped it.
+    """
+    if not DataVersion.objects.filter(name=VERSION_NAME).update(version=F('version') + 1):
+        DataVersion.objects.get_or_create(name=VERSION_NAME, defaults={'version': 1})
+
+
+def build():
+    rows = Hospital.objects.annotate(
+        lat=Coalesce('latitude', 'location__latitude'),
+        lng=Coalesce('longitude', 'location__longitude'),
+    ).filter(lat__isnull=False, lng__isnull=False).values_list('id', 'lat', 'lng')
+    ids, points = [], []
+    for hospital_id, lat, lng in rows.iterator():
+        ids.append(hospital_id)
+        points.append(to_xyz(lat, lng))
+    return KDTree(points, ids)
+
+
+def index():
+    """This process's tree, rebuilt when the stored version moved or it is older than HOSPITAL_INDEX_MAX_AGE
+
+    Costs one primary-key read per query. The age limit catches writes that send no
+    signals (queryset.update(), raw SQL).
+    """
+    version = DataVersion.objects.filter(name=VERSION_NAME).values_list('version', flat=True).first() or 0
+    with _lock:
+        fresh = (
+            _index.get('version') == version
+            and time.monotonic() - _index['built_at'] < settings.HOSPITAL_INDEX_MAX_AGE
+        )
+        if not fresh:
+            _index.update(tree=build(), version=version, built_at=time.monotonic())
+        return _index['tree']
+
+
+# 🔹 Queries
+def _chunks(ids):
+    for start in range(0, len(ids), QUERY_CHUNK_SIZE):
+        yield ids[start:start + QUERY_CHUNK_SIZE]
+
+
+def nearest_with_free_slots(latitude, longitude, k, day):
+    """The ``k`` nearest hospitals with an unbooked slot on ``day``, nearest first
+
+    Widens the candidate set until k are found, so fully booked hospitals nearby cost
+    another round rather than a scan. Stops at HOSPITAL_CANDIDATES_MAX candidates, so
+    fewer than k may come back. Returns dicts of id, name, distance_km, free_slots.
+    """
+    tree = index()
+    target = to_xyz(latitude, longitude)
+    limit = min(len(tree), settings.HOSPITAL_CANDIDATES_MAX)
+    candidates = k * 4
+    while True:
+        nearest = tree.nearest(target, min(candidates, limit))
+        ids = [hospital_id for _, hospital_id in nearest]
+        hospitals, booked = {}, {}
+        for chunk in _chunks(ids):
+            hospitals.update(
+                (row[0], row) for row in Hospital.objects.filter(id__in=chunk).values_list('id', 'name', 'daily_slots')
+            )
+            booked.update(
+                Appointment.objects.filter(hospital_id__in=chunk, date=day, status__in=BOOKED_STATUSES)
+                .values('hospital_id').annotate(n=Count('id')).values_list('hospital_id', 'n')
+            )
+        found = []
+        for chord, hospital_id in nearest:
+            if hospital_id not in hospitals:  # deleted since the index was built
+                continue
+            _, name, daily_slots = hospitals[hospital_id]
+            free = daily_slots - booked.get(hospital_id, 0)
+            if free > 0:
+                found.append({'id': hospital_id, 'name': name, 'distance_km': round(chord_to_km(chord), 2),
+                              'free_slots': free})
+        if len(found) >= k or len(nearest) >= limit:
+            return found[:k]
+        candidates *= 4
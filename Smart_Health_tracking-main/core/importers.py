@@ -0,0 +1,281 @@
+import csv
+import json
+import os
+import uuid
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime, parse_time
+
+from core.models import (
+    User, Location, Hospital, Appointment, VisitRecord,
+    HealthLog, PatientTask, MoodLog, CareAssignment, ImportCheckpoint,
+)
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class ImportRowError(ValueError):
+    """A source row that cannot be mapped onto the model (bad value or unknown reference)"""
+
+
+# 🔹 Source readers (both stream; nothing is loaded whole)
+def read_rows(path, fmt=None):
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as handle:
+        if fmt == 'jsonl':
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(handle)
+
+
+# 🔹 Checkpoints: number of source rows already committed, saved in each batch's transaction
+class CheckpointMismatch(ValueError):
+    """A checkpoint left by an import of another file or model"""
+
+
+def load_checkpoint(name, source, model_name, using='default'):
+    if not name:
+        return 0
+    checkpoint = ImportCheckpoint.objects.using(using).filter(name=name).first()
+    if checkpoint is None:
+        return 0
+    if (checkpoint.source, checkpoint.model) != (source, model_name):
+        raise CheckpointMismatch(
+            f"Checkpoint {name!r} belongs to a {checkpoint.model} import of {checkpoint.source}; "
+            f"use another name or delete it"
+        )
+    return checkpoint.rows_done
+
+
+def save_checkpoint(name, source, model_name, rows_done, using='default'):
+    ImportCheckpoint.objects.using(using).update_or_create(
+        name=name, defaults={'source': source, 'model': model_name, 'rows_done': rows_done},
+    )
+
+
+@contextmanager
+def historical_timestamps(model):
+    """Let bulk_create keep source timestamps instead of auto_now/auto_now_add overwriting them"""
+    patched = [f for f in model._meta.fields if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in patched]
+    for field in patched:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def parse_aware_datetime(raw):
+    value = parse_datetime(raw)
+    if value is not None and timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def _value(row, key, parser=None, default=None, required=False):
+    raw = row.get(key)
+    if raw in (None, ''):
+        if required:
+            raise ImportRowError(f"missing {key}")
+        return default
+    if parser is None:
+        return raw
+    parsed = parser(raw) if isinstance(raw, str) else raw
+    if parsed is None:
+        raise ImportRowError(f"bad {key}: {raw!r}")
+    return parsed
+
+
+class IdMaps:
+    """In-memory natural-key → primary-key maps, loaded once per import run"""
+
+    def __init__(self, using):
+        self.using = using
+        self.users = dict(User.objects.using(using).exclude(unique_id=None).values_list('unique_id', 'pk'))
+        self.locations = dict(Location.objects.using(using).values_list('name', 'pk'))
+        self.hospitals = {
+            (name, location): pk
+            for pk, name, location in Hospital.objects.using(using).values_list('pk', 'name', 'location__name')
+        }
+
+    def user(self, unique_id, required=True):
+        if unique_id in (None, ''):
+            if required:
+                raise ImportRowError("missing user reference")
+            return None
+        try:
+            return self.users[unique_id]
+        except KeyError:
+            raise ImportRowError(f"unknown user {unique_id!r}")
+
+    def hospital(self, name, location):
+        key = (name, location or name)
+        if key not in self.hospitals:
+            # Hospitals are few; create the missing ones as they are first seen
+            if key[1] not in self.locations:
+                self.locations[key[1]] = Location.objects.using(self.using).create(name=key[1]).pk
+            self.hospitals[key] = Hospital.objects.using(self.using).create(
+                name=name, location_id=self.locations[key[1]]
+            ).pk
+        return self.hospitals[key]
+
+
+# 🔹 Row builders: one source row → one unsaved model instance
+def build_user(row, ids):
+    role = _value(row, 'role', required=True)
+    # 64 random bits fit unique_id's 20 characters; a four-digit suffix collides within a few hundred users
+    unique_id = _value(row, 'unique_id') or f"{role[:3].upper()}_{uuid.uuid4().hex[:16]}"
+    return User(
+        username=_value(row, 'username', required=True),
+        email=_value(row, 'email', default=''),
+        first_name=_value(row, 'first_name', default=''),
+        last_name=_value(row, 'last_name', default=''),
+        role=role,
+        unique_id=unique_id,
+        phone=_value(row, 'phone', default=''),
+        date_of_birth=_value(row, 'date_of_birth', parse_date),
+        location=_value(row, 'location', default=''),
+        password=make_password(None),
+    )
+
+
+def build_appointment(row, ids):
+    return Appointment(
+        patient_id=ids.user(row.get('patient')),
+        doctor_id=ids.user(row.get('doctor')),
+        hospital_id=ids.hospital(_value(row, 'hospital', required=True), row.get('location')),
+        date=_value(row, 'date', parse_date, required=True),
+        time=_value(row, 'time', parse_time, required=True),
+        status=_value(row, 'status', default='pending'),
+        reason=_value(row, 'reason'),
+        created_at=_value(row, 'created_at', parse_aware_datetime) or timezone.now(),
+    )
+
+
+def build_visit_record(row, ids):
+    visit = VisitRecord(
+        patient_id=ids.user(row.get('patient')),
+        doctor_id=ids.user(row.get('doctor')),
+        visit_date=_value(row, 'visit_date', parse_date, required=True),
+        hospital_name=_value(row, 'hospital_name', default=''),
+        doctor_name=_value(row, 'doctor_name', default=''),
+        current_status=_value(row, 'current_status', default='stable'),
+        improvement_score=int(_value(row, 'improvement_score', default=0)),
+        doctor_notes=_value(row, 'doctor_notes'),
+        summary=_value(row, 'summary'),
+    )
+    # bulk_create skips VisitRecord.save(), so fill the summary the same way it would
+    if not visit.summary:
+        visit.summary = f"{visit.visit_date}: {visit.current_status} ({visit.improvement_score}%)"
+    return visit
+
+
+def build_health_log(row, ids):
+    return HealthLog(
+        patient_id=ids.user(row.get('patient')),
+        date=_value(row, 'date', parse_date, required=True),
+        blood_pressure=_value(row, 'blood_pressure', default=''),
+        heart_rate=_value(row, 'heart_rate', default=''),
+        notes=_value(row, 'notes', default=''),
+    )
+
+
+def build_patient_task(row, ids):
+    duration = _value(row, 'duration_minutes')
+    return PatientTask(
+        patient_id=ids.user(row.get('patient')),
+        task_name=_value(row, 'task_name', required=True),
+        task_type=_value(row, 'task_type', default='exercise'),
+        started_at=_value(row, 'started_at', parse_aware_datetime),
+        completed_at=_value(row, 'completed_at', parse_aware_datetime),
+        duration_minutes=int(duration) if duration is not None else None,
+        status=_value(row, 'status', default='pending'),
+        feedback=_value(row, 'feedback', default=''),
+    )
+
+
+def build_mood_log(row, ids):
+    return MoodLog(
+        patient_id=ids.user(row.get('patient')),
+        mood=_value(row, 'mood', required=True),
+        logged_at=_value(row, 'logged_at', parse_aware_datetime, required=True),
+    )
+
+
+IMPORTERS = {
+    'user': (User, build_user),
+    'appointment': (Appointment, build_appointment),
+    'visitrecord': (VisitRecord, build_visit_record),
+    'healthlog': (HealthLog, build_health_log),
+    'patienttask': (PatientTask, build_patient_task),
+    'moodlog': (MoodLog, build_mood_log),
+}
+
+
+def import_file(path, model_name, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                checkpoint=None, using='default', on_error=None):
+    """Stream ``path`` into ``model_name`` in bulk_create chunks; returns (imported, skipped)
+
+    With ``checkpoint`` (a name), each chunk commits together with the count of rows done,
+    so a rerun after a crash resumes exactly after the last committed chunk.
+    """
+    model, build = IMPORTERS[model_name]
+    source = os.path.abspath(path)
+    rows_done = load_checkpoint(checkpoint, source, model_name, using)
+    ids = IdMaps(using)
+    rows = islice(read_rows(path, fmt), rows_done, None)
+    imported = skipped = 0
+
+    with historical_timestamps(model):
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            objs, line_numbers = [], []
+            for offset, row in enumerate(chunk):
+                try:
+                    objs.append(build(row, ids))
+                    line_numbers.append(rows_done + offset + 1)
+                except (ImportRowError, ValueError, TypeError) as exc:
+                    skipped += 1
+                    if on_error:
+                        on_error(rows_done + offset + 1, exc)
+            with transaction.atomic(using=using):
+                if model is User:
+                    # Users may already exist from an earlier, interrupted run
+                    model.objects.using(using).bulk_create(objs, batch_size=chunk_size, ignore_conflicts=True)
+                    found = dict(User.objects.using(using).filter(
+                        unique_id__in=[u.unique_id for u in objs]
+                    ).values_list('unique_id', 'pk'))
+                    ids.users.update(found)
+                    # ignore_conflicts drops a row whose username is taken by another user, silently
+                    dropped = [(line, u) for line, u in zip(line_numbers, objs) if u.unique_id not in found]
+                    for line, user in dropped:
+                        if on_error:
+                            on_error(line, ImportRowError(f"username {user.username!r} is taken by another user"))
+                    skipped += len(dropped)
+                    objs = [u for u in objs if u.unique_id in found]
+                else:
+                    model.objects.using(using).bulk_create(objs, batch_size=chunk_size)
+                if model in (Appointment, VisitRecord):
+                    # bulk_create sends no post_save, so link the doctors' caseloads here
+                    source = 'visit' if model is VisitRecord else 'appointment'
+                    pairs = {(obj.doctor_id, obj.patient_id) for obj in objs}
+                    CareAssignment.objects.using(using).bulk_create([
+                        CareAssignment(clinician_id=doctor_id, patient_id=patient_id, role='doctor', source=source)
+                        for doctor_id, patient_id in pairs
+                    ], batch_size=chunk_size, ignore_conflicts=True)
+                if checkpoint:
+                    save_checkpoint(checkpoint, source, model_name, rows_done + len(chunk), using)
+            imported += len(objs)
+            rows_done += len(chunk)
+
+    return imported, skipped
@@ -0,0 +1,153 @@
+import functools
+import importlib
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+# Seconds a running job may hold its claim before another worker requeues it
+LEASE_SECONDS = 600
+# Candidates read per claim attempt; losing a race just moves on to the next one
+CLAIM_BATCH = 10
+
+# 🔹 Registered functions: dotted name → callable
+REGISTRY = {}
+
+
+def background(priority=5, max_attempts=3, retry_delay=30):
+    """Register a function as a job; call ``func.delay(...)`` to queue it instead of running it inline
+
+    Arguments must be JSON-serialisable. Jobs can run more than once (retries, expired
+    leases), so the function should be safe to repeat.
+    """
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+        REGISTRY[name] = func
+        func.job_name = name
+        func.retry_delay = retry_delay
+
+        @functools.wraps(func)
+        def delay(*args, idempotency_key=None, run_after=None, priority=priority, **kwargs):
+            return enqueue(name, args, kwargs, priority=priority, max_attempts=max_attempts,
+                           idempotency_key=idempotency_key, run_after=run_after)
+
+        func.delay = delay
+        return func
+    return decorator
+
+
+def enqueue(name, args=(), kwargs=None, priority=5, max_attempts=3, idempotency_key=None, run_after=None):
+    """Queue a job; with an idempotency key, a second enqueue returns the existing job"""
+    job = BackgroundJob(
+        name=name, args=list(args), kwargs=kwargs or {}, priority=priority, max_attempts=max_attempts,
+        idempotency_key=idempotency_key, run_after=run_after or timezone.now(),
+    )
+    eager = getattr(settings, 'BACKGROUND_JOBS_EAGER', False)
+    if eager:
+        # No worker (local development): run now, still recording the outcome
+        job.status, job.attempts, job.locked_by = 'running', 1, 'eager'
+    if idempotency_key is None:
+        job.save()
+    else:
+        try:
+            with transaction.atomic():
+                job.save()
+        except IntegrityError:
+            return BackgroundJob.objects.get(idempotency_key=idempotency_key)
+    if eager:
+        run_job(job)
+    return job
+
+
+def _resolve(name):
+    if name not in REGISTRY:
+        # Importing the module runs its @background decorators
+        importlib.import_module(name.rsplit('.', 1)[0])
+    return REGISTRY[name]
+
+
+# 🔹 Worker side
+def claim_next(worker_id):
+    """Atomically take the next due job; the conditional UPDATE is the lock, no SELECT FOR UPDATE"""
+    now = timezone.now()
+    candidates = BackgroundJob.objects.filter(status='queued', run_after__lte=now).order_by(
+        'priority', 'run_after', 'id'
+    ).values_list('id', flat=True)[:CLAIM_BATCH]
+    for job_id in list(candidates):
+        claimed = BackgroundJob.objects.filter(id=job_id, status='queued').update(
+            status='running', locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return BackgroundJob.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """Run a claimed job and record the outcome; failures are retried with exponential backoff"""
+    try:
+        func = _resolve(job.name)
+        func(*job.args, **job.kwargs)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            delay = getattr(REGISTRY.get(job.name), 'retry_delay', 30) * 2 ** (job.attempts - 1)
+            job.status = 'queued'
+            job.run_after = timezone.now() + timedelta(seconds=delay)
+            logger.warning("Job %s (%s) failed, retrying in %ss", job.id, job.name, delay)
+        else:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+            logger.error("Job %s (%s) failed after %s attempts", job.id, job.name, job.attempts)
+    else:
+        job.status = 'done'
+        job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'run_after', 'last_error', 'finished_at'])
+    return job.status
+
+
+def requeue_expired(lease_seconds=LEASE_SECONDS):
+    """Return jobs whose worker died mid-run to the queue, or fail them once out of attempts
+
+    A job that kills its worker every time would otherwise be retried forever.
+    """
+    now = timezone.now()
+    expired = BackgroundJob.objects.filter(status='running', locked_at__lt=now - timedelta(seconds=lease_seconds))
+    failed = expired.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', locked_by='', finished_at=now,
+        last_error="Lease expired on the last attempt: the worker died or hung running this job",
+    )
+    if failed:
+        logger.error("%s jobs failed: their lease expired on the last attempt", failed)
+    return expired.update(status='queued', locked_by='', run_after=now)
+
+
+def work(worker_id=None, burst=False, poll_interval=1.0, stop=lambda: False):
+    """Process jobs until ``stop()`` is true (or the queue is empty, with ``burst``)"""
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    processed = 0
+    last_sweep = 0.0
+    while not stop():
+        close_old_connections()
+        if time.monotonic() - last_sweep > LEASE_SECONDS / 10:
+            requeue_expired()
+            last_sweep = time.monotonic()
+        job = claim_next(worker_id)
+        if job is None:
+            if burst:
+                break
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
+        processed += 1
+    return processed
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+# Seconds to wait for a connection or a response before counting an error
+TIMEOUT = 10
+
+
+class LoadResult:
+    def __init__(self, concurrency, duration):
+        self.concurrency = concurrency
+        self.duration = duration
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+
+    def percentile(self, q):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    @property
+    def requests(self):
+        return len(self.latencies)
+
+    @property
+    def error_rate(self):
+        total = self.requests + self.errors
+        failed = self.errors + sum(n for status, n in self.statuses.items() if status >= 500)
+        return failed / total if total else 1.0
+
+    def summary(self):
+        return {
+            'concurrency': self.concurrency,
+            'requests': self.requests,
+            'rps': round(self.requests / self.duration, 1),
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'error_rate': round(self.error_rate, 4),
+            'statuses': dict(sorted(self.statuses.items())),
+        }
+
+
+async def _read_response(reader):
+    """Minimal HTTP/1.1 response reader: returns (status, keep_alive)"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Server closed the connection")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    else:
+        await reader.read()
+        return status, False
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+async def _client(host, port, request, deadline, result):
+    """One keep-alive connection issuing requests back to back until the deadline"""
+    reader = writer = None
+    while time.monotonic() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), TIMEOUT)
+            started = time.perf_counter()
+            writer.write(request)
+            status, keep_alive = await asyncio.wait_for(_read_response(reader), TIMEOUT)
+            result.latencies.append(time.perf_counter() - started)
+            result.statuses[status] = result.statuses.get(status, 0) + 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError):
+            result.errors += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(url, concurrency, duration, headers=None):
+    """Hold ``concurrency`` connections open against ``url`` for ``duration`` seconds"""
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    lines = [f"GET {path} HTTP/1.1", f"Host: {parts.netloc}", "Connection: keep-alive"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    request = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    result = LoadResult(concurrency, duration)
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*[
+        _client(parts.hostname, parts.port or 80, request, deadline, result) for _ in range(concurrency)
+    ])
+    return result
+
+
+def capacity(summaries, max_error_rate=0.01, max_p95_ms=1000):
+    """Highest tested concurrency that stayed within the error and p95 latency limits"""
+    passing = [
+        s['concurrency'] for s in summaries
+        if s['error_rate'] <= max_error_rate and s['p95_ms'] is not None and s['p95_ms'] <= max_p95_ms
+    ]
+    return max(passing) if passing else 0
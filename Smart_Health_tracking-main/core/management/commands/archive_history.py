@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.archive import TIERS, archive_all
+from core.tasks import archive_history
+
+
+class Command(BaseCommand):
+    help = "Move health logs, moods, scores, messages and resolved SOS alerts past the horizon to the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help=f"Keep this many days hot (default {settings.ARCHIVE_HORIZON_DAYS})")
+        parser.add_argument('--batch-size', type=int, help=f"Rows per transaction (default {settings.ARCHIVE_BATCH_SIZE})")
+        parser.add_argument('--tables', nargs='*', help="Only these models, e.g. message moodlog")
+        parser.add_argument('--enqueue', action='store_true', help="Queue the run for a background worker instead")
+
+    def handle(self, *args, **options):
+        models = None
+        if options['tables']:
+            by_name = {model._meta.model_name: model for model in TIERS}
+            unknown = [name for name in options['tables'] if name.lower() not in by_name]
+            if unknown:
+                raise CommandError(f"Not archivable: {', '.join(unknown)} (choose from {', '.join(by_name)})")
+            models = [by_name[name.lower()] for name in options['tables']]
+
+        if options['enqueue']:
+            if models:
+                raise CommandError("--enqueue archives every table; drop --tables.")
+            job = archive_history.delay(days=options['days'], batch_size=options['batch_size'],
+                                        idempotency_key=f"archive_history:{timezone.localdate()}")
+            self.stdout.write(f"Queued job {job.id} ({job.status})")
+            return
+
+        started = time.perf_counter()
+        moved = archive_all(days=options['days'], batch_size=options['batch_size'], models=models)
+        summary = ', '.join(f"{name}={count}" for name, count in moved.items())
+        self.stdout.write(f"Archived in {time.perf_counter() - started:.1f}s: {summary}")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.caseload import backfill
+from core.models import CareAssignment, User
+
+
+class Command(BaseCommand):
+    help = "Link doctors and therapists to patients from existing appointments, visit records and task feedback"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--feedback-therapist',
+                            help="Username or ID of the therapist who wrote existing task feedback "
+                                 "(needed when there is more than one therapist)")
+
+    def handle(self, *args, **options):
+        therapist_id = None
+        if options['feedback_therapist']:
+            therapist = User.objects.filter(role='therapist', username=options['feedback_therapist']).first() or \
+                User.objects.filter(role='therapist', unique_id=options['feedback_therapist']).first()
+            if therapist is None:
+                raise CommandError(f"No therapist {options['feedback_therapist']!r}")
+            therapist_id = therapist.pk
+
+        before = CareAssignment.objects.count()
+        found = backfill(feedback_therapist_id=therapist_id)
+        summary = ', '.join(f"{source}={count}" for source, count in found.items())
+        self.stdout.write(f"Candidate links: {summary}; {CareAssignment.objects.count() - before} new assignments")
+        if therapist_id is None and not found['feedback'] and User.objects.filter(role='therapist').count() > 1:
+            self.stdout.write("Task feedback skipped: pass --feedback-therapist to attribute it.")
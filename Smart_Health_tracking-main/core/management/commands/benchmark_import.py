@@ -0,0 +1,97 @@
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.importers import DEFAULT_CHUNK_SIZE, import_file
+from core.models import PatientTask
+
+
+class Command(BaseCommand):
+    help = "Measure import_history throughput (rows/s) against a throwaway copy of a database alias"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000, help="Rows per history table")
+        parser.add_argument('--patients', type=int, default=500)
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--database', default='default',
+                            help="Alias to benchmark (e.g. a Postgres alias); a test database is created for it")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        connection = connections[alias]
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with tempfile.TemporaryDirectory() as workdir:
+                sources = self._write_sources(workdir, options)
+                self.stdout.write(f"{connection.vendor} ({alias}), chunk size {options['chunk_size']}")
+                for model_name, path in sources:
+                    started = time.perf_counter()
+                    imported, skipped = import_file(
+                        path, model_name, chunk_size=options['chunk_size'], using=alias
+                    )
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(
+                        f"  {model_name:<12} {imported:>8} rows  {elapsed:7.2f}s  {imported / elapsed:>10,.0f} rows/s"
+                    )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def _write_sources(self, workdir, options):
+        rng = random.Random(options['seed'])
+        rows = options['rows']
+        patients = [f"PAT_B{i}" for i in range(options['patients'])]
+        doctors = [f"DOC_B{i}" for i in range(max(1, options['patients'] // 50))]
+        start = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+        task_types = [key for key, label in PatientTask.TASK_TYPE_CHOICES]
+
+        def dump(name, records):
+            path = os.path.join(workdir, f"{name}.jsonl")
+            with open(path, 'w', encoding='utf-8') as handle:
+                for record in records:
+                    handle.write(json.dumps(record) + '\n')
+            return path
+
+        users = [{'username': uid.lower(), 'unique_id': uid, 'role': 'patient'} for uid in patients]
+        users += [{'username': uid.lower(), 'unique_id': uid, 'role': 'doctor'} for uid in doctors]
+
+        def tasks():
+            for _ in range(rows):
+                began = start + timedelta(minutes=rng.randrange(60 * 24 * 365 * 5))
+                minutes = rng.randint(5, 90)
+                yield {
+                    'patient': rng.choice(patients), 'task_type': rng.choice(task_types),
+                    'task_name': 'Imported task', 'status': 'completed',
+                    'started_at': began.isoformat(),
+                    'completed_at': (began + timedelta(minutes=minutes)).isoformat(),
+                    'duration_minutes': minutes,
+                }
+
+        def moods():
+            for _ in range(rows):
+                logged = start + timedelta(minutes=rng.randrange(60 * 24 * 365 * 5))
+                yield {'patient': rng.choice(patients), 'mood': rng.choice(['happy', 'sad', 'neutral']),
+                       'logged_at': logged.isoformat()}
+
+        def visits():
+            for _ in range(rows):
+                yield {
+                    'patient': rng.choice(patients), 'doctor': rng.choice(doctors),
+                    'visit_date': (date(2020, 1, 1) + timedelta(days=rng.randrange(365 * 5))).isoformat(),
+                    'hospital_name': 'Benchmark Hospital', 'doctor_name': 'Dr. Bench',
+                    'current_status': 'improving', 'improvement_score': rng.randint(0, 100),
+                }
+
+        return [
+            ('user', dump('users', users)),
+            ('patienttask', dump('tasks', tasks())),
+            ('moodlog', dump('moods', moods())),
+            ('visitrecord', dump('visits', visits())),
+        ]
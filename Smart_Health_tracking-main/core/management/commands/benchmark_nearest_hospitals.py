@@ -0,0 +1,62 @@
+import heapq
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.geo import KDTree, chord_to_km, to_xyz
+
+
+class Command(BaseCommand):
+    help = "Time k-nearest queries on the hospital KD-tree against a full scan, and check they agree"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--facilities', type=int, default=50000)
+        parser.add_argument('--queries', type=int, default=500)
+        parser.add_argument('--k', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        # Roughly India's bounding box, denser near a few metros as real facilities are
+        metros = [(12.97, 77.59), (19.08, 72.88), (28.61, 77.21), (13.08, 80.27), (22.57, 88.36)]
+
+        def place():
+            if rng.random() < 0.6:
+                lat, lng = rng.choice(metros)
+                return lat + rng.gauss(0, 0.3), lng + rng.gauss(0, 0.3)
+            return rng.uniform(8, 35), rng.uniform(68, 97)
+
+        coordinates = [place() for _ in range(options['facilities'])]
+        points = [to_xyz(lat, lng) for lat, lng in coordinates]
+        ids = list(range(len(points)))
+
+        started = time.perf_counter()
+        tree = KDTree(points, ids)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        k = options['k']
+        tree_ms, scan_ms = [], []
+        for _ in range(options['queries']):
+            target = to_xyz(*place())
+            started = time.perf_counter()
+            found = tree.nearest(target, k)
+            tree_ms.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            expected = heapq.nsmallest(k, ((sum((a - b) ** 2 for a, b in zip(point, target)), i)
+                                           for i, point in zip(ids, points)))
+            scan_ms.append((time.perf_counter() - started) * 1000)
+            if [i for _, i in found] != [i for _, i in expected]:
+                raise CommandError(f"KD-tree and scan disagree for {target}")
+
+        tree_ms.sort()
+        scan_ms.sort()
+        self.stdout.write(f"{options['facilities']} facilities, k={k}, {options['queries']} queries; "
+                          f"tree built in {build_ms:.0f} ms")
+        self.stdout.write(f"{'':<10} {'p50 ms':>8} {'p95 ms':>8}")
+        for label, timings in [('kd-tree', tree_ms), ('full scan', scan_ms)]:
+            p95 = timings[min(len(timings) - 1, int(0.95 * len(timings)))]
+            self.stdout.write(f"{label:<10} {statistics.median(timings):>8.3f} {p95:>8.3f}")
+        self.stdout.write(f"Results identical; farthest of the last k at {chord_to_km(found[-1][0]):.1f} km")
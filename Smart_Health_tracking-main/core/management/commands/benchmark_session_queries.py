@@ -0,0 +1,98 @@
+import logging
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.urls import reverse
+
+from core.management.commands.benchmark_views import build_cases
+from core.synthetic import generate_population
+
+ENDPOINTS = ['send_message', 'delete_message', 'ajax_load_hospitals', 'message_box']
+
+# label → (settings overrides, clear the cache before every request, use a cache shared between processes)
+CONFIGURATIONS = {
+    # Stock Django: session row and User row read from the database on every request
+    'database': ({
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'AUTHENTICATION_BACKENDS': ['django.contrib.auth.backends.ModelBackend'],
+    }, True, False),
+    # Sessions and users are only cached when the cache is shared (core.auth.cache_is_shared)
+    'cached': ({}, False, True),
+}
+
+
+class Command(BaseCommand):
+    help = "Queries and latency per request on the messaging endpoints, database vs cached sessions/auth"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        logging.getLogger('core.middleware').setLevel(logging.CRITICAL)
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        media_root = tempfile.mkdtemp()
+        try:
+            with override_settings(MEDIA_ROOT=media_root, ADMISSION_ENABLED=False):
+                population = generate_population(patients=options['patients'], doctors=3, therapists=3)
+                cases = build_cases(population)
+                results = {}
+                for label, (overrides, cold, shared) in CONFIGURATIONS.items():
+                    if shared:
+                        overrides = {**overrides, 'CACHES': {'default': {
+                            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                            'LOCATION': os.path.join(media_root, 'cache'),
+                        }}}
+                    # Each configuration starts from the same rows: messages sent here are rolled back
+                    with override_settings(**overrides), transaction.atomic():
+                        cache.clear()
+                        client = Client()
+                        client.force_login(population.patients[0], backend=settings.AUTHENTICATION_BACKENDS[0])
+                        results[label] = {
+                            name: self._measure(client, name, cases[name], options['repeat'], cold)
+                            for name in ENDPOINTS
+                        }
+                        transaction.set_rollback(True)
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        before, after = results['database'], results['cached']
+        self.stdout.write(f"{'endpoint':<22} {'queries':>12} {'median ms':>18}")
+        for name in ENDPOINTS:
+            self.stdout.write(
+                f"{name:<22} {before[name]['queries']:>5} → {after[name]['queries']:<4} "
+                f"{before[name]['median_ms']:>8.2f} → {after[name]['median_ms']:<7.2f}"
+            )
+
+    def _measure(self, client, name, case, repeat, cold):
+        _, method, setup = case
+        query_counts, latencies = [], []
+        for i in range(repeat + 1):
+            args, data, query = setup()
+            url = reverse(name, args=args)
+            if cold:
+                cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.post(url, data or {}) if method == 'post' else client.get(url, query or {})
+                elapsed = (time.perf_counter() - started) * 1000
+            assert response.status_code == 200, f"{name} returned {response.status_code}"
+            if i:  # first request warms lazy imports and, when cached, the session and user
+                query_counts.append(len(queries))
+                latencies.append(elapsed)
+        return {'queries': int(statistics.median(query_counts)), 'median_ms': statistics.median(latencies)}
@@ -0,0 +1,92 @@
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core import watch
+from core.models import ExerciseVideo, User, VideoProgress
+
+
+class Command(BaseCommand):
+    help = "Ingest simulated player heartbeats one write each, then coalesced in batches, and compare"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=300, help="Patients watching at the same time")
+        parser.add_argument('--minutes', type=int, default=10, help="Simulated viewing time per session")
+        parser.add_argument('--videos', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            therapist = User.objects.create(username='bench_therapist', role='therapist')
+            patients = User.objects.bulk_create([
+                User(username=f'bench_patient_{i}', role='patient') for i in range(options['sessions'])
+            ])
+            videos = ExerciseVideo.objects.bulk_create([
+                ExerciseVideo(therapist=therapist, title=f"Bench video {i}", video_file=f'exercise_videos/{i}.mp4')
+                for i in range(options['videos'])
+            ])
+            rng = random.Random(options['seed'])
+            sessions = [(patient.id, rng.choice(videos).id, rng.uniform(300, 1800))
+                        for patient in patients]
+            heartbeats = list(self._heartbeats(sessions, options['minutes']))
+
+            results = {}
+            for label, ingest in [('write per heartbeat', self._direct), ('coalesced', self._coalesced)]:
+                VideoProgress.objects.all().delete()
+                statements = []
+                with connection.execute_wrapper(lambda execute, *args: statements.append(1) or execute(*args)):
+                    started = time.perf_counter()
+                    ingest(heartbeats)
+                    elapsed = time.perf_counter() - started
+                state = sorted((*row[:4], row[4] is not None) for row in VideoProgress.objects.values_list(
+                    'patient_id', 'video_id', 'position_seconds', 'watched_seconds', 'completed_at'))
+                results[label] = (elapsed, len(statements), state)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        (_, _, direct_state), (_, _, coalesced_state) = results.values()
+        if direct_state != coalesced_state:
+            raise CommandError("Coalesced ingestion left different progress rows than writing each heartbeat.")
+        self.stdout.write(f"{len(heartbeats)} heartbeats from {len(sessions)} sessions over "
+                          f"{options['minutes']} min, every {settings.VIDEO_HEARTBEAT_SECONDS}s")
+        self.stdout.write(f"{'':<20} {'seconds':>8} {'statements':>10} {'heartbeats/s':>13}")
+        for label, (elapsed, statements, _) in results.items():
+            self.stdout.write(f"{label:<20} {elapsed:>8.2f} {statements:>10} {len(heartbeats) / elapsed:>13.0f}")
+        self.stdout.write("Progress rows identical.")
+
+    def _heartbeats(self, sessions, minutes):
+        """(simulated second, key, parsed heartbeat) in arrival order"""
+        interval = settings.VIDEO_HEARTBEAT_SECONDS
+        for second in range(interval, minutes * 60 + 1, interval):
+            for patient_id, video_id, duration in sessions:
+                if second - interval < duration:
+                    yield second, (patient_id, video_id), watch.parse_heartbeat(
+                        {'position': second, 'played': interval, 'duration': duration})
+
+    def _direct(self, heartbeats):
+        for _, (patient_id, video_id), entry in heartbeats:
+            with transaction.atomic():
+                row, _ = VideoProgress.objects.select_for_update().get_or_create(
+                    patient_id=patient_id, video_id=video_id)
+                watch.apply(row, entry).save()
+
+    def _coalesced(self, heartbeats):
+        # Flushes on size as the live buffer does, and on simulated rather than wall-clock age
+        buffer = watch.HeartbeatBuffer(settings.VIDEO_PROGRESS_FLUSH_SIZE, math.inf)
+        last_flush = 0
+        for second, key, entry in heartbeats:
+            if second - last_flush >= settings.VIDEO_PROGRESS_FLUSH_SECONDS:
+                watch.write(buffer.drain())
+                last_flush = second
+            if buffer.add(key, entry):
+                watch.write(buffer.drain())
+        watch.write(buffer.drain())
@@ -0,0 +1,302 @@
+import itertools
+import json
+import logging
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import date, time as dt_time, timedelta
+
+import django
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from core import analytics, urls as core_urls, watch
+from core.models import (
+    User, Appointment, CareAssignment, Message, PatientTask, PatientVisit, SOSAlert, ExerciseVideo, VisitRecord,
+)
+from core.synthetic import generate_population
+
+
+def build_cases(population):
+    """url_name → (role, method, setup); setup() returns (url args, POST data, GET query)"""
+    patient = population.patients[0]
+    doctor = population.doctors[0]
+    therapist = population.therapists[0]
+    hospital = population.hospitals[0]
+    fresh = itertools.count(1)
+    for clinician in (doctor, therapist):
+        CareAssignment.objects.get_or_create(clinician=clinician, patient=patient, defaults={'role': clinician.role})
+
+    def appointment():
+        return Appointment.objects.create(
+            patient=patient, doctor=doctor, hospital=hospital,
+            date=date.today() + timedelta(days=next(fresh)), time=dt_time(10), status='pending',
+        )
+
+    def in_progress_task():
+        return PatientTask.objects.create(patient=patient, task_name='Exercise', status='in_progress',
+                                          started_at=timezone.now() - timedelta(minutes=20))
+
+    def alert():
+        return SOSAlert.objects.create(patient=patient, status='active')
+
+    def sync_batch():
+        # A day offline: 20 tasks started and finished, then resent once as a lost-reply retry would
+        keys = [f'bench-{next(fresh)}' for _ in range(20)]
+        started = timezone.now() - timedelta(days=1)
+        events = [event for key in keys for event in (
+            {'action': 'start', 'key': key, 'task_type': 'gardening', 'at': started.isoformat()},
+            {'action': 'complete', 'key': key, 'at': (started + timedelta(minutes=30)).isoformat()},
+        )]
+        return (), json.dumps({'events': events * 2}), None
+
+    visit_record = VisitRecord.objects.filter(doctor=doctor).first() or VisitRecord.objects.create(
+        patient=patient, doctor=doctor, hospital_name=hospital.name, doctor_name='Dr. Bench',
+        current_status='stable',
+    )
+    legacy_visit = PatientVisit.objects.filter(patient=patient).first() or PatientVisit.objects.create(
+        patient=patient, doctor=doctor, visit_date=date.today(), hospital_name=hospital.name,
+        doctor_name='Dr. Bench',
+    )
+    task = PatientTask.objects.filter(patient=patient).first()
+    video = ExerciseVideo.objects.filter(therapist=therapist).first() or ExerciseVideo.objects.create(
+        therapist=therapist, title='Bench video', video_file='exercise_videos/bench.mp4',
+    )
+    confirm_target = appointment()
+    clip = default_storage.save('exercise_videos/bench_clip.mp4', ContentFile(b'bench clip'))
+
+    if analytics.available():
+        analytics.refresh_cohort_analytics()
+
+    none = lambda: ((), None, None)  # noqa: E731
+    return {
+        'register': ('anonymous', 'get', none),
+        'login': ('anonymous', 'get', none),
+        'patient_profile': ('patient', 'get', none),
+        'delete_profile_photo': ('patient', 'get', none),
+        'doctor_profile': ('doctor', 'get', none),
+        'therapist_profile': ('therapist', 'get', none),
+        'patient_home': ('patient', 'get', none),
+        'choose_therapist': ('patient', 'post', lambda: ((), {'therapist': therapist.id}, None)),
+        'doctor_dashboard': ('doctor', 'get', none),
+        'therapist_dashboard': ('therapist', 'get', none),
+        'visit_details': ('patient', 'get', none),
+        'submit_health_log': ('patient', 'get', none),
+        'log_visit_by_id': ('doctor', 'post', lambda: ((appointment().id,), {}, None)),
+        'update_visit_record': ('doctor', 'get', lambda: ((visit_record.id,), None, None)),
+        'lookup_patient': ('doctor', 'get', none),
+        'view_patient_profile': ('therapist', 'get', lambda: ((patient.unique_id,), None, None)),
+        'patient_profile_section': ('therapist', 'get',
+                                    lambda: ((patient.unique_id, 'tasks'), None, {'page': 2})),
+        'export_patient_record': ('doctor', 'get', lambda: ((patient.unique_id,), None, None)),
+        'patient_progress_chart': ('doctor', 'get', lambda: ((patient.id,), None, None)),
+        'progress_series': ('doctor', 'get', lambda: ((patient.id,), None, {'series': 'scores', 'points': 100})),
+        'add_feedback': ('therapist', 'get', lambda: ((task.id,), None, None)),
+        'add_therapist_notes_inline': ('therapist', 'post',
+                                       lambda: ((legacy_visit.id,), {'therapist_notes': 'Bench'}, None)),
+        'start_task': ('patient', 'post', lambda: ((), {'task_type': 'yoga'}, None)),
+        'complete_task': ('patient', 'post', lambda: ((in_progress_task().id,), {}, None)),
+        'confirm_appointment': ('doctor', 'get', lambda: ((confirm_target.id,), None, None)),
+        'cancel_appointment': ('doctor', 'post', lambda: ((appointment().id,), {}, None)),
+        'bulk_confirm_appointments': ('doctor', 'post', lambda: (
+            (), {'appointment_ids': [appointment().id for _ in range(10)]}, None)),
+        'bulk_cancel_appointments': ('doctor', 'post', lambda: (
+            (), {'appointment_ids': [appointment().id for _ in range(10)]}, None)),
+        'ajax_load_hospitals': ('patient', 'get', lambda: ((), None, {'location': hospital.location_id})),
+        'nearest_hospitals': ('patient', 'get', lambda: ((), None, {'lat': 12.97, 'lng': 77.59, 'k': 5})),
+        'log_mood': ('patient', 'post', lambda: ((), {'mood': 'happy'}, None)),
+        'message_box': ('patient', 'get', lambda: ((), None, {'role': 'doctor', 'user': doctor.id})),
+        'send_message': ('patient', 'post', lambda: ((), {'receiver_id': doctor.id, 'content': 'Hi'}, None)),
+        'delete_message': ('patient', 'post', lambda: (
+            (Message.objects.create(sender=patient, receiver=doctor, content='Bye').id,), {}, None)),
+        'send_sos_alert': ('patient', 'post', lambda: ((), {'message': 'Help'}, None)),
+        'acknowledge_sos_alert': ('doctor', 'post', lambda: ((alert().id,), {}, None)),
+        'resolve_sos_alert': ('therapist', 'post', lambda: ((alert().id,), {}, None)),
+        'upload_exercise_video': ('therapist', 'get', none),
+        'therapist_videos': ('therapist', 'get', none),
+        'view_exercise_videos': ('patient', 'get', none),
+        'watch_video': ('patient', 'get', lambda: ((video.id,), None, None)),
+        'video_progress': ('patient', 'post', lambda: ((video.id,), json.dumps(
+            {'position': 15.0 * next(fresh), 'played': 15.0, 'duration': 3600.0}), None)),
+        'delete_video': ('therapist', 'get', lambda: ((video.id,), None, None)),
+        'change_feed': ('patient', 'get', lambda: ((), None, {'since': 0})),
+        'sync_tasks': ('patient', 'post', sync_batch),
+        'metrics': ('staff', 'get', none),
+        'analytics_dashboard': ('staff', 'get', none),
+        'protected_media': ('patient', 'get', lambda: ((clip,), None, None)),
+    }
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = "Benchmark every core URL against a seeded synthetic population; optionally compare to a baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=100)
+        parser.add_argument('--doctors', type=int, default=10)
+        parser.add_argument('--therapists', type=int, default=10)
+        parser.add_argument('--years', type=int, default=1)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--only', nargs='*', help="Benchmark only these URL names")
+        parser.add_argument('--output', help="Write results as JSON to this path")
+        parser.add_argument('--baseline', help="Earlier JSON results to compare against")
+        parser.add_argument('--max-regression', type=float,
+                            help="Fail if any median latency is this many percent slower than the baseline")
+
+    def handle(self, *args, **options):
+        if options['verbosity'] < 2:
+            # 500s and slow-request warnings are reported in the results table instead
+            for name in ('django.request', 'core.middleware'):
+                logging.getLogger(name).setLevel(logging.CRITICAL)
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        # Uploads and deletes made by the cases stay out of the real media directory
+        media_root = tempfile.mkdtemp()
+        try:
+            # Measures the views themselves; back-to-back requests would trip the rate limit
+            with override_settings(MEDIA_ROOT=media_root, ADMISSION_ENABLED=False):
+                results = self._run(options)
+        finally:
+            # Buffered heartbeats belong to the test database, not the real one at exit
+            watch.flush()
+            shutil.rmtree(media_root, ignore_errors=True)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if options['baseline']:
+            self._compare(results, options['baseline'], options['max_regression'])
+
+    def _run(self, options):
+        started = time.perf_counter()
+        population = generate_population(
+            patients=options['patients'], doctors=options['doctors'], therapists=options['therapists'],
+            years=options['years'], seed=options['seed'],
+        )
+        self.stdout.write(
+            f"Generated population in {time.perf_counter() - started:.1f}s: "
+            + ', '.join(f"{name}={count}" for name, count in sorted(population.counts.items()))
+        )
+
+        staff = User.objects.create(username='bench_staff', role='doctor', is_staff=True)
+        logins = {
+            'patient': population.patients[0], 'doctor': population.doctors[0],
+            'therapist': population.therapists[0], 'staff': staff,
+        }
+        cases = build_cases(population)
+        url_names = [p.name for p in core_urls.urlpatterns if isinstance(p, URLPattern) and p.name]
+        missing = [name for name in url_names if name not in cases]
+        if missing:
+            self.stderr.write(f"No benchmark case for: {', '.join(missing)}")
+
+        results = {
+            'meta': {
+                'params': {k: options[k] for k in ('patients', 'doctors', 'therapists', 'years', 'seed', 'repeat')},
+                'rows': population.counts,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'database': connection.vendor,
+                'timestamp': timezone.now().isoformat(),
+            },
+            'views': {},
+        }
+        self.stdout.write(f"{'view':<28} {'status':>6} {'median ms':>10} {'p95 ms':>8} {'queries':>8} {'peak KB':>8}")
+        for name in url_names:
+            if name not in cases or (options['only'] and name not in options['only']):
+                continue
+            role, method, setup = cases[name]
+            client = Client(raise_request_exception=False)
+            if role != 'anonymous':
+                client.force_login(logins[role])
+            result = self._measure(client, name, method, setup, options['repeat'])
+            results['views'][name] = result
+            self.stdout.write(
+                f"{name:<28} {result['status']:>6} {result['latency_ms']['median']:>10.2f} "
+                f"{result['latency_ms']['p95']:>8.2f} {result['queries']:>8} {result['peak_memory_kb']:>8.0f}"
+            )
+        return results
+
+    def _request(self, client, name, method, prepared):
+        args, data, query = prepared
+        url = reverse(name, args=args)
+        if method == 'get':
+            response = client.get(url, query or {})
+        elif isinstance(data, str):  # JSON body
+            response = client.post(url, data, content_type='application/json')
+        else:
+            response = client.post(url, data or {})
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def _measure(self, client, name, method, setup, repeat):
+        self._request(client, name, method, setup())  # warm caches and lazy imports
+        latencies, query_counts = [], []
+        status = None
+        for _ in range(repeat):
+            # Fixtures the case needs (a fresh appointment, task or alert) are not the view's cost
+            prepared = setup()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = self._request(client, name, method, prepared)
+                latencies.append((time.perf_counter() - started) * 1000)
+            query_counts.append(len(queries))
+            status = response.status_code
+
+        # Memory is traced on a separate run so tracing overhead doesn't skew latency
+        prepared = setup()
+        tracemalloc.start()
+        self._request(client, name, method, prepared)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return {
+            'status': status,
+            'latency_ms': {
+                'median': statistics.median(latencies),
+                'p95': _percentile(latencies, 0.95),
+                'min': min(latencies),
+            },
+            'queries': int(statistics.median(query_counts)),
+            'peak_memory_kb': peak / 1024,
+        }
+
+    def _compare(self, results, baseline_path, max_regression):
+        with open(baseline_path, encoding='utf-8') as handle:
+            baseline = json.load(handle)['views']
+        regressions = []
+        self.stdout.write(f"\n{'view':<28} {'median ms':>18} {'change':>8} {'queries':>10}")
+        for name, current in results['views'].items():
+            before = baseline.get(name)
+            if not before:
+                continue
+            old_ms, new_ms = before['latency_ms']['median'], current['latency_ms']['median']
+            change = (new_ms - old_ms) / old_ms * 100 if old_ms else 0.0
+            self.stdout.write(
+                f"{name:<28} {old_ms:>8.2f} → {new_ms:>7.2f} {change:>+7.0f}% "
+                f"{before['queries']:>4} → {current['queries']:<4}"
+            )
+            if max_regression is not None and change > max_regression:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(f"Slower than baseline by more than {max_regression}%: {', '.join(regressions)}")
@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import analytics
+from core.tasks import cohort_analytics
+
+
+class Command(BaseCommand):
+    help = "Compute the cohort analytics report /analytics/ shows and report timings; run daily"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help="Print the full report as JSON")
+        parser.add_argument('--enqueue', action='store_true', help="Queue the run for a background worker instead")
+
+    def handle(self, *args, **options):
+        if not analytics.available():
+            raise CommandError("Cohort analytics need numpy and pandas installed.")
+        if options['enqueue']:
+            job = cohort_analytics.delay(idempotency_key=f"cohort_analytics:{timezone.localdate()}")
+            self.stdout.write(f"Queued job {job.id} ({job.status})")
+            return
+        report = analytics.refresh_cohort_analytics()
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2, default=str))
+            return
+        rows = ', '.join(f"{name}={count}" for name, count in sorted(report['rows'].items()))
+        self.stdout.write(
+            f"Rows: {rows}\n"
+            f"Fetch {report['timings']['fetch_seconds']}s, compute {report['timings']['compute_seconds']}s\n"
+            f"Adherence {report['adherence']['overall_pct']}%, "
+            f"{report['recovery']['recovered']}/{report['recovery']['patients']} patients recovered"
+        )
@@ -0,0 +1,50 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from core.archive import purge_deleted_messages
+from core.db import enable_incremental_vacuum, incremental_vacuum
+from core.tasks import compact_messages
+
+
+class Command(BaseCommand):
+    help = "Hard-delete soft-deleted messages past the retention window, then reclaim the space on SQLite"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help=f"Retention after deletion in days (default {settings.MESSAGE_PURGE_DAYS})")
+        parser.add_argument('--batch-size', type=int, help=f"Rows per delete (default {settings.ARCHIVE_BATCH_SIZE})")
+        parser.add_argument('--pause', type=float, default=0.0, help="Seconds to sleep between batches")
+        parser.add_argument('--dry-run', action='store_true', help="Only count purgeable messages")
+        parser.add_argument('--enqueue', action='store_true', help="Queue the run for a background worker instead")
+        parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                            help="One-off: convert the SQLite file to auto_vacuum=INCREMENTAL (runs a full VACUUM)")
+
+    def handle(self, *args, **options):
+        if options['enable_incremental_vacuum'] and connection.vendor == 'sqlite':
+            started = time.perf_counter()
+            enable_incremental_vacuum(connection)
+            self.stdout.write(f"Enabled incremental vacuum in {time.perf_counter() - started:.1f}s")
+
+        if options['enqueue']:
+            job = compact_messages.delay(days=options['days'], batch_size=options['batch_size'],
+                                         idempotency_key=f"compact_messages:{timezone.localdate()}")
+            self.stdout.write(f"Queued job {job.id} ({job.status})")
+            return
+
+        started = time.perf_counter()
+        purged = purge_deleted_messages(days=options['days'], batch_size=options['batch_size'],
+                                        pause=options['pause'], dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f"{purged} messages would be purged")
+            return
+        released = incremental_vacuum(connection) if purged else 0
+        if released is None:
+            space = "space reused by SQLite internally (run with --enable-incremental-vacuum once to release it)" \
+                if connection.vendor == 'sqlite' else "space reclaimed by the database's own vacuum"
+        else:
+            space = f"{released} pages released"
+        self.stdout.write(f"Purged {purged} messages in {time.perf_counter() - started:.1f}s; {space}")
@@ -0,0 +1,95 @@
+import asyncio
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import capacity, run_load
+
+WSGI_PORT = 8101
+ASGI_PORT = 8102
+
+
+def _wsgi_command(port):
+    if importlib.util.find_spec('gunicorn'):
+        return [sys.executable, '-m', 'gunicorn', 'smart_health.wsgi:application',
+                '--bind', f'127.0.0.1:{port}', '--workers', '1', '--threads', '8']
+    # Threaded development server, the WSGI deployment this project ships with
+    return [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}', '--noreload']
+
+
+def _asgi_command(port):
+    if importlib.util.find_spec('uvicorn'):
+        return [sys.executable, '-m', 'uvicorn', 'smart_health.asgi:application',
+                '--host', '127.0.0.1', '--port', str(port), '--workers', '1', '--no-access-log']
+    if importlib.util.find_spec('daphne'):
+        return [sys.executable, '-m', 'daphne', '-b', '127.0.0.1', '-p', str(port), 'smart_health.asgi:application']
+    raise CommandError("Install uvicorn or daphne to start the ASGI server, or pass --asgi-url.")
+
+
+def _wait_for_port(port, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(('127.0.0.1', port)) == 0:
+                return
+        time.sleep(0.2)
+    raise CommandError(f"Server on port {port} did not start")
+
+
+class Command(BaseCommand):
+    help = "Load-test the same endpoint on the WSGI and ASGI deployments at rising concurrency"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/ajax/load-hospitals/?location=1', help="Endpoint to load")
+        parser.add_argument('--wsgi-url', help="Running WSGI server (default: start one on port 8101)")
+        parser.add_argument('--asgi-url', help="Running ASGI server (default: start one on port 8102)")
+        parser.add_argument('--levels', type=int, nargs='+', default=[10, 50, 100, 200, 400],
+                            help="Concurrent connections to hold at each step")
+        parser.add_argument('--duration', type=float, default=10, help="Seconds per step")
+        parser.add_argument('--session', help="sessionid cookie for endpoints that need login")
+        parser.add_argument('--max-p95-ms', type=float, default=1000, help="Latency limit for capacity")
+
+    def handle(self, *args, **options):
+        headers = {'Cookie': f"sessionid={options['session']}"} if options['session'] else {}
+        servers = []
+        try:
+            targets = {}
+            for label, url, port, command, async_views in [
+                ('wsgi', options['wsgi_url'], WSGI_PORT, _wsgi_command, '0'),
+                ('asgi', options['asgi_url'], ASGI_PORT, _asgi_command, '1'),
+            ]:
+                if not url:
+                    env = dict(os.environ, SMART_HEALTH_ASYNC_VIEWS=async_views)
+                    argv = command(port)
+                    self.stdout.write(f"Starting {label}: {' '.join(argv[1:])}")
+                    servers.append(subprocess.Popen(argv, env=env, stdout=subprocess.DEVNULL,
+                                                    stderr=subprocess.DEVNULL))
+                    _wait_for_port(port)
+                    url = f"http://127.0.0.1:{port}"
+                targets[label] = url.rstrip('/') + options['path']
+
+            results = {}
+            for label, target in targets.items():
+                self.stdout.write(f"\n{label.upper()} {target}")
+                self.stdout.write(f"{'conns':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+                results[label] = []
+                for level in options['levels']:
+                    summary = asyncio.run(run_load(target, level, options['duration'], headers)).summary()
+                    results[label].append(summary)
+                    self.stdout.write(
+                        f"{level:>6} {summary['rps']:>8} {summary['p50_ms'] or 0:>8.1f} "
+                        f"{summary['p95_ms'] or 0:>8.1f} {summary['p99_ms'] or 0:>8.1f} {summary['error_rate']:>7.1%}"
+                    )
+        finally:
+            for server in servers:
+                server.terminate()
+                server.wait()
+
+        self.stdout.write(f"\nCapacity (error rate <= 1%, p95 <= {options['max_p95_ms']:.0f} ms):")
+        for label, summaries in results.items():
+            self.stdout.write(f"  {label}: {capacity(summaries, max_p95_ms=options['max_p95_ms'])} connections")
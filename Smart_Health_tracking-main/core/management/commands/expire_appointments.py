@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.appointments import expire_stale
+from core.tasks import expire_appointments
+
+
+class Command(BaseCommand):
+    help = "Mark pending appointments dated before today as expired"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enqueue', action='store_true', help="Queue the run for a background worker instead")
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            job = expire_appointments.delay(idempotency_key=f"expire_appointments:{timezone.localdate()}")
+            self.stdout.write(f"Queued job {job.id} ({job.status})")
+            return
+        self.stdout.write(f"Expired {expire_stale()} pending appointments")
@@ -0,0 +1,69 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core import exports
+from core.models import User
+
+
+def _init_worker(settings_module):
+    """Give each pool process its own Django setup and database connections"""
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+    django.setup()
+    connections.close_all()
+
+
+def _export_one(patient_id, output_dir, fmt):
+    patient = User.objects.get(pk=patient_id)
+    counts = exports.write_patient_export(patient, os.path.join(output_dir, patient.unique_id), fmt)
+    return patient.unique_id, counts
+
+
+class Command(BaseCommand):
+    help = "Export patients' full history (tasks, visits, vitals, moods, scores, messages) to CSV or Parquet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('unique_ids', nargs='*', help="Patient unique IDs to export")
+        parser.add_argument('--all', action='store_true', help="Export every patient")
+        parser.add_argument('--output-dir', default='exports', help="Directory to write into")
+        parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+        parser.add_argument('--workers', type=int, default=1,
+                            help="Process pool size for bulk exports (1 = export in this process)")
+
+    def handle(self, *args, **options):
+        fmt = options['format']
+        if fmt not in exports.FORMATS:
+            raise CommandError("Parquet export needs pyarrow installed.")
+
+        patients = User.objects.filter(role='patient')
+        if not options['all']:
+            if not options['unique_ids']:
+                raise CommandError("Pass patient unique IDs or --all.")
+            patients = patients.filter(unique_id__in=options['unique_ids'])
+        patient_ids = list(patients.order_by('pk').values_list('pk', flat=True))
+        if not patient_ids:
+            raise CommandError("No matching patients.")
+
+        output_dir = options['output_dir']
+        workers = max(1, options['workers'])
+
+        if workers == 1:
+            for patient_id in patient_ids:
+                self._report(*_export_one(patient_id, output_dir, fmt))
+            return
+
+        # Connections must not be shared with forked children
+        connections.close_all()
+        settings_module = os.environ.get('DJANGO_SETTINGS_MODULE', 'smart_health.settings')
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(settings_module,)) as pool:
+            futures = [pool.submit(_export_one, pid, output_dir, fmt) for pid in patient_ids]
+            for future in as_completed(futures):
+                self._report(*future.result())
+
+    def _report(self, unique_id, counts):
+        total = sum(counts.values())
+        self.stdout.write(f"{unique_id}: {total} rows ({', '.join(f'{t}={n}' for t, n in counts.items())})")
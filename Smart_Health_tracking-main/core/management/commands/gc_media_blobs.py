@@ -0,0 +1,59 @@
+from django.apps import apps
+from django.core.files.storage import storages
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import FileField
+
+from core.storage import ContentAddressedStorage
+
+
+def referenced_names():
+    """Every file name stored in a FileField/ImageField column"""
+    names = set()
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, FileField):
+                names.update(model._base_manager.exclude(**{field.name: ''}).exclude(
+                    **{f'{field.name}__isnull': True}
+                ).values_list(field.name, flat=True).iterator())
+    return names
+
+
+class Command(BaseCommand):
+    help = "Reclaim media blobs no longer referenced by any file name (and optionally unreferenced names)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be removed")
+        parser.add_argument('--min-age', type=int, default=3600,
+                            help="Keep blobs modified within this many seconds (in-flight uploads)")
+        parser.add_argument('--unreferenced', action='store_true',
+                            help="First unlink media files that no database row points at")
+        parser.add_argument('--adopt', action='store_true',
+                            help="Move files saved before deduplication into the blob store")
+
+    def handle(self, *args, **options):
+        storage = storages['default']
+        if not isinstance(storage, ContentAddressedStorage):
+            raise CommandError("The default storage is not core.storage.ContentAddressedStorage.")
+        dry_run = options['dry_run']
+
+        if options['adopt']:
+            adopted = deduplicated = 0
+            for name in storage.iter_names():
+                if not dry_run:
+                    deduplicated += storage.adopt(name)
+                adopted += 1
+            self.stdout.write(f"Adopted {adopted} files, {deduplicated} were duplicates")
+
+        if options['unreferenced']:
+            keep = referenced_names()
+            orphans = [name for name in storage.iter_names() if name not in keep]
+            for name in orphans:
+                if not dry_run:
+                    storage.delete(name)
+            self.stdout.write(f"{'Would unlink' if dry_run else 'Unlinked'} {len(orphans)} unreferenced files")
+
+        removed, reclaimed = storage.gc(min_age=options['min_age'], dry_run=dry_run)
+        self.stdout.write(
+            f"{'Would remove' if dry_run else 'Removed'} {removed} orphaned blobs, "
+            f"{reclaimed / 1024 / 1024:.1f} MB"
+        )
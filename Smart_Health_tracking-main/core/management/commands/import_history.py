@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import IMPORTERS, DEFAULT_CHUNK_SIZE, CheckpointMismatch, import_file
+
+
+class Command(BaseCommand):
+    help = "Bulk-import historical records from a CSV or JSONL file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSONL source file")
+        parser.add_argument('--model', required=True, choices=sorted(IMPORTERS))
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Defaults to the file extension")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--checkpoint', help="Name of a checkpoint saved with each committed chunk; rerun with it to resume")
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        def report_error(line, exc):
+            self.stderr.write(f"row {line}: {exc}")
+
+        started = time.perf_counter()
+        try:
+            imported, skipped = import_file(
+                options['path'],
+                options['model'],
+                fmt=options['format'],
+                chunk_size=options['chunk_size'],
+                checkpoint=options['checkpoint'],
+                using=options['database'],
+                on_error=report_error if options['verbosity'] > 1 else None,
+            )
+        except CheckpointMismatch as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+        rate = imported / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} {options['model']} rows ({skipped} skipped) in {elapsed:.1f}s — {rate:,.0f} rows/s"
+        ))
@@ -0,0 +1,157 @@
+import itertools
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from core.synthetic import generate_population
+
+# Bulk traffic: low-priority pages first, then ordinary ones (url name, role)
+BULK_PAGES = [
+    ('message_box', 'patient'),
+    ('doctor_dashboard', 'doctor'),
+    ('therapist_dashboard', 'therapist'),
+    ('view_exercise_videos', 'patient'),
+    ('patient_home', 'patient'),
+    ('patient_profile', 'patient'),
+]
+
+# label → (admission enabled, bulk clients)
+PHASES = {
+    'quiet': (True, False),
+    'bulk, admission off': (False, True),
+    'bulk, admission on': (True, True),
+}
+
+
+class Command(BaseCommand):
+    help = "SOS latency on a scratch SQLite database while bulk page traffic saturates the process"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bulk-clients', type=int, default=32, help="Threads requesting pages back to back")
+        parser.add_argument('--capacity', type=int, default=8,
+                            help="ADMISSION_CAPACITY for the run, i.e. the worker threads being protected")
+        parser.add_argument('--seconds', type=float, default=8, help="Duration of each phase")
+        parser.add_argument('--sos-interval', type=float, default=0.1, help="Seconds between SOS alerts")
+        parser.add_argument('--patients', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("This load test runs on a scratch SQLite database.")
+        logging.getLogger('core.middleware').setLevel(logging.CRITICAL)
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+
+        with tempfile.TemporaryDirectory() as workdir:
+            db_settings = connections['default'].settings_dict
+            original = db_settings['NAME']
+            connections.close_all()
+            db_settings['NAME'] = os.path.join(workdir, 'load.sqlite3')
+            setup_test_environment()
+            try:
+                with override_settings(MEDIA_ROOT=workdir, ADMISSION_CAPACITY=options['capacity']):
+                    call_command('migrate', verbosity=0)
+                    population = generate_population(patients=options['patients'], doctors=3, therapists=3)
+                    self._warm_up(population)
+                    results = {
+                        label: self._phase(population, enabled, options['bulk_clients'] if bulk else 0, options)
+                        for label, (enabled, bulk) in PHASES.items()
+                    }
+            finally:
+                teardown_test_environment()
+                connections.close_all()
+                db_settings['NAME'] = original
+
+        self.stdout.write(f"\n{'phase':<22} {'SOS p50':>8} {'p95':>8} {'p99':>8} {'SOS ok':>7}   bulk req/s  statuses")
+        for label, result in results.items():
+            sos = result['sos']
+            self.stdout.write(
+                f"{label:<22} {sos['p50']:>8.1f} {sos['p95']:>8.1f} {sos['p99']:>8.1f} {sos['ok']:>7.1%}"
+                f"   {result['bulk_rps']:>10.1f}  {result['bulk_statuses']}"
+            )
+        self.stdout.write("Latencies in ms. Bulk clients honour Retry-After, as browsers and proxies do.")
+
+    def _warm_up(self, population):
+        # Template compilation and lazy imports would otherwise land in the first phase measured
+        users = {'patient': population.patients[1], 'doctor': population.doctors[0],
+                 'therapist': population.therapists[0]}
+        with override_settings(ADMISSION_ENABLED=False):
+            for name, role in BULK_PAGES:
+                client = Client()
+                client.force_login(users[role])
+                client.get(reverse(name))
+            client = Client()
+            client.force_login(population.patients[0])
+            client.post(reverse('send_sos_alert'), {'message': 'warm-up'})
+
+    def _phase(self, population, enabled, bulk_clients, options):
+        deadline = time.monotonic() + options['seconds']
+        lock = threading.Lock()
+        sos_latencies, sos_statuses, bulk_statuses = [], {}, {}
+        logins = {
+            'patient': itertools.cycle(population.patients[1:]),
+            'doctor': itertools.cycle(population.doctors),
+            'therapist': itertools.cycle(population.therapists),
+        }
+        clients = []
+        for index in range(bulk_clients):
+            name, role = BULK_PAGES[index % len(BULK_PAGES)]
+            client = Client()
+            client.force_login(next(logins[role]))
+            clients.append((client, reverse(name)))
+        sos_client = Client()
+        sos_client.force_login(population.patients[0])
+
+        def bulk(client, url):
+            try:
+                while time.monotonic() < deadline:
+                    response = client.get(url)
+                    with lock:
+                        bulk_statuses[response.status_code] = bulk_statuses.get(response.status_code, 0) + 1
+                    if 'Retry-After' in response:
+                        time.sleep(min(float(response['Retry-After']), max(0, deadline - time.monotonic())))
+            finally:
+                connection.close()
+
+        def sos():
+            url = reverse('send_sos_alert')
+            try:
+                while time.monotonic() < deadline:
+                    started = time.perf_counter()
+                    response = sos_client.post(url, {'message': 'load test'})
+                    sos_latencies.append((time.perf_counter() - started) * 1000)
+                    sos_statuses[response.status_code] = sos_statuses.get(response.status_code, 0) + 1
+                    time.sleep(options['sos_interval'])
+            finally:
+                connection.close()
+
+        with override_settings(ADMISSION_ENABLED=enabled):
+            threads = [threading.Thread(target=bulk, args=pair) for pair in clients]
+            threads.append(threading.Thread(target=sos))
+            started = time.monotonic()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.monotonic() - started
+
+        ordered = sorted(sos_latencies) or [0.0]
+        return {
+            'sos': {
+                'p50': statistics.median(ordered),
+                'p95': ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+                'p99': ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))],
+                # The view redirects back to patient_home after creating the alert
+                'ok': sos_statuses.get(302, 0) / max(1, sum(sos_statuses.values())),
+            },
+            'bulk_rps': sum(bulk_statuses.values()) / elapsed,
+            'bulk_statuses': dict(sorted(bulk_statuses.items())),
+        }
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.changes import prune
+from core.tasks import prune_changes
+
+
+class Command(BaseCommand):
+    help = "Delete change-feed events past the retention window; clients further behind must reload"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help=f"Keep this many days of events (default {settings.CHANGE_FEED_RETENTION_DAYS})")
+        parser.add_argument('--enqueue', action='store_true', help="Queue the run for a background worker instead")
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            job = prune_changes.delay(days=options['days'], idempotency_key=f"prune_changes:{timezone.localdate()}")
+            self.stdout.write(f"Queued job {job.id} ({job.status})")
+            return
+        self.stdout.write(f"Pruned {prune(days=options['days'])} change events")
@@ -0,0 +1,56 @@
+import multiprocessing
+import os
+import signal
+import socket
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+
+def _worker_process(settings_module, index, burst, poll_interval):
+    """One worker per process, each with its own Django setup and connections"""
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+    django.setup()
+    connections.close_all()
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    jobs.work(worker_id=f"{socket.gethostname()}:{os.getpid()}:{index}", burst=burst,
+              poll_interval=poll_interval, stop=lambda: bool(stopping))
+
+
+class Command(BaseCommand):
+    help = "Run background job workers (the queue lives in the core_backgroundjob table)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help="Worker processes to start")
+        parser.add_argument('--burst', action='store_true', help="Exit once no job is due")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to sleep when idle")
+
+    def handle(self, *args, **options):
+        if options['processes'] <= 1:
+            processed = jobs.work(burst=options['burst'], poll_interval=options['poll_interval'])
+            self.stdout.write(f"Processed {processed} jobs")
+            return
+
+        settings_module = os.environ['DJANGO_SETTINGS_MODULE']
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(
+                target=_worker_process,
+                args=(settings_module, i, options['burst'], options['poll_interval']),
+            )
+            for i in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+                worker.join()
+        self.stdout.write(f"{len(workers)} workers stopped")
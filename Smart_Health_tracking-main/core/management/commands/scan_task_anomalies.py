@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.anomalies import scan_task_anomalies
+
+
+class Command(BaseCommand):
+    help = "Flag long-running, never-started, streak-break and unusual-duration tasks (run from cron, e.g. every 10 minutes)"
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        result = scan_task_anomalies()
+        found = ', '.join(f"{kind}={count}" for kind, count in result['found'].items())
+        self.stdout.write(
+            f"Scanned in {time.perf_counter() - started:.2f}s: {found}; "
+            f"{result['created']} new alerts, {result['resolved']} resolved"
+        )
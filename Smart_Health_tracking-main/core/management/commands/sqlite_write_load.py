@@ -0,0 +1,111 @@
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from core.models import User, PatientTask, MoodLog, SOSAlert
+
+
+class Command(BaseCommand):
+    help = "Hammer a scratch SQLite database with concurrent task/mood/SOS writers and count lock errors"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=16)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--profile', choices=['tuned', 'stock'], default='tuned',
+                            help="'stock' drops the pragmas and IMMEDIATE transactions for comparison")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("This load test targets SQLite.")
+
+        with tempfile.TemporaryDirectory() as workdir:
+            db_settings = connections['default'].settings_dict
+            original = (db_settings['NAME'], db_settings['OPTIONS'])
+            connections.close_all()
+            db_settings['NAME'] = os.path.join(workdir, 'load.sqlite3')
+            pragmas = settings.SQLITE_PRAGMAS
+            if options['profile'] == 'stock':
+                db_settings['OPTIONS'] = {}
+                pragmas = {}
+            try:
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    call_command('migrate', verbosity=0)
+                    self._run(options['writers'], options['seconds'], options['profile'])
+            finally:
+                connections.close_all()
+                db_settings['NAME'], db_settings['OPTIONS'] = original
+
+    def _run(self, writer_count, seconds, profile):
+        patients = [
+            User.objects.create(username=f"load_patient_{i}", role='patient')
+            for i in range(writer_count)
+        ]
+        deadline = time.monotonic() + seconds
+        lock = threading.Lock()
+        totals = {'writes': 0, 'locked': 0, 'latencies': []}
+
+        def writer(patient):
+            rng = random.Random(patient.pk)
+            writes = locked = 0
+            latencies = []
+            while time.monotonic() < deadline:
+                action = rng.choice([self._start_task, self._complete_task, self._log_mood, self._send_sos])
+                started = time.perf_counter()
+                try:
+                    action(patient)
+                    writes += 1
+                except OperationalError as exc:
+                    if 'locked' not in str(exc):
+                        raise
+                    locked += 1
+                latencies.append(time.perf_counter() - started)
+            connections.close_all()
+            with lock:
+                totals['writes'] += writes
+                totals['locked'] += locked
+                totals['latencies'].extend(latencies)
+
+        threads = [threading.Thread(target=writer, args=(p,)) for p in patients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        latencies = sorted(totals['latencies']) or [0]
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f"{profile}: {writer_count} writers, {seconds:.0f}s — {totals['writes']} writes "
+            f"({totals['writes'] / seconds:,.0f}/s), {totals['locked']} 'database is locked' errors, "
+            f"p99 {p99 * 1000:.1f} ms"
+        )
+
+    # 🔹 The write patterns of start_task, complete_task, log_mood and send_sos_alert
+    def _start_task(self, patient):
+        PatientTask.objects.create(
+            patient=patient, task_name='Exercise', task_type='exercise',
+            status='in_progress', started_at=timezone.now(),
+        )
+
+    def _complete_task(self, patient):
+        with transaction.atomic():
+            task = PatientTask.objects.filter(patient=patient, status='in_progress').first()
+            if task:
+                task.status = 'completed'
+                task.completed_at = timezone.now()
+                task.duration_minutes = 1
+                task.save()
+
+    def _log_mood(self, patient):
+        MoodLog.objects.create(patient=patient, mood='happy')
+
+    def _send_sos(self, patient):
+        SOSAlert.objects.create(patient=patient, status='active')
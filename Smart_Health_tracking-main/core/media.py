@@ -0,0 +1,128 @@
+import mimetypes
+import os
+import time
+from contextvars import ContextVar
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+SIGNING_SALT = 'core.media'
+IMMUTABLE = 'private, max-age=31536000, immutable'
+REVALIDATE = 'private, no-cache'
+
+# Set per request by core.middleware.MediaSigningMiddleware: storage URLs are signed for this user
+signing_user = ContextVar('media_signing_user', default=None)
+
+
+# 🔹 Versioned, signed URLs
+def _version(stat):
+    # Stored files are never rewritten in place (a new upload gets a new blob and name),
+    # so the blob's inode and size identify the bytes
+    return f"{stat.st_ino:x}{stat.st_size:x}"
+
+
+def file_version(path):
+    try:
+        return _version(os.stat(path))
+    except OSError:
+        return ''
+
+
+def _signature(name, version, expires, user_id):
+    return signing.Signer(salt=SIGNING_SALT).signature(f"{name}:{version}:{expires}:{user_id}")
+
+
+def signed_query(name, version, user_id):
+    """Query string granting ``user_id`` access to ``name`` until the end of the next URL window.
+
+    Expiry is rounded to window boundaries so the URL, and the browser's cached copy,
+    stays the same across page loads within a window. The user is part of the signed
+    payload, so a copied link is useless to anyone else.
+    """
+    window = settings.MEDIA_URL_MAX_AGE
+    expires = (int(time.time()) // window + 2) * window
+    return urlencode({'v': version, 'exp': expires, 'sig': _signature(name, version, expires, user_id)})
+
+
+def has_valid_signature(name, params, user):
+    if not user.is_authenticated:
+        return False
+    try:
+        expires = int(params.get('exp', ''))
+    except ValueError:
+        return False
+    if expires < time.time():
+        return False
+    expected = _signature(name, params.get('v', ''), expires, user.pk)
+    return constant_time_compare(expected, params.get('sig', ''))
+
+
+# 🔹 Access rules: top-level upload directory → check(user, name)
+def _owner_or_care_team(user, name):
+    """The user whose photo it is, or a clinician with them in their caseload"""
+    from core.caseload import can_view_patient
+    from core.models import User
+
+    return any(can_view_patient(user, owner) for owner in User.objects.filter(profile_photo=name))
+
+
+def _any_user(user, name):
+    return True
+
+
+def _record_access(user, name):
+    """The patient whose visit the report/prescription is attached to, or a clinician caring for them"""
+    from django.db.models import Q
+    from core.caseload import can_view_patient
+    from core.models import Visit
+
+    visits = Visit.objects.filter(Q(report_file=name) | Q(prescription_file=name)).select_related('patient')
+    return any(can_view_patient(user, visit.patient) for visit in visits)
+
+
+ACCESS_RULES = {
+    'profile_photos': _owner_or_care_team,
+    'exercise_videos': _any_user,
+    'video_thumbnails': _any_user,
+    'reports': _record_access,
+    'prescriptions': _record_access,
+}
+
+
+def is_servable(name):
+    parts = name.split('/')
+    return parts[0] in ACCESS_RULES and not any(part.startswith('.') or part == '' for part in parts)
+
+
+def can_access(user, name):
+    return user.is_authenticated and ACCESS_RULES[name.split('/')[0]](user, name)
+
+
+# 🔹 Responses
+def serve(request, name, path):
+    """Hand the file to the front proxy when configured, else a sendfile-capable FileResponse"""
+    stat = os.stat(path)
+    immutable = request.GET.get('v') == _version(stat)
+    if not immutable and not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+        return HttpResponseNotModified()
+
+    accel = settings.MEDIA_ACCEL
+    if accel in ('nginx', 'apache'):
+        content_type, _ = mimetypes.guess_type(path)
+        response = HttpResponse(content_type=content_type or 'application/octet-stream')
+        if accel == 'nginx':
+            # Location marked `internal` in nginx, aliased to MEDIA_ROOT
+            response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_PREFIX + name)
+        else:
+            response['X-Sendfile'] = path
+    else:
+        # WSGI servers send this with sendfile() via wsgi.file_wrapper
+        response = FileResponse(open(path, 'rb'))
+    response['Cache-Control'] = IMMUTABLE if immutable else REVALIDATE
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return response
@@ -0,0 +1,134 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Upper bounds of the histogram buckets, per kind of measurement
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 20, 30, 50, 80, 130, 200, 500, 1000)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# 🔹 Metric name → (help text, buckets)
+METRICS = {
+    'request_duration_seconds': ("Wall time per request", TIME_BUCKETS),
+    'db_queries': ("Database queries per request", COUNT_BUCKETS),
+    'db_duration_seconds': ("Time spent in database queries per request", TIME_BUCKETS),
+    'template_render_seconds': ("Time spent rendering templates per request", TIME_BUCKETS),
+    'response_size_bytes': ("Response body size", SIZE_BUCKETS),
+}
+PREFIX = 'smart_health_'
+
+
+class Histogram:
+    """Fixed-bucket histogram; quantiles are interpolated within buckets, memory is constant"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, view, values):
+        with self._lock:
+            for name, value in values.items():
+                key = (name, view)
+                if key not in self._histograms:
+                    self._histograms[key] = Histogram(METRICS[name][1])
+                self._histograms[key].observe(value)
+
+    def render_prometheus(self):
+        """Prometheus text exposition: one summary (p50/p95/p99, sum, count) per metric and view"""
+        with self._lock:
+            snapshot = sorted(self._histograms.items())
+            lines = []
+            for name, (help_text, buckets) in METRICS.items():
+                series = [(view, hist) for (metric, view), hist in snapshot if metric == name]
+                if not series:
+                    continue
+                full_name = PREFIX + name
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} summary")
+                for view, hist in series:
+                    label = view.replace('\\', '\\\\').replace('"', '\\"')
+                    for q in QUANTILES:
+                        lines.append(f'{full_name}{{view="{label}",quantile="{q}"}} {hist.quantile(q):.6g}')
+                    lines.append(f'{full_name}_sum{{view="{label}"}} {hist.sum:.6g}')
+                    lines.append(f'{full_name}_count{{view="{label}"}} {hist.count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+# 🔹 Per-request collection
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.statements = {}
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            # Same SQL text with different params is the signature of an N+1 loop
+            self.statements[sql] = self.statements.get(sql, 0) + 1
+
+
+current_stats = ContextVar('current_request_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper on every connection; counts the query towards the request whose context runs it
+
+    Async requests share one thread for the ORM, so a wrapper per request would see every
+    request's queries. sync_to_async carries the caller's context, so the ContextVar doesn't.
+    """
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats.record_query(execute, sql, params, many, context)
+
+
+def install_query_recorder(sender=None, connection=None, **kwargs):
+    """connection_created: put record_query first, under any temporary execute_wrapper()"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def record_template_time(seconds):
+    stats = current_stats.get()
+    if stats is not None:
+        stats.template_time += seconds
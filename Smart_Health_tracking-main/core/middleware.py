@@ -0,0 +1,210 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+from . import admission, media
+from .metrics import RequestStats, current_stats, registry
+from .routers import read_from_replica
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'pin_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+# 🔹 Read replica routing
+class ReplicaRoutingMiddleware:
+    """Serve read-only dashboard/profile views from the replica, with read-your-writes pinning"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = read_from_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
+        return self._pin(request, response)
+
+    async def __acall__(self, request):
+        token = read_from_replica.set(False)
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
+        return self._pin(request, response)
+
+    def _pin(self, request, response):
+        if request.method not in SAFE_METHODS:
+            # The replica may lag behind this write; read from the primary for a while
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method in SAFE_METHODS
+            and request.resolver_match.url_name in settings.REPLICA_READ_VIEWS
+            and PIN_COOKIE not in request.COOKIES
+        ):
+            read_from_replica.set(True)
+        return None
+
+
+# 🔹 Signed media URLs
+class MediaSigningMiddleware:
+    """Media URLs built while handling a request are signed for its user (core.media)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # request.user stays lazy: pages without media links load nothing extra
+        token = media.signing_user.set(request.user)
+        try:
+            return self.get_response(request)
+        finally:
+            media.signing_user.reset(token)
+
+    async def __acall__(self, request):
+        token = media.signing_user.set(request.user)
+        try:
+            return await self.get_response(request)
+        finally:
+            media.signing_user.reset(token)
+
+
+# 🔹 Admission control
+class AdmissionControlMiddleware:
+    """Shed load by priority before views run: SOS views always get in, low-priority pages go first
+
+    Rejections carry Retry-After: 503 when the server is busy, 429 when one client is over its rate.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self._release(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._release(request, await self.get_response(request))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.ADMISSION_ENABLED:
+            return None
+        view = request.resolver_match.url_name or request.resolver_match.view_name
+        priority = admission.priority_of(view)
+        if priority != 'critical':
+            client = request.user.pk if request.user.is_authenticated else request.META.get('REMOTE_ADDR')
+            wait = admission.buckets().take(client)
+            if wait:
+                return self._reject(429, "Too many requests, slow down.", wait)
+        ticket = admission.lanes().try_acquire(view, priority)
+        if ticket is None:
+            return self._reject(503, "Server busy, please retry shortly.", settings.ADMISSION_RETRY_AFTER)
+        request._admission_ticket = ticket
+        return None
+
+    def _reject(self, status, message, retry_after):
+        response = HttpResponse(message, status=status, content_type='text/plain')
+        response['Retry-After'] = str(max(1, round(retry_after)))
+        return response
+
+    def _release(self, request, response):
+        ticket = getattr(request, '_admission_ticket', None)
+        if ticket is not None:
+            if response.streaming:
+                # Hold the slot until the body has been sent
+                response._resource_closers.append(ticket.release)
+            else:
+                ticket.release()
+        return response
+
+
+# 🔹 Request performance instrumentation
+class PerformanceMiddleware:
+    """Record wall time, DB queries/time, template time and response size per URL name"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self._record(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            # Queries reach stats through metrics.record_query, installed on every connection
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self._record(request, response, stats, time.perf_counter() - started)
+
+    def _record(self, request, response, stats, elapsed):
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+        values = {
+            'request_duration_seconds': elapsed,
+            'db_queries': stats.queries,
+            'db_duration_seconds': stats.db_time,
+            'template_render_seconds': stats.template_time,
+        }
+        if not response.streaming:
+            values['response_size_bytes'] = len(response.content)
+        registry.observe(view, values)
+        self._warn(request, view, elapsed, stats)
+        return response
+
+    def _warn(self, request, view, elapsed, stats):
+        if elapsed * 1000 > settings.PERF_SLOW_REQUEST_MS:
+            logger.warning(
+                "Slow request: %s %s (%s) took %.0f ms, %d queries in %.0f ms, templates %.0f ms",
+                request.method, request.path, view, elapsed * 1000,
+                stats.queries, stats.db_time * 1000, stats.template_time * 1000,
+            )
+        if stats.queries > settings.PERF_QUERY_BUDGET:
+            logger.warning(
+                "Query budget exceeded: %s ran %d queries (budget %d)",
+                view, stats.queries, settings.PERF_QUERY_BUDGET,
+            )
+            sql, repeats = max(stats.statements.items(), key=lambda item: item[1])
+            if repeats >= settings.PERF_N_PLUS_ONE_REPEATS:
+                logger.warning("Possible N+1 in %s: same query ran %d times: %s", view, repeats, sql[:200])
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_exercisevideo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('long_running', 'Running over 60 minutes'), ('missed', 'Pending, never started'), ('streak_break', 'Daily streak broken'), ('duration_outlier', 'Unusual duration')], max_length=20)),
+                ('detail', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='patienttask',
+            index=models.Index(fields=['status', 'started_at'], name='task_status_started_idx'),
+        ),
+        migrations.AddField(
+            model_name='taskalert',
+            name='patient',
+            field=models.ForeignKey(limit_choices_to={'role': 'patient'}, on_delete=django.db.models.deletion.CASCADE, related_name='task_alerts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='taskalert',
+            name='task',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='core.patienttask'),
+        ),
+        migrations.AddIndex(
+            model_name='taskalert',
+            index=models.Index(condition=models.Q(('resolved_at__isnull', True)), fields=['-created_at'], name='taskalert_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskalert',
+            index=models.Index(fields=['patient', 'resolved_at'], name='taskalert_patient_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='taskalert',
+            constraint=models.UniqueConstraint(fields=('task', 'kind'), name='unique_task_alert'),
+        ),
+    ]
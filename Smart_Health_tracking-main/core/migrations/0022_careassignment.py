@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CareAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('doctor', 'Doctor'), ('therapist', 'Therapist')], max_length=10)),
+                ('source', models.CharField(choices=[('manual', 'Assigned by staff'), ('appointment', 'Appointment'), ('visit', 'Visit record'), ('feedback', 'Task feedback')], default='manual', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('clinician', models.ForeignKey(limit_choices_to={'role__in': ['doctor', 'therapist']}, on_delete=django.db.models.deletion.CASCADE, related_name='caseload', to=settings.AUTH_USER_MODEL)),
+                ('patient', models.ForeignKey(limit_choices_to={'role': 'patient'}, on_delete=django.db.models.deletion.CASCADE, related_name='care_team', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['patient', 'role'], name='care_patient_role_idx')],
+                'constraints': [models.UniqueConstraint(fields=('clinician', 'patient'), name='unique_care_assignment')],
+            },
+        ),
+    ]
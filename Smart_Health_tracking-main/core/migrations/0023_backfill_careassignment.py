@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def backfill_caseloads(apps, schema_editor):
+    from core.caseload import backfill
+
+    backfill(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_careassignment'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_caseloads, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_backfill_careassignment'),
+    ]
+
+    operations = [
+        # VisitRecord's table becomes the single visit store; VisitRecord itself returns as a proxy
+        migrations.RenameModel('VisitRecord', 'Visit'),
+        migrations.AddField(
+            model_name='visit',
+            name='source',
+            field=models.CharField(choices=[('record', 'Doctor visit record'), ('legacy', 'Patient-submitted visit')], default='record', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='visit',
+            name='medicine_details',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='visit',
+            name='therapist_notes',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='visit',
+            name='legacy_id',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='ID in the old core_patientvisit table, for copied rows', null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='visit',
+            name='doctor',
+            field=models.ForeignKey(blank=True, limit_choices_to={'role': 'doctor'}, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='doctor_visits', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='visit',
+            name='current_status',
+            field=models.CharField(blank=True, choices=[('stable', 'Stable'), ('improving', 'Improving'), ('critical', 'Critical'), ('recovered', 'Recovered')], max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['patient', '-visit_date', '-id'], name='visit_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['doctor', '-visit_date', '-id'], name='visit_doctor_date_idx'),
+        ),
+        migrations.CreateModel(
+            name='VisitRecord',
+            fields=[],
+            options={
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('core.visit',),
+        ),
+    ]
@@ -0,0 +1,69 @@
+from django.db import migrations, transaction
+
+BATCH_SIZE = 1000
+
+
+def copy_patient_visits(apps, schema_editor):
+    """Copy legacy visits into core_visit in short transactions, so the app keeps writing meanwhile
+
+    Rows are keyed by legacy_id, so an interrupted run can simply be repeated. The old doctor
+    column defaulted to a fixed user rather than the visit's doctor, so copies are left without one.
+    """
+    PatientVisit = apps.get_model('core', 'PatientVisit')
+    Visit = apps.get_model('core', 'Visit')
+    using = schema_editor.connection.alias
+    last_id = 0
+    while True:
+        batch = list(PatientVisit.objects.using(using).filter(pk__gt=last_id).order_by('pk')[:BATCH_SIZE])
+        if not batch:
+            break
+        with transaction.atomic(using=using):
+            Visit.objects.using(using).bulk_create([
+                Visit(
+                    source='legacy', legacy_id=old.pk, patient_id=old.patient_id, doctor_id=None,
+                    visit_date=old.visit_date, hospital_name=old.hospital_name, doctor_name=old.doctor_name,
+                    report_file=old.report_file.name, prescription_file=old.prescription_file.name,
+                    medicine_details=old.medicine_details, therapist_notes=old.therapist_notes,
+                )
+                for old in batch
+            ], ignore_conflicts=True)
+        last_id = batch[-1].pk
+
+
+def restore_patient_visits(apps, schema_editor):
+    """Reverse: move legacy rows back into the recreated core_patientvisit table
+
+    Reversed before 0026 dropped it, the table still holds the originals; those are kept.
+    The old doctor column is required, so rows without a doctor get its default back.
+    """
+    PatientVisit = apps.get_model('core', 'PatientVisit')
+    default_doctor = PatientVisit._meta.get_field('doctor').get_default()
+    Visit = apps.get_model('core', 'Visit')
+    using = schema_editor.connection.alias
+    while True:
+        batch = list(Visit.objects.using(using).filter(source='legacy').order_by('pk')[:BATCH_SIZE])
+        if not batch:
+            break
+        with transaction.atomic(using=using):
+            PatientVisit.objects.using(using).bulk_create([
+                PatientVisit(
+                    id=visit.legacy_id, patient_id=visit.patient_id, doctor_id=visit.doctor_id or default_doctor,
+                    visit_date=visit.visit_date, hospital_name=visit.hospital_name, doctor_name=visit.doctor_name,
+                    report_file=visit.report_file.name, prescription_file=visit.prescription_file.name,
+                    medicine_details=visit.medicine_details, therapist_notes=visit.therapist_notes,
+                )
+                for visit in batch
+            ], ignore_conflicts=True)
+            Visit.objects.using(using).filter(pk__in=[visit.pk for visit in batch]).delete()
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0024_visit'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_patient_visits, restore_patient_visits),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_copy_patientvisit'),
+    ]
+
+    operations = [
+        # Rows now live in core_visit (source='legacy'); PatientVisit becomes a proxy onto them
+        migrations.DeleteModel(name='PatientVisit'),
+        migrations.CreateModel(
+            name='PatientVisit',
+            fields=[],
+            options={
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('core.visit',),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_changeevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patienttask',
+            name='client_key',
+            field=models.CharField(blank=True, editable=False, help_text='Key an offline client started the task under (tasks/sync/)', max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='patienttask',
+            constraint=models.UniqueConstraint(condition=models.Q(('client_key__isnull', False)), fields=('patient', 'client_key'), name='task_client_key_uniq'),
+        ),
+    ]
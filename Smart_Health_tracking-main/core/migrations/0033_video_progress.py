@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0032_hospital_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position_seconds', models.FloatField(default=0, help_text='Where the patient last was; playback resumes here')),
+                ('furthest_seconds', models.FloatField(default=0)),
+                ('watched_seconds', models.FloatField(default=0, help_text='Time actually played, seeks excluded')),
+                ('duration_seconds', models.FloatField(blank=True, help_text='As reported by the player', null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('last_watched_at', models.DateTimeField(blank=True, null=True)),
+                ('patient', models.ForeignKey(limit_choices_to={'role': 'patient'}, on_delete=django.db.models.deletion.CASCADE, related_name='video_progress', to=settings.AUTH_USER_MODEL)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='core.exercisevideo')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['video', 'completed_at'], name='video_progress_video_idx')],
+                'constraints': [models.UniqueConstraint(fields=('patient', 'video'), name='video_progress_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0034_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('source', models.CharField(help_text='Absolute path of the file being imported', max_length=500)),
+                ('model', models.CharField(max_length=30)),
+                ('rows_done', models.PositiveIntegerField(default=0, help_text='Source rows committed so far')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
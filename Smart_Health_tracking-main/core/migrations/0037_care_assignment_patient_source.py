@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0036_cohort_report'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='careassignment',
+            name='source',
+            field=models.CharField(choices=[('manual', 'Assigned by staff'), ('appointment', 'Appointment'), ('visit', 'Visit record'), ('feedback', 'Task feedback'), ('patient', 'Chosen by the patient')], default='manual', max_length=20),
+        ),
+    ]
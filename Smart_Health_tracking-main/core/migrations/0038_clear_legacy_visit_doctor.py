@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def clear_copied_doctors(apps, schema_editor):
+    """Drop the placeholder doctor 0025 copied from the old core_patientvisit default"""
+    Visit = apps.get_model('core', 'Visit')
+    Visit.objects.using(schema_editor.connection.alias).filter(
+        source='legacy', legacy_id__isnull=False,
+    ).update(doctor=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_care_assignment_patient_source'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_copied_doctors, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 import random
 from datetime import date
@@ -37,9 +38,50 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.get_full_name()} ({self.role})"
 
+# 🔹 Care Assignment Model (a clinician's caseload, see core/caseload.py)
+class CareAssignment(models.Model):
+    SOURCE_CHOICES = [
+        ('manual', 'Assigned by staff'),
+        ('appointment', 'Appointment'),
+        ('visit', 'Visit record'),
+        ('feedback', 'Task feedback'),
+        ('patient', 'Chosen by the patient'),
+    ]
+
+    clinician = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        limit_choices_to={'role__in': ['doctor', 'therapist']},
+        related_name='caseload'
+    )
+    patient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        limit_choices_to={'role': 'patient'},
+        related_name='care_team'
+    )
+    role = models.CharField(max_length=10, choices=[('doctor', 'Doctor'), ('therapist', 'Therapist')])
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='manual')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # Also the clinician → patients index every scoped view reads
+            models.UniqueConstraint(fields=['clinician', 'patient'], name='unique_care_assignment'),
+        ]
+        indexes = [
+            # Patient → care team (SOS fan-out, "has anyone been assigned?")
+            models.Index(fields=['patient', 'role'], name='care_patient_role_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.clinician.username} → {self.patient.username} ({self.role})"
+
 # 🔹 Location and Hospital Models
 class Location(models.Model):
     name = models.CharField(max_length=100)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
 
     def __str__(self):
         return self.name
@@ -47,10 +89,22 @@ class Location(models.Model):
 class Hospital(models.Model):
     name = models.CharField(max_length=100)
     location = models.ForeignKey(Location, on_delete=models.CASCADE)
+    # Empty coordinates fall back to the location's (core.geo)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    daily_slots = models.PositiveIntegerField(default=20, help_text="Appointments its doctors can take per day")
 
     def __str__(self):
         return f"{self.name} ({self.location.name})"
 
+class DataVersion(models.Model):
+    """A counter bumped whenever the data behind a per-process in-memory index changes (core.geo)"""
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
 # 🔹 Appointment Model
 class Appointment(models.Model):
     STATUS_CHOICES = [
@@ -58,6 +112,7 @@ class Appointment(models.Model):
         ('confirmed', 'Confirmed'),
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
+        ('expired', 'Expired'),  # still pending when its date passed (expire_appointments)
     ]
 
     patient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='appointments')
@@ -69,6 +124,16 @@ class Appointment(models.Model):
     reason = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Dashboard lists: one doctor's appointments in a status, by date and time
+            models.Index(fields=['doctor', 'status', 'date', 'time'], name='appt_doctor_status_idx'),
+            # Free slots: bookings per hospital on a date
+            models.Index(fields=['hospital', 'date'], name='appt_hospital_date_idx'),
+            # The expiry job only looks at pending rows
+            models.Index(fields=['date'], condition=models.Q(status='pending'), name='appt_pending_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.patient.username} → {self.doctor.username} on {self.date} at {self.time}"
 
@@ -87,61 +152,93 @@ class HealthLog(models.Model):
     def __str__(self):
         return f"HealthLog: {self.patient.username} on {self.date}"
 
-# 🔹 Patient Visit Model
-class PatientVisit(models.Model):
-    patient = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE,
-        limit_choices_to={'role': 'patient'}
-    )
+# 🔹 Visit Model: one store for doctor visit records and legacy patient-submitted visits
+class Visit(models.Model):
+    SOURCE_CHOICES = [
+        ('record', 'Doctor visit record'),
+        ('legacy', 'Patient-submitted visit'),
+    ]
+    STATUS_CHOICES = [
+        ('stable', 'Stable'),
+        ('improving', 'Improving'),
+        ('critical', 'Critical'),
+        ('recovered', 'Recovered'),
+    ]
+
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default='record')
+    patient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='visits')
     doctor = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         limit_choices_to={'role': 'doctor'},
-        related_name='visits_as_doctor',
-        default=12
+        related_name='doctor_visits',
+        blank=True,
+        null=True
     )
-    visit_date = models.DateField()
-    hospital_name = models.CharField(max_length=100)
-    doctor_name = models.CharField(max_length=100)
-    report_file = models.FileField(upload_to='reports/', blank=True, null=True)
-    prescription_file = models.FileField(upload_to='prescriptions/', blank=True, null=True)
-    medicine_details = models.TextField(blank=True)
-    therapist_notes = models.TextField(blank=True)
-
-    def __str__(self):
-        return f"Visit: {self.patient.username} with Dr. {self.doctor_name} on {self.visit_date}"
-
-# 🔹 Visit Record Model
-class VisitRecord(models.Model):
-    patient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='visits')
-    doctor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='doctor_visits')
     visit_date = models.DateField(default=timezone.now)
     hospital_name = models.CharField(max_length=100)
     doctor_name = models.CharField(max_length=100)
-    current_status = models.CharField(
-        max_length=100,
-        choices=[
-            ('stable', 'Stable'),
-            ('improving', 'Improving'),
-            ('critical', 'Critical'),
-            ('recovered', 'Recovered'),
-        ]
-    )
+    current_status = models.CharField(max_length=100, choices=STATUS_CHOICES, blank=True)
     improvement_score = models.PositiveIntegerField(default=0)
     doctor_notes = models.TextField(blank=True, null=True)
+    medicine_details = models.TextField(blank=True)
+    therapist_notes = models.TextField(blank=True)
     prescription_file = models.FileField(upload_to='prescriptions/', blank=True, null=True)
     report_file = models.FileField(upload_to='reports/', blank=True, null=True)
     summary = models.TextField(blank=True, null=True)
+    legacy_id = models.PositiveIntegerField(blank=True, null=True, unique=True, editable=False,
+                                            help_text="ID in the old core_patientvisit table, for copied rows")
+
+    class Meta:
+        indexes = [
+            # Profile and series read one patient's visits by date; dashboards one doctor's
+            models.Index(fields=['patient', '-visit_date', '-id'], name='visit_patient_date_idx'),
+            models.Index(fields=['doctor', '-visit_date', '-id'], name='visit_doctor_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.patient.username} - {self.visit_date}"
 
     def save(self, *args, **kwargs):
-        if not self.summary:
+        if not self.summary and self.source == 'record':
             self.summary = f"{self.visit_date}: {self.current_status} ({self.improvement_score}%)"
         super().save(*args, **kwargs)
 
+
+class VisitSourceManager(models.Manager):
+    def __init__(self, source):
+        super().__init__()
+        self.source = source
+
+    def get_queryset(self):
+        return super().get_queryset().filter(source=self.source)
+
+
+# 🔹 Compatibility views of Visit for existing views, forms and admin
+class VisitRecord(Visit):
+    objects = VisitSourceManager('record')
+
+    class Meta:
+        proxy = True
+
+    def save(self, *args, **kwargs):
+        self.source = 'record'
+        super().save(*args, **kwargs)
+
+
+class PatientVisit(Visit):
+    objects = VisitSourceManager('legacy')
+
+    class Meta:
+        proxy = True
+
+    def save(self, *args, **kwargs):
+        self.source = 'legacy'
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"Visit: {self.patient.username} with Dr. {self.doctor_name} on {self.visit_date}"
+
 # 🔹 Patient Task Model
 class PatientTask(models.Model):
     STATUS_CHOICES = [
@@ -175,10 +272,58 @@ class PatientTask(models.Model):
     completed_at = models.DateTimeField(blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     feedback = models.TextField(blank=True)
+    client_key = models.CharField(max_length=64, blank=True, null=True, editable=False,
+                                  help_text="Key an offline client started the task under (tasks/sync/)")
+
+    class Meta:
+        indexes = [
+            # Anomaly scans walk open and recent tasks by status and start time
+            models.Index(fields=['status', 'started_at'], name='task_status_started_idx'),
+        ]
+        constraints = [
+            # Replayed sync batches find the task instead of starting it twice
+            models.UniqueConstraint(fields=['patient', 'client_key'], condition=models.Q(client_key__isnull=False),
+                                    name='task_client_key_uniq'),
+        ]
 
     def __str__(self):
         return f"Task: {self.patient.username} - {self.task_name} ({self.status})"
 
+# 🔹 Task Alert Model (written by scan_task_anomalies)
+class TaskAlert(models.Model):
+    KIND_CHOICES = [
+        ('long_running', 'Running over 60 minutes'),
+        ('missed', 'Pending, never started'),
+        ('streak_break', 'Daily streak broken'),
+        ('duration_outlier', 'Unusual duration'),
+    ]
+
+    patient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        limit_choices_to={'role': 'patient'},
+        related_name='task_alerts'
+    )
+    task = models.ForeignKey(PatientTask, on_delete=models.CASCADE, related_name='alerts')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    detail = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    resolved_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'kind'], name='unique_task_alert'),
+        ]
+        indexes = [
+            models.Index(fields=['-created_at'], condition=models.Q(resolved_at__isnull=True),
+                         name='taskalert_open_idx'),
+            models.Index(fields=['patient', 'resolved_at'], name='taskalert_patient_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.patient.username} - {self.task.task_name}"
+
 # 🔹 Mood Log Model
 class MoodLog(models.Model):
     patient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -204,6 +349,16 @@ class Message(models.Model):
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
     is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Conversations read live messages only; deleted rows stay out of this index
+            models.Index(fields=['sender', 'receiver', 'timestamp'], condition=models.Q(is_deleted=False),
+                         name='message_live_idx'),
+            # compact_messages finds purgeable rows without scanning live ones
+            models.Index(fields=['deleted_at'], condition=models.Q(is_deleted=True), name='message_deleted_idx'),
+        ]
 
     def __str__(self):
         return f"{self.sender.username} → {self.receiver.username}: {self.content[:30]}"
@@ -291,3 +446,182 @@ class ExerciseVideo(models.Model):
         """Increment view count"""
         self.views_count += 1
         self.save(update_fields=['views_count'])
+
+# 🔹 Video Watch Progress Model (heartbeats coalesced and flushed by core.watch)
+class VideoProgress(models.Model):
+    patient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        limit_choices_to={'role': 'patient'},
+        related_name='video_progress'
+    )
+    video = models.ForeignKey(ExerciseVideo, on_delete=models.CASCADE, related_name='progress')
+    position_seconds = models.FloatField(default=0, help_text="Where the patient last was; playback resumes here")
+    furthest_seconds = models.FloatField(default=0)
+    watched_seconds = models.FloatField(default=0, help_text="Time actually played, seeks excluded")
+    duration_seconds = models.FloatField(blank=True, null=True, help_text="As reported by the player")
+    completed_at = models.DateTimeField(blank=True, null=True)
+    last_watched_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['patient', 'video'], name='video_progress_uniq'),
+        ]
+        indexes = [
+            # Engagement aggregates group one video's rows at a time
+            models.Index(fields=['video', 'completed_at'], name='video_progress_video_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.patient.username} - {self.video.title} at {self.position_seconds:.0f}s"
+
+# 🔹 Cold tier: rows past settings.ARCHIVE_HORIZON_DAYS, moved here by core.archive
+# Same columns and primary keys as the hot tables, indexed for per-patient history reads
+class ArchivedHealthLog(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    patient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    date = models.DateField()
+    blood_pressure = models.CharField(max_length=20)
+    heart_rate = models.CharField(max_length=20)
+    notes = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['patient', 'date'], name='arch_healthlog_patient_idx')]
+
+
+class ArchivedMoodLog(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    patient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    mood = models.CharField(max_length=20)
+    logged_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=['patient', 'logged_at'], name='arch_moodlog_patient_idx')]
+
+
+class ArchivedImprovementScore(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    patient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    score = models.IntegerField()
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=['patient', 'recorded_at'], name='arch_score_patient_idx')]
+
+
+class ArchivedMessage(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    receiver = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    content = models.TextField()
+    timestamp = models.DateTimeField()
+    is_deleted = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sender', 'timestamp'], name='arch_message_sender_idx'),
+            models.Index(fields=['receiver', 'timestamp'], name='arch_message_receiver_idx'),
+        ]
+
+
+class ArchivedSOSAlert(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    patient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    message = models.TextField(blank=True, null=True)
+    status = models.CharField(max_length=20)
+    created_at = models.DateTimeField()
+    acknowledged_at = models.DateTimeField(blank=True, null=True)
+    resolved_at = models.DateTimeField(blank=True, null=True)
+    acknowledged_by_doctor = models.BooleanField(default=False)
+    acknowledged_by_therapist = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [models.Index(fields=['patient', 'created_at'], name='arch_sos_patient_idx')]
+
+# 🔹 Background Job Model (queue for core.jobs)
+class BackgroundJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=200, help_text="Dotted path of the @background function")
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    priority = models.PositiveSmallIntegerField(default=5, help_text="Lower runs first")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    idempotency_key = models.CharField(max_length=200, blank=True, null=True, unique=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the next queued job in (priority, run_after) order
+            models.Index(fields=['status', 'priority', 'run_after'], name='job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status}, attempt {self.attempts}/{self.max_attempts})"
+
+# 🔹 Cohort Report Model (computed by core.analytics off the request path, read by /analytics/)
+class CohortReport(models.Model):
+    report = models.JSONField(encoder=DjangoJSONEncoder)
+    computed_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Cohort report {self.computed_at:%Y-%m-%d %H:%M}"
+
+# 🔹 Import Checkpoint Model (written by core.importers with each committed batch)
+class ImportCheckpoint(models.Model):
+    name = models.CharField(max_length=100, primary_key=True)
+    source = models.CharField(max_length=500, help_text="Absolute path of the file being imported")
+    model = models.CharField(max_length=30)
+    rows_done = models.PositiveIntegerField(default=0, help_text="Source rows committed so far")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.model} from {self.source} ({self.rows_done} rows)"
+
+# 🔹 Change Feed Model (written by core.changes, read by /changes/)
+class ChangeEvent(models.Model):
+    ACTION_CHOICES = [
+        ('upsert', 'Created or updated'),
+        ('delete', 'Deleted'),
+    ]
+    EVERYONE = '*'
+
+    seq = models.BigAutoField(primary_key=True)
+    # No FK constraint: events are written while a user's own rows cascade away
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        blank=True,
+        null=True,
+        db_index=False,  # change_user_seq_idx leads with user
+        help_text="Recipient; empty for events addressed to a role"
+    )
+    role = models.CharField(max_length=20, blank=True, help_text="Recipient role when user is empty, or '*'")
+    model = models.CharField(max_length=30)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES, default='upsert')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # A client's poll reads its own events, then role-addressed ones (user NULL), after the last seq it saw
+            models.Index(fields=['user', 'seq'], name='change_user_seq_idx'),
+            models.Index(fields=['created_at'], name='change_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.action} {self.model}:{self.object_id}"
@@ -0,0 +1,34 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REPLICA_ALIAS = 'replica'
+# Apps that are always read from the primary: a session written by one request
+# must be visible to the very next one, before replication catches up
+PRIMARY_ONLY_APPS = {'sessions'}
+
+# Set per request by core.middleware.ReplicaRoutingMiddleware
+read_from_replica = ContextVar('read_from_replica', default=False)
+
+
+class PrimaryReplicaRouter:
+    """Writes always go to the primary; reads go to the replica only when the request allows it"""
+
+    def db_for_read(self, model, **hints):
+        if (
+            read_from_replica.get()
+            and REPLICA_ALIAS in settings.DATABASES
+            and model._meta.app_label not in PRIMARY_ONLY_APPS
+        ):
+            return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data, so objects from either may be related
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
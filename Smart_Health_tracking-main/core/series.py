@@ -0,0 +1,110 @@
+import hashlib
+from datetime import datetime, time as dt_time, timezone as dt_timezone
+
+from django.db.models import Q
+
+from core.archive import history
+from core.models import VisitRecord, ImprovementScore, MoodLog
+
+DEFAULT_POINTS = 200
+MAX_POINTS = 2000
+
+# Moods plotted on a 1–5 scale
+MOOD_SCORES = {
+    'happy': 5,
+    'excited': 4,
+    'neutral': 3,
+    'tired': 2,
+    'anxious': 2,
+    'sad': 1,
+}
+
+# 🔹 Series name → (model, time column, value column)
+SERIES = {
+    'visits': (VisitRecord, 'visit_date', 'improvement_score'),
+    'scores': (ImprovementScore, 'recorded_at', 'score'),
+    'moods': (MoodLog, 'logged_at', 'mood'),
+}
+
+
+def _epoch(value):
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, dt_time.min, tzinfo=dt_timezone.utc)
+    return int(value.timestamp())
+
+
+def fetch_series(patient_id, name):
+    """[(epoch seconds, value), ...] ordered by time, read as tuples (no model instances)"""
+    model, time_field, value_field = SERIES[name]
+    # Full history: archived rows are unioned in
+    rows = history(model, [time_field, value_field, 'id'], Q(patient_id=patient_id)).order_by(time_field, 'id')
+    if name == 'moods':
+        return [(_epoch(t), MOOD_SCORES[v]) for t, v, _ in rows.iterator() if v in MOOD_SCORES]
+    return [(_epoch(t), v) for t, v, _ in rows.iterator()]
+
+
+def series_version(patient_id, name):
+    """Fingerprint of a series: a hash of the very rows fetch_series reads
+
+    Counts and sums miss edits that keep them equal (a visit re-dated, two scores
+    changed by offsetting amounts), so every (time, value, id) row is hashed instead.
+    """
+    model, time_field, value_field = SERIES[name]
+    rows = history(model, [time_field, value_field, 'id'], Q(patient_id=patient_id)).order_by(time_field, 'id')
+    digest = hashlib.md5()
+    for row in rows.iterator():
+        digest.update(repr(row).encode())
+    return digest.hexdigest()
+
+
+# 🔹 Downsampling
+def bucket_average(points, threshold):
+    """Average consecutive points into ``threshold`` equal-count buckets"""
+    if threshold >= len(points) or threshold < 1:
+        return points
+    size = len(points) / threshold
+    sampled = []
+    for i in range(threshold):
+        bucket = points[int(i * size):int((i + 1) * size)]
+        if bucket:
+            sampled.append((
+                sum(p[0] for p in bucket) // len(bucket),
+                round(sum(p[1] for p in bucket) / len(bucket), 2),
+            ))
+    return sampled
+
+
+def lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets: keeps the visual shape with ``threshold`` points"""
+    if threshold >= len(points) or threshold < 3:
+        return points
+    sampled = [points[0]]
+    size = (len(points) - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third corner of the triangle
+        next_start = int((i + 1) * size) + 1
+        next_end = min(int((i + 2) * size) + 1, len(points))
+        next_bucket = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(p[0] for p in next_bucket) / len(next_bucket)
+        avg_y = sum(p[1] for p in next_bucket) / len(next_bucket)
+
+        start = int(i * size) + 1
+        end = int((i + 1) * size) + 1
+        ax, ay = points[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+
+DOWNSAMPLERS = {
+    'lttb': lttb,
+    'bucket': bucket_average,
+}
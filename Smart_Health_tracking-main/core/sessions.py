@@ -0,0 +1,41 @@
+from django.contrib.sessions.backends import cached_db
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+
+from core.auth import cache_is_shared
+
+
+class SessionStore(cached_db.SessionStore):
+    """cached_db when the default cache is shared between worker processes, plain db otherwise
+
+    Logging out deletes the session from the cache the worker can reach. With a
+    per-process cache the other workers would keep serving it, so sessions are then
+    read from django_session on every request.
+    """
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self.cached = cache_is_shared()
+
+    def load(self):
+        return super().load() if self.cached else DBStore.load(self)
+
+    async def aload(self):
+        return await (super().aload() if self.cached else DBStore.aload(self))
+
+    def exists(self, session_key):
+        return super().exists(session_key) if self.cached else DBStore.exists(self, session_key)
+
+    async def aexists(self, session_key):
+        return await (super().aexists(session_key) if self.cached else DBStore.aexists(self, session_key))
+
+    def save(self, must_create=False):
+        return super().save(must_create) if self.cached else DBStore.save(self, must_create)
+
+    async def asave(self, must_create=False):
+        return await (super().asave(must_create) if self.cached else DBStore.asave(self, must_create))
+
+    def delete(self, session_key=None):
+        return super().delete(session_key) if self.cached else DBStore.delete(self, session_key)
+
+    async def adelete(self, session_key=None):
+        return await (super().adelete(session_key) if self.cached else DBStore.adelete(self, session_key))
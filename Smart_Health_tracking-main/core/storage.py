@@ -0,0 +1,189 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.utils.deconstruct import deconstructible
+
+BLOB_DIR = '.blobs'
+CHUNK_SIZE = 64 * 1024
+
+
+# 🔹 Upload handlers: hash each chunk as it arrives, so storage never rereads the upload
+class HashingUploadMixin:
+    def new_file(self, *args, **kwargs):
+        self.sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if uploaded is not None:
+            uploaded.sha256 = self.sha256.hexdigest()
+        return uploaded
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    pass
+
+
+# 🔹 Storage
+@deconstructible(path='core.storage.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+    """Stores each distinct file once under .blobs/<sha256>; upload_to names are hard links to it
+
+    A blob's link count is its reference count: deleting a logical name just unlinks it,
+    and gc() removes blobs no name points at any more. Where hard links are unavailable
+    the name becomes a symlink (or, as a last resort, a plain copy).
+    """
+
+    def url(self, name):
+        # Versioned and signed for the requesting user, so core.media can serve it without
+        # repeating the access check; outside a request the plain URL gets the full check
+        from core.media import file_version, signed_query, signing_user
+
+        user = signing_user.get()
+        if user is None or not user.is_authenticated:
+            return super().url(name)
+        return f"{super().url(name)}?{signed_query(name, file_version(self.path(name)), user.pk)}"
+
+    def blob_path(self, digest):
+        return os.path.join(self.location, BLOB_DIR, digest[:2], digest)
+
+    def _save(self, name, content):
+        digest = getattr(content, 'sha256', None)
+        if digest is None or not os.path.exists(self.blob_path(digest)):
+            if digest is not None and hasattr(content, 'temporary_file_path'):
+                # Hashed while uploading and already on disk: move it into place, no copy
+                blob = self.blob_path(digest)
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                file_move_safe(content.temporary_file_path(), blob, allow_overwrite=True)
+                self._set_permissions(blob)
+            else:
+                digest = self._write_blob(content)
+
+        blob = self.blob_path(digest)
+        # Fresh mtime keeps gc() from collecting the blob before the link below exists
+        os.utime(blob)
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        while True:
+            try:
+                self._link(blob, full_path)
+                break
+            except FileExistsError:
+                # Lost a race for this name; take the next free one
+                name = self.get_available_name(name)
+                full_path = self.path(name)
+        return str(name).replace('\\', '/')
+
+    def _write_blob(self, content):
+        """Copy content into the blob store, hashing in the same pass; returns the digest"""
+        blob_root = os.path.join(self.location, BLOB_DIR)
+        os.makedirs(blob_root, exist_ok=True)
+        sha256 = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=blob_root, prefix='.incoming-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks(CHUNK_SIZE):
+                    sha256.update(chunk)
+                    tmp.write(chunk)
+            digest = sha256.hexdigest()
+            blob = self.blob_path(digest)
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            if os.path.exists(blob):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, blob)
+                self._set_permissions(blob)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return digest
+
+    def _set_permissions(self, path):
+        if self.file_permissions_mode is not None:
+            os.chmod(path, self.file_permissions_mode)
+
+    @staticmethod
+    def _link(blob, full_path):
+        try:
+            os.link(blob, full_path)
+        except FileExistsError:
+            raise
+        except OSError:
+            try:
+                os.symlink(blob, full_path)
+            except FileExistsError:
+                raise
+            except OSError:
+                with open(full_path, 'xb') as target, open(blob, 'rb') as source:
+                    shutil.copyfileobj(source, target, CHUNK_SIZE)
+
+    # 🔹 Maintenance
+    def iter_names(self):
+        """Logical names (relative paths) outside the blob store"""
+        for root, dirs, files in os.walk(self.location):
+            dirs[:] = [d for d in dirs if d != BLOB_DIR]
+            for filename in files:
+                yield os.path.relpath(os.path.join(root, filename), self.location).replace(os.sep, '/')
+
+    def adopt(self, name):
+        """Move an existing plain file into the blob store and link it back; True if deduplicated"""
+        full_path = self.path(name)
+        if os.path.islink(full_path) or os.stat(full_path).st_nlink > 1:
+            return False
+        sha256 = hashlib.sha256()
+        with open(full_path, 'rb') as handle:
+            for chunk in iter(lambda: handle.read(CHUNK_SIZE), b''):
+                sha256.update(chunk)
+        blob = self.blob_path(sha256.hexdigest())
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        existed = os.path.exists(blob)
+        if existed:
+            os.remove(full_path)
+        else:
+            os.replace(full_path, blob)
+        self._link(blob, full_path)
+        return existed
+
+    def gc(self, min_age=3600, dry_run=False):
+        """Delete blobs no logical name refers to; returns (blobs removed, bytes reclaimed)
+
+        Blobs younger than ``min_age`` seconds are kept: a concurrent save may have written
+        the blob but not linked its name yet.
+        """
+        symlinked = set()
+        for name in self.iter_names():
+            full_path = self.path(name)
+            if os.path.islink(full_path):
+                symlinked.add(os.path.realpath(full_path))
+
+        removed = reclaimed = 0
+        cutoff = time.time() - min_age
+        blob_root = os.path.join(self.location, BLOB_DIR)
+        for root, _, files in os.walk(blob_root):
+            for filename in files:
+                path = os.path.join(root, filename)
+                stat = os.stat(path)
+                if stat.st_nlink > 1 or os.path.realpath(path) in symlinked or stat.st_mtime > cutoff:
+                    continue
+                removed += 1
+                reclaimed += stat.st_size
+                if not dry_run:
+                    os.remove(path)
+        return removed, reclaimed
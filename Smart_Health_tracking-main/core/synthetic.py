@@ -0,0 +1,217 @@
+import random
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from core.importers import historical_timestamps
+from core.models import (
+    User, Location, Hospital, Appointment, HealthLog, PatientVisit, VisitRecord,
+    PatientTask, MoodLog, ImprovementScore, Message, SOSAlert, ExerciseVideo, CareAssignment,
+)
+
+BATCH_SIZE = 2000
+MOODS = ['happy', 'neutral', 'sad', 'anxious', 'excited', 'tired']
+# City → (latitude, longitude)
+CITY_COORDINATES = {
+    'Bengaluru': (12.97, 77.59),
+    'Mysuru': (12.30, 76.64),
+    'Chennai': (13.08, 80.27),
+    'Hyderabad': (17.39, 78.49),
+    'Pune': (18.52, 73.86),
+    'Mumbai': (19.08, 72.88),
+    'Delhi': (28.61, 77.21),
+    'Kochi': (9.93, 76.27),
+}
+CITIES = list(CITY_COORDINATES)
+
+# Average events per patient per week
+RATES = {
+    'tasks': 4,
+    'moods': 3,
+    'scores': 1,
+    'messages': 2,
+    'health_logs': 1,
+    'visits': 0.25,
+    'appointments': 0.25,
+    'sos': 0.04,
+}
+
+
+class Population:
+    """Handles to the generated rows, for callers that need concrete IDs"""
+
+    def __init__(self):
+        self.patients = []
+        self.doctors = []
+        self.therapists = []
+        self.hospitals = []
+        self.counts = {}
+
+
+def _weekly(rng, rate, weeks):
+    # Poisson-ish count with the right mean, cheap to draw
+    mean = rate * weeks
+    return max(0, int(rng.gauss(mean, mean ** 0.5)))
+
+
+def _bulk(model, objs, counts):
+    with historical_timestamps(model):
+        model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+    counts[model.__name__] = counts.get(model.__name__, 0) + len(objs)
+
+
+def generate_population(patients=100, doctors=10, therapists=10, years=1, seed=42, now=None):
+    """Create a realistic, reproducible population with ``years`` of history per patient"""
+    rng = random.Random(seed)
+    now = now or datetime.now(dt_timezone.utc).replace(microsecond=0)
+    start = now - timedelta(days=365 * years)
+    weeks = years * 52
+    span = (now - start).total_seconds()
+    population = Population()
+    counts = population.counts
+    password = make_password('benchmark')
+    task_names = dict(PatientTask.TASK_TYPE_CHOICES)
+    task_types = list(task_names)
+
+    def moment():
+        return start + timedelta(seconds=rng.random() * span)
+
+    with transaction.atomic():
+        locations = Location.objects.bulk_create([
+            Location(name=city, latitude=lat, longitude=lng) for city, (lat, lng) in CITY_COORDINATES.items()
+        ])
+        # Hospitals scattered within ~10 km of their city centre; own generator, so the rest
+        # of the population is the same as before coordinates existed
+        scatter = random.Random(seed)
+        hospitals = Hospital.objects.bulk_create([
+            Hospital(name=f"{location.name} General {i}", location=location,
+                     latitude=location.latitude + scatter.uniform(-0.1, 0.1),
+                     longitude=location.longitude + scatter.uniform(-0.1, 0.1))
+            for location in locations for i in range(1, 4)
+        ])
+        population.hospitals = hospitals
+
+        def users(role, prefix, count):
+            objs = [
+                User(
+                    username=f"{prefix.lower()}_{seed}_{i}", unique_id=f"{prefix}_S{seed}_{i}",
+                    role=role, password=password, first_name=prefix.title(), last_name=str(i),
+                    email=f"{prefix.lower()}{i}@example.com", location=rng.choice(CITIES),
+                    date_joined=start,
+                )
+                for i in range(count)
+            ]
+            User.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+            return list(User.objects.filter(role=role, unique_id__startswith=f"{prefix}_S{seed}_").order_by('pk'))
+
+        population.doctors = users('doctor', 'DOC', doctors)
+        population.therapists = users('therapist', 'THE', therapists)
+        population.patients = users('patient', 'PAT', patients)
+        clinicians = population.doctors + population.therapists
+
+        videos = [
+            ExerciseVideo(
+                therapist=rng.choice(population.therapists), title=f"{label} session {i}",
+                exercise_type=key, video_file=f"exercise_videos/synthetic_{key}_{i}.mp4",
+                duration_minutes=rng.randint(5, 45), created_at=moment(), updated_at=now,
+                views_count=rng.randint(0, 500),
+            )
+            for key, label in ExerciseVideo.EXERCISE_TYPE_CHOICES for i in range(3)
+        ]
+        _bulk(ExerciseVideo, videos, counts)
+
+        for index, patient in enumerate(population.patients):
+            doctor = rng.choice(population.doctors)
+            # Therapists take patients round-robin; doctors get theirs from visits and appointments
+            therapist = population.therapists[index % len(population.therapists)]
+            care_team = {doctor.pk: ('doctor', 'visit'), therapist.pk: ('therapist', 'manual')}
+            tasks, moods, scores, messages, logs = [], [], [], [], []
+            visits, records, appointments, alerts = [], [], [], []
+
+            for _ in range(_weekly(rng, RATES['tasks'], weeks)):
+                began = moment()
+                minutes = max(1, int(rng.gauss(30, 12)))
+                kind = rng.choice(task_types)
+                tasks.append(PatientTask(
+                    patient=patient, task_type=kind,
+                    task_name=task_names[kind], status='completed',
+                    started_at=began, completed_at=began + timedelta(minutes=minutes),
+                    duration_minutes=minutes, feedback=rng.choice(['', '', 'Good effort']),
+                ))
+            # A few open tasks so "in progress" and "pending" paths have data
+            tasks.append(PatientTask(patient=patient, task_name='Exercise', status='in_progress',
+                                     started_at=now - timedelta(minutes=rng.randint(5, 180))))
+            tasks.append(PatientTask(patient=patient, task_name='Yoga', task_type='yoga', status='pending'))
+
+            moods += [MoodLog(patient=patient, mood=rng.choice(MOODS), logged_at=moment())
+                      for _ in range(_weekly(rng, RATES['moods'], weeks))]
+            scores += [ImprovementScore(patient=patient, score=rng.randint(0, 100), recorded_at=moment())
+                       for _ in range(_weekly(rng, RATES['scores'], weeks))]
+            messages += [
+                Message(sender=patient, receiver=other, content="How is my progress?", timestamp=moment())
+                if rng.random() < 0.5 else
+                Message(sender=other, receiver=patient, content="Keep it up!", timestamp=moment(),
+                        is_deleted=rng.random() < 0.1)
+                for other in [rng.choice(clinicians) for _ in range(_weekly(rng, RATES['messages'], weeks))]
+            ]
+            logs += [HealthLog(patient=patient, date=moment().date(), blood_pressure='120/80',
+                               heart_rate=str(rng.randint(60, 100)))
+                     for _ in range(_weekly(rng, RATES['health_logs'], weeks))]
+
+            score = rng.randint(5, 30)
+            visit_dates = sorted(moment().date() for _ in range(_weekly(rng, RATES['visits'], weeks)))
+            for visit_date in visit_dates:
+                score = max(0, min(100, score + rng.randint(-5, 12)))
+                records.append(VisitRecord(
+                    patient=patient, doctor=doctor, visit_date=visit_date,
+                    hospital_name=rng.choice(hospitals).name, doctor_name=doctor.get_full_name(),
+                    current_status='recovered' if score >= 90 else rng.choice(['stable', 'improving']),
+                    improvement_score=score, doctor_notes="Routine review.",
+                    summary=f"{visit_date}: improving ({score}%)",
+                ))
+                if rng.random() < 0.3:
+                    visits.append(PatientVisit(
+                        source='legacy', patient=patient, doctor=doctor, visit_date=visit_date,
+                        hospital_name=records[-1].hospital_name, doctor_name=doctor.get_full_name(),
+                        medicine_details="Paracetamol 500mg",
+                    ))
+
+            for _ in range(_weekly(rng, RATES['appointments'], weeks)):
+                booked = moment()
+                day = (booked + timedelta(days=rng.randint(1, 30))).date()
+                appointments.append(Appointment(
+                    patient=patient, doctor=rng.choice(population.doctors), hospital=rng.choice(hospitals),
+                    date=day, time=time(rng.randint(9, 16), rng.choice([0, 30])),
+                    status='pending' if day >= now.date() else rng.choice(['completed', 'cancelled', 'confirmed']),
+                    reason="Follow-up", created_at=booked,
+                ))
+
+            for _ in range(_weekly(rng, RATES['sos'], weeks)):
+                raised = moment()
+                alerts.append(SOSAlert(
+                    patient=patient, message="Need help", status='resolved', created_at=raised,
+                    acknowledged_at=raised + timedelta(minutes=5), resolved_at=raised + timedelta(minutes=30),
+                    acknowledged_by_doctor=True, acknowledged_by_therapist=True,
+                ))
+
+            for appointment in appointments:
+                care_team.setdefault(appointment.doctor_id, ('doctor', 'appointment'))
+            assignments = [
+                CareAssignment(clinician_id=clinician_id, patient=patient, role=role, source=source, created_at=start)
+                for clinician_id, (role, source) in care_team.items()
+            ]
+
+            for model, objs in [
+                (CareAssignment, assignments),
+                (PatientTask, tasks), (MoodLog, moods), (ImprovementScore, scores), (Message, messages),
+                (HealthLog, logs), (VisitRecord, records), (PatientVisit, visits),
+                (Appointment, appointments), (SOSAlert, alerts),
+            ]:
+                _bulk(model, objs, counts)
+
+        # Something for the SOS panels to show
+        _bulk(SOSAlert, [SOSAlert(patient=p, status='active', created_at=now)
+                         for p in population.patients[:3]], counts)
+
+    return population
@@ -0,0 +1,112 @@
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core import changes
+from core.models import PatientTask
+
+TASK_NAMES = dict(PatientTask.TASK_TYPE_CHOICES)
+STATE_COLUMNS = ['id', 'client_key', 'task_type', 'task_name', 'status', 'started_at', 'completed_at',
+                 'duration_minutes']
+
+
+class SyncEventError(ValueError):
+    """An event in a sync batch that cannot be applied (bad action, type, time or reference)"""
+
+
+def task_duration(started_at, completed_at):
+    """Whole minutes between start and completion, at least 1"""
+    if not started_at:
+        return 1  # fallback if start time is missing
+    return max(1, round((completed_at - started_at).total_seconds() / 60))
+
+
+# 🔹 Parsing client events
+def _parse_time(value, now):
+    at = parse_datetime(value) if isinstance(value, str) else None
+    if at is None:
+        raise SyncEventError("'at' must be an ISO 8601 timestamp.")
+    if timezone.is_naive(at):
+        at = timezone.make_aware(at)
+    # Client clocks drift; nothing can have happened after the server received it
+    return min(at, now)
+
+
+def parse_event(event, now):
+    """One client event → (action, key or task id, fields)"""
+    if not isinstance(event, dict):
+        raise SyncEventError("Each event must be an object.")
+    action = event.get('action')
+    key = event.get('key')
+    at = _parse_time(event.get('at'), now)
+    if action == 'start':
+        if not isinstance(key, str) or not 0 < len(key) <= 64:
+            raise SyncEventError("start needs a 'key' of 1-64 characters.")
+        if event.get('task_type') not in TASK_NAMES:
+            raise SyncEventError("Unknown task_type.")
+        return action, key, {'task_type': event['task_type'], 'started_at': at}
+    if action == 'complete':
+        # Offline-started tasks are named by their key, tasks started online by their id
+        if isinstance(key, str) and key:
+            return action, key, {'completed_at': at}
+        if isinstance(event.get('task_id'), int):
+            return action, event['task_id'], {'completed_at': at}
+        raise SyncEventError("complete needs the task's 'key' or 'task_id'.")
+    raise SyncEventError("action must be 'start' or 'complete'.")
+
+
+# 🔹 Applying a batch
+def _complete(task, completed_at):
+    task.completed_at = completed_at
+    task.duration_minutes = task_duration(task.started_at, completed_at)
+    task.status = 'completed'
+
+
+def apply_events(patient, events):
+    """Apply start/complete events in one transaction; returns (task states, rejected events)
+
+    The task key is the idempotency key: a start for a known key and a complete for a
+    finished task change nothing, so a client can resend a whole batch after a lost reply.
+    """
+    now = timezone.now()
+    parsed, rejected = [], []
+    for index, event in enumerate(events):
+        try:
+            parsed.append((index, *parse_event(event, now)))
+        except SyncEventError as exc:
+            rejected.append({'index': index, 'error': str(exc)})
+    # Starts first, so a batch may complete a task it starts whatever order the client queued them in
+    parsed.sort(key=lambda item: item[1] != 'start')
+
+    keys = {ref for _, _, ref, _ in parsed if isinstance(ref, str)}
+    ids = {ref for _, _, ref, _ in parsed if isinstance(ref, int)}
+    with transaction.atomic():
+        by_key = {task.client_key: task for task in PatientTask.objects.filter(patient=patient, client_key__in=keys)}
+        by_id = {task.id: task for task in PatientTask.objects.filter(patient=patient, id__in=ids)}
+        created, updated = {}, {}
+        for index, action, ref, fields in parsed:
+            task = by_key.get(ref) if isinstance(ref, str) else by_id.get(ref)
+            if action == 'start':
+                if task is None:
+                    by_key[ref] = created[ref] = PatientTask(
+                        patient=patient, client_key=ref, task_name=TASK_NAMES[fields['task_type']],
+                        status='in_progress', **fields,
+                    )
+            elif task is None:
+                rejected.append({'index': index, 'error': "No such task."})
+            elif task.status != 'completed':
+                _complete(task, fields['completed_at'])
+                if task.pk:
+                    updated[task.pk] = task
+
+        PatientTask.objects.bulk_create(created.values())
+        PatientTask.objects.bulk_update(updated.values(), ['completed_at', 'duration_minutes', 'status'])
+        # Bulk writes send no post_save
+        touched = [*created.values(), *updated.values()]
+        if touched:
+            changes.record(PatientTask, touched)
+
+    states = PatientTask.objects.filter(patient=patient, id__in=[
+        task.pk for task in [*by_key.values(), *by_id.values()]
+    ]).order_by('id').values(*STATE_COLUMNS)
+    return list(states), sorted(rejected, key=lambda item: item['index'])
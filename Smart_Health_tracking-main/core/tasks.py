@@ -0,0 +1,55 @@
+from django.core.files.storage import default_storage
+
+from core.jobs import background
+
+
+@background(priority=8)
+def delete_stored_files(names):
+    """Remove files from media storage; missing files are ignored, so retries are harmless"""
+    for name in names:
+        if name:
+            default_storage.delete(name)
+
+
+@background(priority=8)
+def expire_appointments():
+    """Mark past-date pending appointments expired; a rerun finds nothing left to change"""
+    from core.appointments import expire_stale
+
+    expire_stale()
+
+
+@background(priority=9, max_attempts=5)
+def archive_history(days=None, batch_size=None):
+    """Move rows past the archive horizon to the cold tier; already-moved rows are skipped on retry"""
+    from core.archive import archive_all
+
+    archive_all(days=days, batch_size=batch_size)
+
+
+@background(priority=9)
+def compact_messages(days=None, batch_size=None):
+    """Purge expired soft-deleted messages, then hand the freed pages back on SQLite"""
+    from django.db import connection
+
+    from core.archive import purge_deleted_messages
+    from core.db import incremental_vacuum
+
+    if purge_deleted_messages(days=days, batch_size=batch_size):
+        incremental_vacuum(connection)
+
+
+@background(priority=9)
+def prune_changes(days=None):
+    """Drop change-feed events past the retention window"""
+    from core.changes import prune
+
+    prune(days=days)
+
+
+@background(priority=9)
+def cohort_analytics():
+    """Recompute the cohort analytics report; a rerun just replaces it"""
+    from core.analytics import refresh_cohort_analytics
+
+    refresh_cohort_analytics()
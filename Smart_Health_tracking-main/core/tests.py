@@ -1,3 +1,973 @@
-from django.test import TestCase
+import hashlib
+import importlib
+import os
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock, skipUnless
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.db.models import F, Q
+from django.db.migrations.executor import MigrationExecutor
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import escape
+from django.utils.http import http_date
+
+from core import admission, analytics, anomalies, archive, changes, geo, importers, media, watch
+from core.appointments import expire_stale
+from core.forms import PatientProfileForm
+from core.sessions import SessionStore
+from core.importers import CheckpointMismatch, import_file
+from core.middleware import PIN_COOKIE, ReplicaRoutingMiddleware
+from core.models import (
+    Appointment, ArchivedMessage, ArchivedMoodLog, BackgroundJob, CareAssignment, ChangeEvent, CohortReport, DataVersion, ExerciseVideo, HealthLog, Hospital, ImportCheckpoint, ImprovementScore,
+    Location, Message, MoodLog, PatientTask, PatientVisit, SOSAlert, TaskAlert, User,
+    VideoProgress, Visit, VisitRecord,
+)
+from core.routers import PrimaryReplicaRouter, read_from_replica
+from core.series import series_version
+from core.storage import BLOB_DIR, ContentAddressedStorage
+from core.task_sync import apply_events
+
+copy_migration = importlib.import_module('core.migrations.0025_copy_patientvisit')
+
+
+# 🔹 Visit table merge (0024 → 0025)
+class PatientVisitCopyMigrationTests(TransactionTestCase):
+    before = [('core', '0024_visit')]
+    after = [('core', '0025_copy_patientvisit')]
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.migrate(target)
+        return executor.loader.project_state(target).apps
+
+    def setUp(self):
+        apps = self.migrate(self.before)
+        OldUser = apps.get_model('core', 'User')
+        OldPatientVisit = apps.get_model('core', 'PatientVisit')
+        OldVisit = apps.get_model('core', 'Visit')
+        self.patient = OldUser.objects.create(username='patient', role='patient')
+        self.doctor = OldUser.objects.create(username='doctor', role='doctor')
+        # The old doctor column defaults to this fixed user; restored rows fall back to it
+        OldUser.objects.create(pk=OldPatientVisit._meta.get_field('doctor').get_default(),
+                               username='default-doctor', role='doctor')
+        self.legacy = [
+            OldPatientVisit.objects.create(
+                patient_id=self.patient.pk, doctor_id=self.doctor.pk, visit_date=date(2024, 1, day),
+                hospital_name='City', doctor_name='Dr. Rao', report_file=f'reports/{day}.pdf',
+                medicine_details=f'dose {day}', therapist_notes='walk daily',
+            )
+            for day in (1, 2, 3)
+        ]
+        self.record = OldVisit.objects.create(
+            source='record', patient_id=self.patient.pk, doctor_id=self.doctor.pk, visit_date=date(2024, 2, 1),
+            hospital_name='City', doctor_name='Dr. Rao',
+        )
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_forward_copies_every_legacy_visit(self):
+        apps = self.migrate(self.after)
+        copies = {visit.legacy_id: visit for visit in apps.get_model('core', 'Visit').objects.filter(source='legacy')}
+        self.assertEqual(set(copies), {old.pk for old in self.legacy})
+        for old in self.legacy:
+            copy = copies[old.pk]
+            self.assertEqual(
+                (copy.patient_id, copy.doctor_id, copy.visit_date, copy.report_file.name, copy.medicine_details),
+                (old.patient_id, None, old.visit_date, old.report_file.name, old.medicine_details),
+            )
+
+    def test_later_migration_clears_doctor_on_copies_made_before_the_fix(self):
+        apps = self.migrate([('core', '0037_care_assignment_patient_source')])
+        Visit_ = apps.get_model('core', 'Visit')
+        Visit_.objects.filter(source='legacy').update(doctor_id=self.doctor.pk)
+        submitted = Visit_.objects.create(source='legacy', patient_id=self.patient.pk, doctor_id=self.doctor.pk,
+                                          hospital_name='City', doctor_name='Dr. Rao')
+        apps = self.migrate([('core', '0038_clear_legacy_visit_doctor')])
+        Visit_ = apps.get_model('core', 'Visit')
+        self.assertFalse(Visit_.objects.filter(legacy_id__isnull=False, doctor__isnull=False).exists())
+        self.assertEqual(Visit_.objects.get(pk=submitted.pk).doctor_id, self.doctor.pk)
+        self.assertEqual(Visit_.objects.get(pk=self.record.pk).doctor_id, self.doctor.pk)
+
+    def test_rerun_after_interrupted_copy_adds_no_duplicates(self):
+        apps = self.migrate(self.after)
+        Visit_ = apps.get_model('core', 'Visit')
+        # As if the first run stopped after one batch: one copy is missing
+        Visit_.objects.filter(legacy_id=self.legacy[-1].pk).delete()
+        with connection.schema_editor() as editor:
+            copy_migration.copy_patient_visits(apps, editor)
+            copy_migration.copy_patient_visits(apps, editor)
+        self.assertEqual(
+            sorted(Visit_.objects.filter(source='legacy').values_list('legacy_id', flat=True)),
+            [old.pk for old in self.legacy],
+        )
+
+    def test_backward_right_after_copy_keeps_legacy_table(self):
+        self.migrate(self.after)
+        self.assert_restored(self.migrate(self.before))
+
+    def test_backward_from_proxy_restores_legacy_table(self):
+        # 0026 drops core_patientvisit; rolling back recreates it empty and refills it from core_visit
+        self.migrate([('core', '0026_patientvisit_proxy')])
+        self.assert_restored(self.migrate(self.before))
+
+    def assert_restored(self, apps):
+        restored = apps.get_model('core', 'PatientVisit').objects.order_by('pk')
+        self.assertEqual(
+            [(visit.pk, visit.visit_date, visit.report_file.name, visit.therapist_notes) for visit in restored],
+            [(old.pk, old.visit_date, old.report_file.name, old.therapist_notes) for old in self.legacy],
+        )
+        remaining = apps.get_model('core', 'Visit').objects.values_list('pk', 'source')
+        self.assertEqual(list(remaining), [(self.record.pk, 'record')])
+
+
+# 🔹 VisitRecord / PatientVisit proxies over Visit
+class VisitProxyTests(TestCase):
+    def setUp(self):
+        self.patient = User.objects.create(username='patient', role='patient')
+        self.doctor = User.objects.create(username='doctor', role='doctor')
+
+    def visit(self, model, **fields):
+        return model.objects.create(patient=self.patient, doctor=self.doctor, hospital_name='City',
+                                    doctor_name='Dr. Rao', **fields)
+
+    def test_managers_filter_by_source(self):
+        record = self.visit(VisitRecord)
+        legacy = self.visit(PatientVisit)
+        self.assertEqual(list(VisitRecord.objects.values_list('pk', flat=True)), [record.pk])
+        self.assertEqual(list(PatientVisit.objects.values_list('pk', flat=True)), [legacy.pk])
+        self.assertEqual(Visit.objects.count(), 2)
+
+    def test_save_forces_source(self):
+        record = self.visit(VisitRecord, source='legacy')
+        legacy = self.visit(PatientVisit, source='record')
+        self.assertEqual(Visit.objects.get(pk=record.pk).source, 'record')
+        self.assertEqual(Visit.objects.get(pk=legacy.pk).source, 'legacy')
+
+    def test_record_summary_is_filled_only_for_records(self):
+        record = self.visit(VisitRecord, current_status='stable', improvement_score=40)
+        legacy = self.visit(PatientVisit)
+        self.assertIn('stable (40%)', record.summary)
+        self.assertIsNone(legacy.summary)
+
+
+# 🔹 Offline task sync
+class ApplyEventsTests(TestCase):
+    def setUp(self):
+        self.patient = User.objects.create(username='patient', role='patient')
+        self.started = timezone.now() - timedelta(minutes=30)
+
+    def at(self, minutes):
+        return (self.started + timedelta(minutes=minutes)).isoformat()
+
+    def batch(self):
+        return [
+            {'action': 'start', 'key': 'walk-1', 'task_type': 'exercise', 'at': self.at(0)},
+            {'action': 'complete', 'key': 'walk-1', 'at': self.at(20)},
+            {'action': 'start', 'key': 'yoga-1', 'task_type': 'yoga', 'at': self.at(5)},
+        ]
+
+    def test_replaying_a_batch_changes_nothing(self):
+        first, _ = apply_events(self.patient, self.batch())
+        events = ChangeEvent.objects.count()
+        self.assertGreater(events, 0)
+        again, rejected = apply_events(self.patient, self.batch())
+        self.assertEqual(again, first)
+        self.assertEqual(rejected, [])
+        self.assertEqual(PatientTask.objects.filter(patient=self.patient).count(), 2)
+        self.assertEqual(ChangeEvent.objects.count(), events)
+
+    def test_complete_queued_before_its_start(self):
+        states, rejected = apply_events(self.patient, [
+            {'action': 'complete', 'key': 'walk-1', 'at': self.at(20)},
+            {'action': 'start', 'key': 'walk-1', 'task_type': 'exercise', 'at': self.at(0)},
+        ])
+        self.assertEqual(rejected, [])
+        [task] = states
+        self.assertEqual((task['client_key'], task['status'], task['duration_minutes']), ('walk-1', 'completed', 20))
+
+    def test_rejected_events_are_reported_by_index(self):
+        states, rejected = apply_events(self.patient, [
+            {'action': 'start', 'key': 'walk-1', 'task_type': 'exercise', 'at': self.at(0)},
+            {'action': 'start', 'key': 'odd-1', 'task_type': 'juggling', 'at': self.at(0)},
+            {'action': 'complete', 'key': 'missing', 'at': self.at(10)},
+            {'action': 'start', 'key': 'walk-2', 'task_type': 'exercise', 'at': 'yesterday'},
+            'not an event',
+        ])
+        self.assertEqual(rejected, [
+            {'index': 1, 'error': "Unknown task_type."},
+            {'index': 2, 'error': "No such task."},
+            {'index': 3, 'error': "'at' must be an ISO 8601 timestamp."},
+            {'index': 4, 'error': "Each event must be an object."},
+        ])
+        self.assertEqual([task['client_key'] for task in states], ['walk-1'])
+
+
+# 🔹 Appointment expiry
+class ExpireStaleTests(TestCase):
+    def test_expires_in_batches_with_an_event_per_party(self):
+        patient = User.objects.create(username='patient', role='patient')
+        doctor = User.objects.create(username='doctor', role='doctor')
+        hospital = Hospital.objects.create(name='City', location=Location.objects.create(name='Town'))
+        Appointment.objects.bulk_create([
+            Appointment(patient=patient, doctor=doctor, hospital=hospital, date=date(2024, 1, day), time=time(9),
+                        status=status)
+            for day in range(1, 8) for status in ('pending', 'confirmed')
+        ])
+        self.assertEqual(expire_stale(date(2024, 1, 6), batch_size=2), 5)
+        expired = set(Appointment.objects.filter(status='expired').values_list('pk', flat=True))
+        self.assertEqual(len(expired), 5)
+        self.assertEqual(Appointment.objects.filter(status='pending').count(), 2)
+        events = ChangeEvent.objects.filter(model='appointment').values_list('object_id', 'user_id')
+        self.assertEqual(sorted(events), sorted((pk, user.pk) for pk in expired for user in (patient, doctor)))
+        self.assertEqual(expire_stale(date(2024, 1, 6)), 0)
+
+
+# 🔹 Appointment actions
+class CancelAppointmentTests(TestCase):
+    def test_cancel_changes_nothing_on_get(self):
+        doctor = User.objects.create(username='doctor', role='doctor')
+        appointment = Appointment.objects.create(
+            patient=User.objects.create(username='patient', role='patient'), doctor=doctor,
+            hospital=Hospital.objects.create(name='City', location=Location.objects.create(name='Town')),
+            date=date(2024, 1, 1), time=time(9), status='pending',
+        )
+        self.client.force_login(doctor)
+        url = reverse('cancel_appointment', args=[appointment.pk])
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertEqual(Appointment.objects.get(pk=appointment.pk).status, 'pending')
+        self.assertRedirects(self.client.post(url), reverse('doctor_dashboard'), fetch_redirect_response=False)
+        self.assertEqual(Appointment.objects.get(pk=appointment.pk).status, 'cancelled')
+
+
+# 🔹 Nearest-hospital index
+class HospitalIndexTests(TestCase):
+    def setUp(self):
+        self.location = Location.objects.create(name='Town', latitude=12.97, longitude=77.59)
+        self.near = Hospital.objects.create(name='Near', location=self.location)
+
+    def nearest_names(self):
+        return [row['name'] for row in geo.nearest_with_free_slots(12.97, 77.59, 5, date(2024, 1, 1))]
+
+    def test_saving_a_hospital_rebuilds_the_index(self):
+        self.assertEqual(self.nearest_names(), ['Near'])
+        Hospital.objects.create(name='Far', location=self.location, latitude=13.5, longitude=77.59)
+        self.assertEqual(self.nearest_names(), ['Near', 'Far'])
+
+    def test_a_version_bumped_by_another_process_rebuilds_the_index(self):
+        self.assertEqual(self.nearest_names(), ['Near'])
+        # Another worker's write: this process sees no signal, only the stored version moving
+        Hospital.objects.bulk_create([Hospital(name='Far', location=self.location, latitude=13.5, longitude=77.59)])
+        self.assertEqual(self.nearest_names(), ['Near'])
+        DataVersion.objects.filter(name=geo.VERSION_NAME).update(version=F('version') + 1)
+        self.assertEqual(self.nearest_names(), ['Near', 'Far'])
+
+    def test_widening_past_booked_hospitals_is_capped_and_chunked(self):
+        self.near.daily_slots = 0
+        self.near.save()
+        for step in range(1, 6):
+            Hospital.objects.create(name=f'Booked {step}', location=self.location, latitude=12.97 + step / 100,
+                                    longitude=77.59, daily_slots=0)
+        Hospital.objects.create(name='Open', location=self.location, latitude=13.5, longitude=77.59)
+        with mock.patch.object(geo, 'QUERY_CHUNK_SIZE', 2):
+            self.assertEqual(self.nearest_names(), ['Open'])
+            with override_settings(HOSPITAL_CANDIDATES_MAX=4):
+                self.assertEqual(self.nearest_names(), [])
+
+
+# 🔹 Video heartbeat buffer
+class HeartbeatFlushTests(TransactionTestCase):
+    def tearDown(self):
+        watch.reset()
+
+    @override_settings(VIDEO_PROGRESS_FLUSH_SECONDS=0.2)
+    def test_idle_buffer_is_flushed_by_age(self):
+        patient = User.objects.create(username='patient', role='patient')
+        therapist = User.objects.create(username='therapist', role='therapist')
+        video = ExerciseVideo.objects.create(therapist=therapist, title='Stretch', video_file='exercise_videos/1.mp4')
+        flushed = threading.Event()
+        real_flush = watch.flush
+
+        def flush():
+            real_flush()
+            flushed.set()
+
+        with mock.patch.object(watch, 'flush', flush):
+            watch.record(patient.pk, video.pk, watch.parse_heartbeat({'position': 15, 'played': 15, 'duration': 600}))
+            self.assertFalse(VideoProgress.objects.exists())
+            # No further heartbeat arrives to trigger the flush
+            self.assertTrue(flushed.wait(5))
+        row = VideoProgress.objects.get(patient=patient, video=video)
+        self.assertEqual((row.position_seconds, row.watched_seconds), (15, 15))
+
+
+# 🔹 Bulk import checkpoints
+class ImportCheckpointTests(TestCase):
+    def setUp(self):
+        User.objects.create(username='patient', role='patient', unique_id='PAT_1')
+        self.path = self.source(5)
+
+    def source(self, rows):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as out:
+            out.write('patient,date,heart_rate\n')
+            out.writelines(f'PAT_1,2024-01-{day:02},{70 + day}\n' for day in range(1, rows + 1))
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_crash_before_the_checkpoint_rolls_back_its_chunk(self):
+        save = importers.save_checkpoint
+        calls = []
+
+        def crash_on_second(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError("killed")
+            save(*args, **kwargs)
+
+        with mock.patch.object(importers, 'save_checkpoint', crash_on_second), self.assertRaises(RuntimeError):
+            import_file(self.path, 'healthlog', chunk_size=2, checkpoint='logs')
+        self.assertEqual(HealthLog.objects.count(), 2)
+        self.assertEqual(ImportCheckpoint.objects.get(name='logs').rows_done, 2)
+
+        self.assertEqual(import_file(self.path, 'healthlog', chunk_size=2, checkpoint='logs'), (3, 0))
+        self.assertEqual(sorted(HealthLog.objects.values_list('heart_rate', flat=True)),
+                         ['71', '72', '73', '74', '75'])
+
+    def test_checkpoint_of_another_file_or_model_is_rejected(self):
+        import_file(self.path, 'healthlog', chunk_size=2, checkpoint='logs')
+        with self.assertRaises(CheckpointMismatch):
+            import_file(self.source(3), 'healthlog', checkpoint='logs')
+        with self.assertRaises(CheckpointMismatch):
+            import_file(self.path, 'moodlog', checkpoint='logs')
+        self.assertEqual(HealthLog.objects.count(), 5)
+
+
+# 🔹 Progress series ETags
+class SeriesVersionTests(TestCase):
+    def setUp(self):
+        self.patient = User.objects.create(username='patient', role='patient')
+        self.doctor = User.objects.create(username='doctor', role='doctor')
+
+    def test_visit_redated_changes_the_version(self):
+        visit = VisitRecord.objects.create(patient=self.patient, doctor=self.doctor, visit_date=date(2024, 1, 1),
+                                           improvement_score=40)
+        before = series_version(self.patient.pk, 'visits')
+        VisitRecord.objects.filter(pk=visit.pk).update(visit_date=date(2024, 1, 2))
+        self.assertNotEqual(series_version(self.patient.pk, 'visits'), before)
+
+    def test_offsetting_score_edits_change_the_version(self):
+        first, second = (ImprovementScore.objects.create(patient=self.patient, score=score) for score in (40, 60))
+        before = series_version(self.patient.pk, 'scores')
+        ImprovementScore.objects.filter(pk=first.pk).update(score=50)
+        ImprovementScore.objects.filter(pk=second.pk).update(score=50)
+        self.assertNotEqual(series_version(self.patient.pk, 'scores'), before)
+        self.assertEqual(series_version(self.patient.pk, 'scores'), series_version(self.patient.pk, 'scores'))
+
+
+# 🔹 Cohort analytics dashboard
+class AnalyticsDashboardTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create(username='staff', role='doctor', is_staff=True))
+
+    def test_dashboard_only_reads_the_stored_report(self):
+        with mock.patch.object(analytics, 'compute_cohort_analytics') as compute:
+            response = self.client.get(reverse('analytics_dashboard'), {'refresh': '1'})
+        compute.assert_not_called()
+        self.assertContains(response, "No report has been computed yet")
+
+    @skipUnless(analytics.available(), "needs numpy and pandas")
+    def test_dashboard_shows_the_last_computed_report(self):
+        analytics.refresh_cohort_analytics()
+        analytics.refresh_cohort_analytics()
+        self.assertEqual(CohortReport.objects.count(), 1)
+        with mock.patch.object(analytics, 'compute_cohort_analytics') as compute:
+            response = self.client.get(reverse('analytics_dashboard'))
+        compute.assert_not_called()
+        self.assertContains(response, "Task Adherence")
+
+
+# 🔹 Profile photo removal
+class ProfilePhotoTests(TestCase):
+    def setUp(self):
+        self.patient = User.objects.create(username='patient', role='patient', email='p@example.com',
+                                           profile_photo='profile_photos/old.jpg')
+
+    def form(self):
+        data = {'first_name': 'Pat', 'last_name': 'Ient', 'email': 'p@example.com', 'phone': '1',
+                'role': 'patient', 'delete_photo': 'on'}
+        return PatientProfileForm(data, instance=self.patient)
+
+    def queued_deletes(self):
+        return list(BackgroundJob.objects.filter(name__endswith='delete_stored_files').values_list('args', flat=True))
+
+    def test_photo_file_is_deleted_after_the_user_is_committed(self):
+        form = self.form()
+        self.assertTrue(form.is_valid(), form.errors)
+        with self.captureOnCommitCallbacks() as callbacks:
+            form.save()
+            self.assertEqual(self.queued_deletes(), [])
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual(self.queued_deletes(), [[['profile_photos/old.jpg']]])
+        self.patient.refresh_from_db()
+        self.assertFalse(self.patient.profile_photo)
+
+    def test_unsaved_form_deletes_nothing(self):
+        form = self.form()
+        self.assertTrue(form.is_valid(), form.errors)
+        with self.captureOnCommitCallbacks(execute=True):
+            form.save(commit=False)
+        self.assertEqual(self.queued_deletes(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            form.instance.save()
+            form.save_m2m()
+        self.assertEqual(self.queued_deletes(), [[['profile_photos/old.jpg']]])
+
+
+# 🔹 Protected media
+class ProtectedMediaTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.owner = User.objects.create(username='owner', role='patient', unique_id='MEDIA_P1')
+        self.other = User.objects.create(username='other', role='patient', unique_id='MEDIA_P2')
+        self.doctor = User.objects.create(username='doctor', role='doctor')
+        self.outsider = User.objects.create(username='outsider', role='doctor')
+        # Recording the visit puts the owner in the doctor's caseload
+        record = VisitRecord(patient=self.owner, doctor=self.doctor, hospital_name='H', doctor_name='D')
+        record.report_file.save('report.pdf', ContentFile(b'%PDF-1.4 test'), save=True)
+        self.name = record.report_file.name
+        self.plain = f'/media/{self.name}'
+        self.owner.profile_photo.save('face.jpg', ContentFile(b'jpeg'), save=True)
+        self.photo = f'/media/{self.owner.profile_photo.name}'
+
+    def get(self, url, user=None, **extra):
+        if user:
+            self.client.force_login(user)
+        else:
+            self.client.logout()
+        response = self.client.get(url, **extra)
+        if response.streaming:
+            b''.join(response.streaming_content)
+            response.close()
+        return response
+
+    def signed(self, user):
+        token = media.signing_user.set(user)
+        try:
+            return default_storage.url(self.name)
+        finally:
+            media.signing_user.reset(token)
+
+    def test_unsigned_access_follows_the_caseload(self):
+        self.assertEqual(self.get(self.plain).status_code, 302)
+        self.assertEqual(self.get(self.plain, self.other).status_code, 404)
+        self.assertEqual(self.get(self.plain, self.outsider).status_code, 404)
+        self.assertEqual(self.get(self.plain, self.doctor).status_code, 200)
+        response = self.get(self.plain, self.owner)
+        self.assertEqual((response.status_code, response['Cache-Control']), (200, media.REVALIDATE))
+
+    def test_profile_photo_is_visible_to_the_care_team_only(self):
+        self.assertEqual(self.get(self.photo, self.owner).status_code, 200)
+        self.assertEqual(self.get(self.photo, self.doctor).status_code, 200)
+        self.assertEqual(self.get(self.photo, self.outsider).status_code, 404)
+        self.assertEqual(self.get(self.photo, self.other).status_code, 404)
+
+    def test_signed_url_works_only_for_its_user(self):
+        signed = self.signed(self.owner)
+        response = self.get(signed, self.owner)
+        self.assertEqual((response.status_code, response['Cache-Control']), (200, media.IMMUTABLE))
+        self.assertEqual(self.get(signed, self.other).status_code, 404)
+        self.assertEqual(self.get(signed, self.outsider).status_code, 404)
+        self.assertEqual(self.get(signed).status_code, 302)
+        self.assertEqual(self.get(signed.replace('sig=', 'sig=x'), self.other).status_code, 404)
+
+    def test_pages_link_media_signed_for_the_viewer(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('patient_profile'))
+        token = media.signing_user.set(self.owner)
+        try:
+            signed = self.owner.profile_photo.url
+        finally:
+            media.signing_user.reset(token)
+        self.assertIn('sig=', signed)
+        self.assertContains(response, escape(signed))
+
+    def test_unsigned_url_outside_a_request(self):
+        self.assertEqual(default_storage.url(self.name), self.plain)
+
+    def test_not_modified_and_unservable_names(self):
+        self.assertEqual(self.get(self.plain, self.owner, HTTP_IF_MODIFIED_SINCE=http_date(4102444800)).status_code,
+                         304)
+        self.assertEqual(self.get('/media/.blobs/x', self.doctor).status_code, 404)
+        self.assertEqual(self.get('/media/reports/../../manage.py', self.doctor).status_code, 404)
+
+    def test_proxy_modes_hand_the_transfer_over(self):
+        version = media.file_version(default_storage.path(self.name))
+        with override_settings(MEDIA_ACCEL='nginx'):
+            response = self.get(self.plain, self.owner, data={'v': version})
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.name}')
+        self.assertEqual(response['Cache-Control'], media.IMMUTABLE)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response.content, b'')
+        with override_settings(MEDIA_ACCEL='apache'):
+            response = self.get(self.plain, self.owner)
+        self.assertEqual(response['X-Sendfile'], default_storage.path(self.name))
+
+
+# 🔹 Sessions and the per-process cache
+class SessionStoreTests(TestCase):
+    def deleted_elsewhere(self):
+        """A session saved here, then its row deleted by another worker's logout"""
+        session = SessionStore()
+        session['_auth_user_id'] = '1'
+        session.save()
+        SessionStore(session_key=session.session_key).load()
+        Session.objects.filter(session_key=session.session_key).delete()
+        return SessionStore(session_key=session.session_key)
+
+    def test_local_memory_cache_is_not_trusted(self):
+        self.assertEqual(self.deleted_elsewhere().load(), {})
+
+    def test_shared_cache_serves_sessions(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(self.deleted_elsewhere().load(), {'_auth_user_id': '1'})
+            cache.clear()
+
+
+# 🔹 Caseload scoping
+class CaseloadTests(TestCase):
+    def setUp(self):
+        self.patient = User.objects.create(username='patient', role='patient', unique_id='PAT_1')
+        self.therapist = User.objects.create(username='therapist', role='therapist')
+        self.doctor = User.objects.create(username='doctor', role='doctor')
+        self.task = PatientTask.objects.create(patient=self.patient, task_name='Yoga', task_type='yoga',
+                                               status='completed')
+        VisitRecord.objects.create(patient=self.patient, doctor=self.doctor, hospital_name='H', doctor_name='D')
+        self.outsider = User.objects.create(username='outsider', role='doctor')
+
+    def pages(self):
+        unique_id = self.patient.unique_id
+        return [
+            reverse('view_patient_profile', args=[unique_id]),
+            reverse('patient_profile_section', args=[unique_id, 'tasks']),
+            reverse('export_patient_record', args=[unique_id]),
+            reverse('patient_progress_chart', args=[self.patient.pk]),
+            reverse('progress_series', args=[self.patient.pk]),
+        ]
+
+    def status_codes(self, user):
+        self.client.force_login(user)
+        return {url: self.client.get(url).status_code for url in self.pages()}
+
+    def test_clinician_outside_the_caseload_cannot_reach_the_patient(self):
+        for user in (self.therapist, self.outsider):
+            for url, status in self.status_codes(user).items():
+                self.assertIn(status, (302, 403, 404), f"{user.username} reached {url}")
+            response = self.client.post(reverse('lookup_patient'), {'patient_id': self.patient.unique_id})
+            self.assertEqual(response.status_code, 200)
+        self.client.force_login(self.therapist)
+        self.assertEqual(self.client.get(reverse('add_feedback', args=[self.task.pk])).status_code, 404)
+        response = self.client.get(reverse('therapist_dashboard'))
+        self.assertNotContains(response, 'PAT_1')
+
+    def test_doctor_with_a_visit_reaches_the_patient(self):
+        for url, status in self.status_codes(self.doctor).items():
+            self.assertEqual(status, 200, url)
+
+    def test_patient_choosing_a_therapist_adds_them_to_the_caseload(self):
+        self.client.force_login(self.patient)
+        response = self.client.post(reverse('choose_therapist'), {'therapist': self.therapist.pk})
+        self.assertRedirects(response, reverse('patient_home'), fetch_redirect_response=False)
+        self.assertEqual(
+            list(CareAssignment.objects.filter(patient=self.patient, role='therapist').values_list('clinician', 'source')),
+            [(self.therapist.pk, 'patient')],
+        )
+        for url, status in self.status_codes(self.therapist).items():
+            self.assertEqual(status, 200, url)
+        self.assertEqual(self.client.get(reverse('add_feedback', args=[self.task.pk])).status_code, 200)
+
+    def test_only_patients_choose_and_only_therapists_can_be_chosen(self):
+        self.client.force_login(self.patient)
+        self.assertEqual(self.client.post(reverse('choose_therapist'), {'therapist': self.outsider.pk}).status_code,
+                         404)
+        self.assertEqual(self.client.get(reverse('choose_therapist')).status_code, 405)
+        self.client.force_login(self.outsider)
+        self.client.post(reverse('choose_therapist'), {'therapist': self.therapist.pk})
+        self.assertFalse(CareAssignment.objects.filter(clinician=self.therapist).exists())
+
+
+# 🔹 Change feed
+class ChangeFeedTests(TestCase):
+    def test_deleted_message_is_sent_as_a_delete_without_its_content(self):
+        sender = User.objects.create(username='sender', role='patient')
+        receiver = User.objects.create(username='receiver', role='doctor')
+        message = Message.objects.create(sender=sender, receiver=receiver, content='private note')
+        since = changes.latest_seq()
+        self.client.force_login(sender)
+        self.client.post(reverse('delete_message', args=[message.pk]))
+        for user in (sender, receiver):
+            found, _, _ = changes.changes_for(user, since)
+            self.assertEqual([(change['model'], change['id'], change['action'], change['data']) for change in found],
+                             [('message', message.pk, 'delete', None)])
+
+
+# 🔹 SQLite connection tuning
+class SqlitePragmaTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        # The test database lives in memory, where WAL does not apply; open a file like production
+        self.wrapper = DatabaseWrapper({**connection.settings_dict, 'NAME': os.path.join(directory, 'db.sqlite3')},
+                                       alias='pragma_test')
+        self.addCleanup(self.wrapper.close)
+
+    def pragma(self, name):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_new_connections_get_the_configured_pragmas(self):
+        self.assertEqual(
+            {name: self.pragma(name) for name in ('journal_mode', 'synchronous', 'busy_timeout', 'temp_store',
+                                                  'auto_vacuum', 'cache_size')},
+            {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 20000, 'temp_store': 2, 'auto_vacuum': 2,
+             'cache_size': -20000},
+        )
+
+    @override_settings(SQLITE_PRAGMAS={'journal_mode': 'DELETE'})
+    def test_pragmas_follow_the_setting(self):
+        self.assertEqual(self.pragma('journal_mode'), 'delete')
+        self.assertEqual(self.pragma('synchronous'), 2)
+
+
+# 🔹 Read replica routing
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(settings.DATABASES, {'replica': settings.DATABASES['default']})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def route(self, method='get', url_name='doctor_dashboard', cookies=None):
+        """(database a User read goes to inside the view, response)"""
+        request = getattr(RequestFactory(), method)('/')
+        request.resolver_match = mock.Mock(url_name=url_name)
+        request.COOKIES.update(cookies or {})
+        seen = []
+
+        def view(request):
+            middleware.process_view(request, view, (), {})
+            seen.append(PrimaryReplicaRouter().db_for_read(User))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        response = middleware(request)
+        return seen[0], response
+
+    def test_listed_read_views_use_the_replica(self):
+        self.assertEqual(self.route()[0], 'replica')
+        self.assertEqual(self.route(url_name='patient_home')[0], 'default')
+        # The flag ends with the request
+        self.assertEqual(PrimaryReplicaRouter().db_for_read(User), 'default')
+
+    def test_sessions_and_writes_stay_on_the_primary(self):
+        router = PrimaryReplicaRouter()
+        token = read_from_replica.set(True)
+        self.addCleanup(read_from_replica.reset, token)
+        self.assertEqual(router.db_for_read(Session), 'default')
+        self.assertEqual(router.db_for_write(User), 'default')
+        del settings.DATABASES['replica']
+        self.assertEqual(router.db_for_read(User), 'default')
+
+    def test_a_write_pins_the_client_to_the_primary(self):
+        database, response = self.route(method='post')
+        self.assertEqual(database, 'default')
+        pin = response.cookies[PIN_COOKIE]
+        self.assertEqual(pin['max-age'], settings.REPLICA_PIN_SECONDS)
+        self.assertTrue(pin['httponly'])
+        self.assertEqual(self.route(cookies={PIN_COOKIE: '1'})[0], 'default')
+        database, response = self.route()
+        self.assertEqual(database, 'replica')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+# 🔹 Task anomaly scan
+class TaskAnomalyScanTests(TestCase):
+    now = datetime(2024, 6, 15, 12, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        self.patient = User.objects.create(username='patient', role='patient')
+        self.running = self.task(status='in_progress', started_at=self.now - timedelta(hours=2))
+        self.pending = self.task(status='pending')
+        # A week of daily sessions ending 10 June, the last far longer than the rest
+        self.history = [
+            self.task(status='completed', started_at=datetime(2024, 6, day, 9, tzinfo=dt_timezone.utc),
+                      duration_minutes=minutes)
+            for day, minutes in zip(range(4, 11), (20, 21, 19, 20, 22, 20, 90))
+        ]
+        self.task(patient=User.objects.create(username='steady', role='patient'), status='completed',
+                  started_at=self.now - timedelta(hours=1), duration_minutes=20)
+
+    def task(self, **fields):
+        fields.setdefault('patient', self.patient)
+        return PatientTask.objects.create(task_name='Walk', task_type='exercise', **fields)
+
+    def open_alerts(self):
+        return set(TaskAlert.objects.filter(resolved_at__isnull=True).values_list('task_id', 'kind'))
+
+    def test_each_kind_is_flagged_once(self):
+        result = anomalies.scan_task_anomalies(self.now)
+        self.assertEqual(self.open_alerts(), {
+            (self.running.pk, 'long_running'),
+            (self.pending.pk, 'missed'),
+            (self.history[-1].pk, 'duration_outlier'),
+            (self.history[-1].pk, 'streak_break'),
+        })
+        self.assertEqual(result['created'], 4)
+        self.assertEqual(anomalies.scan_task_anomalies(self.now)['created'], 0)
+        self.assertEqual(TaskAlert.objects.count(), 4)
+
+    def test_alerts_close_when_their_condition_clears(self):
+        anomalies.scan_task_anomalies(self.now)
+        PatientTask.objects.filter(pk=self.running.pk).update(status='completed', duration_minutes=20)
+        PatientTask.objects.filter(pk=self.pending.pk).update(status='in_progress', started_at=self.now)
+        self.task(status='completed', started_at=self.now - timedelta(hours=1), duration_minutes=20)
+        result = anomalies.scan_task_anomalies(self.now + timedelta(minutes=1))
+        self.assertEqual(result['resolved'], 3)
+        self.assertEqual(self.open_alerts(), {(self.history[-1].pk, 'duration_outlier')})
+
+
+# 🔹 Content-addressed media storage
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.storage = ContentAddressedStorage()
+
+    def blobs(self):
+        root = os.path.join(self.storage.location, BLOB_DIR)
+        return [os.path.join(path, name) for path, _, names in os.walk(root) for name in names]
+
+    def test_identical_content_is_stored_once(self):
+        first = self.storage.save('reports/a.pdf', ContentFile(b'same bytes'))
+        second = self.storage.save('prescriptions/b.pdf', ContentFile(b'same bytes'))
+        self.storage.save('reports/c.pdf', ContentFile(b'other bytes'))
+        self.assertEqual(len(self.blobs()), 2)
+        blob = self.storage.blob_path(hashlib.sha256(b'same bytes').hexdigest())
+        self.assertTrue(os.path.samefile(self.storage.path(first), blob))
+        self.assertTrue(os.path.samefile(self.storage.path(second), blob))
+        self.assertEqual(self.storage.open(second).read(), b'same bytes')
+
+    def test_hashed_upload_is_moved_into_the_blob_store(self):
+        upload = TemporaryUploadedFile('clip.mp4', 'video/mp4', 9, None)
+        self.addCleanup(upload.close)
+        upload.write(b'new video')
+        upload.flush()
+        upload.sha256 = hashlib.sha256(b'new video').hexdigest()
+        name = self.storage.save('exercise_videos/clip.mp4', upload)
+        self.assertFalse(os.path.exists(upload.temporary_file_path()))
+        self.assertTrue(os.path.samefile(self.storage.path(name), self.storage.blob_path(upload.sha256)))
+
+    def test_gc_removes_only_unlinked_blobs_past_min_age(self):
+        kept = self.storage.save('reports/kept.pdf', ContentFile(b'kept'))
+        dropped = self.storage.save('reports/dropped.pdf', ContentFile(b'dropped'))
+        self.storage.delete(dropped)
+        self.assertEqual(self.storage.gc(), (0, 0))
+        self.assertEqual(self.storage.gc(min_age=0, dry_run=True), (1, len(b'dropped')))
+        self.assertEqual(len(self.blobs()), 2)
+        self.assertEqual(self.storage.gc(min_age=0), (1, len(b'dropped')))
+        self.assertEqual(self.blobs(), [self.storage.blob_path(hashlib.sha256(b'kept').hexdigest())])
+        self.assertEqual(self.storage.open(kept).read(), b'kept')
+
+    def test_command_unlinks_unreferenced_names_before_collecting(self):
+        patient = User.objects.create(username='patient', role='patient')
+        record = VisitRecord(patient=patient, hospital_name='H', doctor_name='D')
+        record.report_file.save('report.pdf', ContentFile(b'report'), save=True)
+        orphan = default_storage.save('reports/orphan.pdf', ContentFile(b'orphan'))
+        call_command('gc_media_blobs', '--unreferenced', '--min-age', '0', stdout=StringIO())
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(record.report_file.name))
+        self.assertEqual(len(self.blobs()), 1)
+
+
+# 🔹 Hot/cold history tiers
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.patient = User.objects.create(username='patient', role='patient')
+        self.doctor = User.objects.create(username='doctor', role='doctor')
+        self.old = timezone.now() - timedelta(days=settings.ARCHIVE_HORIZON_DAYS + 30)
+        self.moods = [self.aged(MoodLog.objects.create(patient=self.patient, mood=mood), 'logged_at', when)
+                      for mood, when in (('low', self.old), ('okay', self.old), ('good', timezone.now()))]
+
+    def aged(self, obj, field, when):
+        # Time columns are auto_now_add; backdate them after the insert
+        type(obj).objects.filter(pk=obj.pk).update(**{field: when})
+        return obj
+
+    def moods_in(self, model):
+        return sorted(model.objects.values_list('mood', flat=True))
+
+    def test_history_unions_both_tiers_unless_recent_only(self):
+        self.assertEqual(archive.archive_table(MoodLog), 2)
+        self.assertEqual(self.moods_in(MoodLog), ['good'])
+        self.assertEqual(self.moods_in(ArchivedMoodLog), ['low', 'okay'])
+        everything = archive.history(MoodLog, ['id', 'mood'], Q(patient=self.patient)).order_by('id')
+        self.assertEqual(list(everything), [(mood.pk, mood.mood) for mood in self.moods])
+        recent = archive.history(MoodLog, ['mood'], Q(patient=self.patient),
+                                 since=timezone.now() - timedelta(days=7), named=True)
+        self.assertIsNone(recent.query.combinator)
+        self.assertEqual(list(recent), [{'mood': 'good'}])
+
+    def test_interrupted_run_resumes_without_duplicates(self):
+        checks = iter([False, True])
+        self.assertEqual(archive.archive_table(MoodLog, batch_size=1, stop=lambda: next(checks)), 1)
+        # As if a crash hit between copy and delete on another run: the row is in both tiers
+        ArchivedMoodLog.objects.create(id=self.moods[1].pk, patient=self.patient, mood='okay', logged_at=self.old)
+        self.assertEqual(archive.archive_table(MoodLog, batch_size=1), 1)
+        self.assertEqual(self.moods_in(MoodLog), ['good'])
+        self.assertEqual(self.moods_in(ArchivedMoodLog), ['low', 'okay'])
+        self.assertEqual(archive.archive_table(MoodLog), 0)
+
+    def test_open_alerts_and_deleted_messages_stay_hot(self):
+        alerts = [self.aged(SOSAlert.objects.create(patient=self.patient, status=status), 'created_at', self.old)
+                  for status in ('active', 'resolved')]
+        messages_ = [self.aged(Message.objects.create(sender=self.patient, receiver=self.doctor, content='hi',
+                                                      is_deleted=deleted), 'timestamp', self.old)
+                     for deleted in (True, False)]
+        with self.assertLogs('core.archive', 'INFO'):
+            moved = archive.archive_all(models=[SOSAlert, Message])
+        self.assertEqual(moved, {'SOSAlert': 1, 'Message': 1})
+        self.assertEqual(list(SOSAlert.objects.values_list('pk', flat=True)), [alerts[0].pk])
+        self.assertEqual(list(Message.objects.values_list('pk', flat=True)), [messages_[0].pk])
+
+
+# 🔹 Purging soft-deleted messages
+class MessagePurgeTests(TestCase):
+    def setUp(self):
+        self.sender = User.objects.create(username='sender', role='patient')
+        self.receiver = User.objects.create(username='receiver', role='doctor')
+        now = timezone.now()
+        past_retention = now - timedelta(days=settings.MESSAGE_PURGE_DAYS + 1)
+        self.expired = [
+            self.message(is_deleted=True, deleted_at=past_retention),
+            # Deleted before deleted_at existed: the timestamp decides
+            self.message(is_deleted=True, timestamp=past_retention),
+        ]
+        self.kept = [
+            self.message(is_deleted=True, deleted_at=now - timedelta(days=1)),
+            self.message(timestamp=past_retention),
+        ]
+        ArchivedMessage.objects.create(id=10_000, sender=self.sender, receiver=self.receiver, content='old',
+                                       timestamp=past_retention, is_deleted=True)
+
+    def message(self, timestamp=None, **fields):
+        message = Message.objects.create(sender=self.sender, receiver=self.receiver, content='hi', **fields)
+        if timestamp:
+            Message.objects.filter(pk=message.pk).update(timestamp=timestamp)
+        return message
+
+    def test_dry_run_only_counts(self):
+        self.assertEqual(archive.purge_deleted_messages(dry_run=True), 3)
+        self.assertEqual(Message.objects.count(), 4)
+        self.assertEqual(ArchivedMessage.objects.count(), 1)
+
+    def test_purges_expired_deletions_in_batches(self):
+        self.assertEqual(archive.purge_deleted_messages(batch_size=1), 3)
+        self.assertEqual(sorted(Message.objects.values_list('pk', flat=True)), [message.pk for message in self.kept])
+        self.assertFalse(ArchivedMessage.objects.exists())
+        # Purges are not deletions clients need to hear about
+        self.assertFalse(ChangeEvent.objects.filter(model='message', action='delete').exists())
+        self.assertEqual(archive.purge_deleted_messages(), 0)
+
+    def test_command_reports_the_purge(self):
+        out = StringIO()
+        # executescript() commits, which would end this test's transaction
+        with mock.patch('core.management.commands.compact_messages.incremental_vacuum', return_value=4) as vacuum:
+            call_command('compact_messages', '--batch-size', '2', stdout=out)
+        vacuum.assert_called_once()
+        self.assertIn("Purged 3 messages", out.getvalue())
+        self.assertIn("4 pages released", out.getvalue())
+        self.assertEqual(Message.objects.count(), 2)
+
+
+# 🔹 Admission control
+class AdmissionLaneTests(TestCase):
+    def test_low_priority_is_shed_first_and_critical_always_gets_in(self):
+        lanes = admission.Lanes(capacity=4, reserved=1, low_share=0.5, endpoint_limits={'export': 1})
+        low = lanes.try_acquire('feed', 'low')
+        self.assertIsNotNone(low)
+        self.assertIsNone(lanes.try_acquire('feed', 'low'))
+        normal = [lanes.try_acquire('home', 'normal') for _ in range(2)]
+        self.assertIsNone(lanes.try_acquire('home', 'normal'))
+        self.assertIsNotNone(lanes.try_acquire('sos', 'critical'))
+        normal[0].release()
+        normal[0].release()
+        self.assertEqual(lanes.in_flight['normal'], 1)
+        export = lanes.try_acquire('export', 'normal')
+        self.assertIsNotNone(export)
+        low.release()
+        self.assertIsNone(lanes.try_acquire('export', 'normal'))
+
+    def test_token_bucket_refills_at_its_rate(self):
+        buckets = admission.TokenBuckets(rate=2, burst=2)
+        with mock.patch.object(admission.time, 'monotonic', return_value=100.0):
+            self.assertEqual([buckets.take('a'), buckets.take('a')], [0, 0])
+            self.assertEqual(buckets.take('a'), 0.5)
+            self.assertEqual(buckets.take('b'), 0)
+        with mock.patch.object(admission.time, 'monotonic', return_value=100.5):
+            self.assertEqual(buckets.take('a'), 0)
+
+
+class AdmissionMiddlewareTests(TestCase):
+    def setUp(self):
+        override = override_settings(ADMISSION_ENABLED=True, ADMISSION_CAPACITY=2, ADMISSION_RESERVED=1,
+                                     ADMISSION_RATE=100, ADMISSION_BURST=100)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.patient = User.objects.create(username='patient', role='patient')
+        self.client.force_login(self.patient)
+
+    def test_busy_server_sheds_with_retry_after_but_admits_sos(self):
+        held = admission.lanes().try_acquire('other', 'normal')
+        response = self.client.get(reverse('patient_home'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], str(settings.ADMISSION_RETRY_AFTER))
+        self.client.post(reverse('send_sos_alert'), {'message': 'help'})
+        self.assertTrue(SOSAlert.objects.filter(patient=self.patient).exists())
+        held.release()
+        self.assertEqual(self.client.get(reverse('patient_home')).status_code, 200)
+        self.assertEqual(admission.lanes().in_flight, {'critical': 0, 'normal': 0, 'low': 0})
+
+    @override_settings(ADMISSION_RATE=1, ADMISSION_BURST=1)
+    def test_client_over_its_rate_gets_429(self):
+        self.assertEqual(self.client.get(reverse('patient_home')).status_code, 200)
+        response = self.client.get(reverse('patient_home'))
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
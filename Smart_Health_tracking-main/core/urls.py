@@ -1,7 +1,12 @@
 from django.urls import path
 from . import views
 from django.conf import settings
-from django.conf.urls.static import static
+
+# 🔹 I/O-bound endpoints have async twins, used when served over ASGI
+if settings.ASYNC_VIEWS:
+    from . import async_views as io_views
+else:
+    io_views = views
 
 urlpatterns = [
     # 🔹 Registration and Login
@@ -16,6 +21,7 @@ urlpatterns = [
 
     # 🔹 Dashboards
     path('home/', views.patient_home, name='patient_home'),
+    path('home/therapist/', views.choose_therapist, name='choose_therapist'),
     path('doctor/dashboard/', views.doctor_dashboard, name='doctor_dashboard'),
     path('therapist/dashboard/', views.therapist_dashboard, name='therapist_dashboard'),
 
@@ -30,7 +36,10 @@ urlpatterns = [
     # 🔹 Patient Lookup and Profile View
     path('lookup/', views.lookup_patient, name='lookup_patient'),
     path('patient/<str:unique_id>/', views.view_patient_profile, name='view_patient_profile'),
+    path('patient/<str:unique_id>/section/<str:section>/', views.patient_profile_section, name='patient_profile_section'),
+    path('patient/<str:unique_id>/export/', views.export_patient_record, name='export_patient_record'),
     path('progress-chart/<int:patient_id>/', views.patient_progress_chart, name='patient_progress_chart'),
+    path('progress-series/<int:patient_id>/', views.progress_series, name='progress_series'),
 
     # 🔹 Therapist Actions
     path('feedback/<int:task_id>/', views.add_feedback, name='add_feedback'),
@@ -39,16 +48,20 @@ urlpatterns = [
     # 🔹 Task Management
     path('task/start/', views.start_task, name='start_task'),
     path('task/complete/<int:task_id>/', views.complete_task, name='complete_task'),
+    path('tasks/sync/', views.sync_tasks, name='sync_tasks'),
 
     # 🔹 Appointment System
     path('appointment/confirm/<int:appointment_id>/', views.confirm_appointment, name='confirm_appointment'),
     path('appointment/cancel/<int:appointment_id>/', views.cancel_appointment, name='cancel_appointment'),
-    path('ajax/load-hospitals/', views.load_hospitals, name='ajax_load_hospitals'),
+    path('appointments/confirm/', views.bulk_confirm_appointments, name='bulk_confirm_appointments'),
+    path('appointments/cancel/', views.bulk_cancel_appointments, name='bulk_cancel_appointments'),
+    path('ajax/load-hospitals/', io_views.load_hospitals, name='ajax_load_hospitals'),
+    path('ajax/nearest-hospitals/', views.nearest_hospitals, name='nearest_hospitals'),
     path('log-mood/', views.log_mood, name='log_mood'),
 
      path('messages/', views.message_box, name='message_box'),
-    path('send-message/', views.send_message, name='send_message'),
-    path('delete-message/<int:message_id>/', views.delete_message, name='delete_message'),
+    path('send-message/', io_views.send_message, name='send_message'),
+    path('delete-message/<int:message_id>/', io_views.delete_message, name='delete_message'),
 
     # 🔹 Emergency SOS System
     path('sos/send/', views.send_sos_alert, name='send_sos_alert'),
@@ -60,8 +73,19 @@ urlpatterns = [
     path('videos/therapist/', views.therapist_videos, name='therapist_videos'),
     path('videos/', views.view_exercise_videos, name='view_exercise_videos'),
     path('videos/watch/<int:video_id>/', views.watch_video, name='watch_video'),
+    path('videos/<int:video_id>/progress/', views.video_progress, name='video_progress'),
     path('videos/delete/<int:video_id>/', views.delete_video, name='delete_video'),
 
+    # 🔹 Change Feed
+    path('changes/', views.change_feed, name='change_feed'),
+
+    # 🔹 Monitoring
+    path('metrics/', views.metrics, name='metrics'),
+    path('analytics/', views.analytics_dashboard, name='analytics_dashboard'),
+
+    # 🔹 Protected Media (replaces static() serving)
+    path(settings.MEDIA_URL.lstrip('/') + '<path:name>', views.protected_media, name='protected_media'),
+
     # Optional patient view
     # path('appointments/', views.view_appointments, name='view_appointments'),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
@@ -3,7 +3,8 @@ from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Avg, Count, Max
+from django.db.models import Avg, Count, Max, Q
+from django.http import Http404
 from datetime import timedelta
 from .forms import (
     UnifiedRegisterForm,
@@ -20,9 +21,12 @@ from .forms import AppointmentForm
 from .models import Appointment
 
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Avg, Count, Max
 from datetime import timedelta
-from .models import User, HealthLog, PatientVisit, PatientTask, SOSAlert, ExerciseVideo
+from .models import User, HealthLog, PatientVisit, PatientTask, SOSAlert, ExerciseVideo, TaskAlert, Visit
+from .tasks import delete_stored_files
+from .caseload import assign, can_view_patient, care_team_of, patients_of, visible_sos_alerts
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth import authenticate, login as auth_login
 import logging
@@ -104,9 +108,26 @@ def patient_home(request):
         'appointment_form': appointment_form,
         'active_task': active_task,
         'latest_appointment': latest_appointment,
+        'my_therapists': care_team_of(request.user, 'therapist').order_by('username'),
+        'therapists': User.objects.filter(role='therapist', is_active=True).order_by('username'),
         'now': timezone.now()
     })
 
+# 🔹 Choose a Therapist (the only way a therapist joins a patient's care team in-app)
+from django.views.decorators.http import require_POST
+
+@login_required
+@require_POST
+def choose_therapist(request):
+    if request.user.role != 'patient':
+        messages.error(request, "Access denied.")
+        return redirect('login')
+
+    therapist = get_object_or_404(User, pk=request.POST.get('therapist') or 0, role='therapist', is_active=True)
+    assign(therapist.pk, request.user.pk, 'therapist', source='patient')
+    messages.success(request, f"{therapist.get_full_name() or therapist.username} can now see your tasks and progress.")
+    return redirect('patient_home')
+
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect
 from django.contrib import messages
@@ -215,11 +236,7 @@ def therapist_profile(request):
     if request.method == 'POST':
         form = DoctorProfileForm(request.POST, request.FILES, instance=request.user)
         if form.is_valid():
-            user = form.save(commit=False)
-            if form.cleaned_data.get('delete_photo') and user.profile_photo:
-                user.profile_photo.delete(save=False)
-                user.profile_photo = None
-            user.save()
+            form.save()
             messages.success(request, "Profile updated successfully.")
             return redirect('therapist_profile')
         else:
@@ -241,12 +258,41 @@ def lookup_patient(request):
     if request.method == 'POST':
         if form.is_valid():
             patient_id = form.cleaned_data['patient_id']
-            return redirect('view_patient_profile', unique_id=patient_id)
+            # 🔎 Only patients in the clinician's caseload can be looked up
+            if patients_of(request.user).filter(unique_id=patient_id).exists():
+                return redirect('view_patient_profile', unique_id=patient_id)
+            messages.error(request, "No patient with that ID in your caseload.")
         else:
             messages.error(request, "Invalid input. Please enter a valid Patient ID.")
 
     return render(request, 'core/lookup_patient.html', {'form': form})
 
+# Rows per section on the patient profile; further pages load on demand
+PROFILE_PAGE_SIZE = 10
+PROFILE_SECTIONS = ['tasks', 'visits']
+
+
+def _profile_section(request, patient, section, page):
+    """One page of a profile section: (rows, next page number or None, extra context)"""
+    if section == 'tasks':
+        queryset = PatientTask.objects.filter(patient=patient).order_by('-completed_at', '-id')
+    else:
+        # Doctor records and patient-submitted visits together: one scan of visit_patient_date_idx
+        queryset = Visit.objects.filter(patient=patient).order_by('-visit_date', '-id')
+
+    # Fetch one extra row to learn whether another page exists without a COUNT(*)
+    offset = (page - 1) * PROFILE_PAGE_SIZE
+    rows = list(queryset[offset:offset + PROFILE_PAGE_SIZE + 1])
+    next_page = page + 1 if len(rows) > PROFILE_PAGE_SIZE else None
+    rows = rows[:PROFILE_PAGE_SIZE]
+
+    extra = {}
+    if section == 'visits' and request.user.role == 'therapist':
+        # 📝 Notes forms only for the rows being shown
+        extra['notes_forms'] = {visit.id: TherapistNotesForm(instance=visit) for visit in rows}
+    return rows, next_page, extra
+
+
 @login_required
 def view_patient_profile(request, unique_id):
     # 🔐 Role-based access control
@@ -254,57 +300,70 @@ def view_patient_profile(request, unique_id):
         messages.error(request, "Access denied.")
         return redirect('login')
 
-    # 🔍 Fetch patient and related data
-    patient = get_object_or_404(User, unique_id=unique_id, role='patient')
-    tasks = PatientTask.objects.filter(patient=patient).order_by('-completed_at')
-    visits = PatientVisit.objects.filter(patient=patient).order_by('-visit_date')
-    visit_records = VisitRecord.objects.filter(patient=patient).order_by('visit_date')
-
-    # 📝 Therapist Notes Forms (one per visit)
-    notes_forms = {visit.id: TherapistNotesForm(instance=visit) for visit in visits}
-
-    # 📊 Task Summary Stats (only for completed tasks)
-    completed_tasks = tasks.filter(status='completed')
-    task_stats = completed_tasks.aggregate(
-        total=Count('id'),
-        avg_duration=Avg('duration_minutes'),
-        last_completed=Max('completed_at')
-    )
+    # 🔍 Fetch patient (from the clinician's caseload)
+    patient = get_object_or_404(patients_of(request.user), unique_id=unique_id)
+    tasks = PatientTask.objects.filter(patient=patient)
 
-    # 🚨 Therapist Alerts
-    long_tasks = tasks.filter(
-        status='in_progress',
-        started_at__lt=timezone.now() - timedelta(minutes=60)
+    # 📊 Task Summary Stats in a single conditional aggregate
+    completed = Q(status='completed')
+    task_stats = tasks.aggregate(
+        total=Count('id', filter=completed),
+        avg_duration=Avg('duration_minutes', filter=completed),
+        last_completed=Max('completed_at', filter=completed),
     )
 
-    missed_tasks = tasks.filter(
-        status='pending',
-        started_at__isnull=True
-    )
+    # 🚨 Therapist Alerts (flagged by scan_task_anomalies)
+    task_alerts = []
+    if request.user.role == 'therapist':
+        task_alerts = TaskAlert.objects.filter(patient=patient, resolved_at__isnull=True).select_related(
+            'task'
+        )[:PROFILE_PAGE_SIZE * 2]
 
-    # 📈 Improvement Chart Data
-    chart_dates = [v.visit_date.strftime('%d %b') for v in visit_records]
-    chart_scores = [v.improvement_score for v in visit_records]
+    # 📋 First page of each section
+    context = {
+        'patient': patient,
+        'task_stats': task_stats,
+        'task_alerts': task_alerts,
+    }
+    for section in PROFILE_SECTIONS:
+        rows, next_page, extra = _profile_section(request, patient, section, 1)
+        context[section] = {'rows': rows, 'next_page': next_page}
+        context.update(extra)
 
     # 🧾 Render profile page
-    return render(request, 'core/view_patient_profile.html', {
+    return render(request, 'core/view_patient_profile.html', context)
+
+
+@login_required
+def patient_profile_section(request, unique_id, section):
+    """Further pages of a profile section, rendered as table rows for the "Load more" buttons"""
+    if request.user.role not in ['doctor', 'therapist']:
+        messages.error(request, "Access denied.")
+        return redirect('login')
+    if section not in PROFILE_SECTIONS:
+        raise Http404("Unknown section.")
+
+    patient = get_object_or_404(patients_of(request.user), unique_id=unique_id)
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+    rows, next_page, extra = _profile_section(request, patient, section, page)
+    return render(request, f'core/partials/profile_{section}.html', {
         'patient': patient,
-        'tasks': tasks,
-        'visits': visits,
-        'visit_records': visit_records,
-        'notes_forms': notes_forms,
-        'task_stats': task_stats,
-        'long_tasks': long_tasks,
-        'missed_tasks': missed_tasks,
-        'chart_dates': chart_dates,
-        'chart_scores': chart_scores,
+        section: {'rows': rows, 'next_page': next_page},
+        **extra,
     })
 
 
 # 🔹 Visit Details (for patient and therapist)
 @login_required
 def visit_details(request):
-    visits = PatientVisit.objects.all() if request.user.role == 'therapist' else PatientVisit.objects.filter(patient=request.user)
+    if request.user.role == 'therapist':
+        # Visits of the therapist's caseload only, newest first
+        visits = PatientVisit.objects.filter(patient__care_team__clinician=request.user).order_by('-visit_date')
+    else:
+        visits = PatientVisit.objects.filter(patient=request.user).order_by('-visit_date')
     form = PatientVisitForm()
     if request.method == 'POST' and request.user.role == 'patient':
         form = PatientVisitForm(request.POST, request.FILES)
@@ -341,13 +400,19 @@ def therapist_dashboard(request):
         messages.error(request, "Access denied.")
         return redirect('login')
 
-    patients = User.objects.filter(role='patient')
+    patients = patients_of(request.user).order_by('username')
+    # 🧩 Open task alerts for the caseload from the last anomaly scan (newest first, bounded)
+    task_alerts = TaskAlert.objects.filter(
+        resolved_at__isnull=True, patient__care_team__clinician=request.user
+    ).select_related('patient', 'task')[:50]
     # 🚨 Active SOS Alerts
-    active_sos_alerts = SOSAlert.objects.filter(status='active').order_by('-created_at')
-    acknowledged_sos_alerts = SOSAlert.objects.filter(status='acknowledged').order_by('-created_at')[:10]
+    sos_alerts = visible_sos_alerts(request.user)
+    active_sos_alerts = sos_alerts.filter(status='active').order_by('-created_at')
+    acknowledged_sos_alerts = sos_alerts.filter(status='acknowledged').order_by('-created_at')[:10]
     
     return render(request, 'core/therapist_dashboard.html', {
         'patients': patients,
+        'task_alerts': task_alerts,
         'active_sos_alerts': active_sos_alerts,
         'acknowledged_sos_alerts': acknowledged_sos_alerts,
     })
@@ -359,7 +424,7 @@ def add_feedback(request, task_id):
         messages.error(request, "Access denied.")
         return redirect('login')
 
-    task = PatientTask.objects.get(id=task_id)
+    task = get_object_or_404(PatientTask, id=task_id, patient__care_team__clinician=request.user)
     form = TherapistFeedbackForm(request.POST or None, instance=task)
 
     if request.method == 'POST' and form.is_valid():
@@ -376,7 +441,7 @@ def add_therapist_notes_inline(request, visit_id):
         messages.error(request, "Access denied.")
         return redirect('login')
 
-    visit = PatientVisit.objects.get(id=visit_id)
+    visit = get_object_or_404(Visit, id=visit_id, patient__care_team__clinician=request.user)
     form = TherapistNotesForm(request.POST, instance=visit)
 
     if form.is_valid():
@@ -388,6 +453,7 @@ def add_therapist_notes_inline(request, visit_id):
     return redirect('view_patient_profile', unique_id=visit.patient.unique_id)
 
 from django.utils import timezone
+from core.task_sync import task_duration
 
 # 🔹 Start Task
 @login_required
@@ -430,13 +496,7 @@ def complete_task(request, task_id):
 
     if task.status == 'in_progress':
         now = timezone.now()
-
-        if task.started_at:
-            duration = (now - task.started_at).total_seconds() / 60
-            task.duration_minutes = max(1, round(duration))
-        else:
-            task.duration_minutes = 1  # fallback if start time is missing
-
+        task.duration_minutes = task_duration(task.started_at, now)
         task.completed_at = now
         task.status = 'completed'
         task.save()
@@ -447,6 +507,34 @@ def complete_task(request, task_id):
 
     return redirect('patient_home') 
 
+# 🔹 Offline Task Sync
+import json
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
+from core import task_sync
+
+@login_required
+@require_POST
+def sync_tasks(request):
+    """Apply a batch of offline start/complete events and return the reconciled tasks
+
+    Body: {"events": [{"action": "start", "key": "<client uuid>", "task_type": "gardening", "at": "<ISO time>"},
+                      {"action": "complete", "key": "<client uuid>" | "task_id": 12, "at": "<ISO time>"}]}
+    """
+    if request.user.role != 'patient':
+        return JsonResponse({'error': "Access denied."}, status=403)
+    try:
+        events = json.loads(request.body).get('events')
+    except (ValueError, AttributeError):
+        events = None
+    if not isinstance(events, list):
+        return JsonResponse({'error': "Expected a JSON object with an 'events' list."}, status=400)
+    if len(events) > settings.TASK_SYNC_MAX_EVENTS:
+        return JsonResponse({'error': f"At most {settings.TASK_SYNC_MAX_EVENTS} events per batch."}, status=400)
+    tasks, rejected = task_sync.apply_events(request.user, events)
+    return JsonResponse({'tasks': tasks, 'rejected': rejected}, json_dumps_params={'separators': (',', ':')})
+
 
 PatientLookupForm
 from django.contrib.auth.decorators import login_required
@@ -465,6 +553,10 @@ from django.contrib import messages
 from core.models import Appointment, PatientVisit, VisitRecord
 from core.forms import PatientLookupForm
 
+# Visit records listed on the doctor dashboard; older ones are reached through patient profiles
+DASHBOARD_VISITS = 50
+
+
 @login_required
 def doctor_dashboard(request):
     # 🔐 Role check
@@ -480,16 +572,16 @@ def doctor_dashboard(request):
             patient_id = lookup_form.cleaned_data['patient_id']
             return redirect('patient_detail', patient_id=patient_id)
 
-    # 📅 Appointments grouped by status
+    # 📅 Appointments grouped by status (appt_doctor_status_idx; past pending ones expire nightly)
     pending_appointments = Appointment.objects.filter(
         doctor=request.user,
         status='pending'
-    ).order_by('date', 'time')
+    ).select_related('patient', 'hospital').order_by('date', 'time')
 
     confirmed_appointments = Appointment.objects.filter(
         doctor=request.user,
         status='confirmed'
-    ).order_by('date', 'time')
+    ).select_related('patient', 'hospital').order_by('date', 'time')
 
     cancelled_appointments = Appointment.objects.filter(
         doctor=request.user,
@@ -501,19 +593,15 @@ def doctor_dashboard(request):
         status='completed'
     ).order_by('-date', '-time')
 
-    # 🧾 Legacy PatientVisit records (optional)
-    recent_visits = PatientVisit.objects.filter(
-        doctor=request.user
-    ).order_by('-visit_date')[:10]
-
-    # 🩺 VisitRecords for update and tracking
+    # 🩺 Latest visit records for update and tracking (one scan of visit_doctor_date_idx)
     visit_records = VisitRecord.objects.filter(
         doctor=request.user
-    ).order_by('-visit_date')
+    ).select_related('patient').order_by('-visit_date', '-id')[:DASHBOARD_VISITS]
 
     # 🚨 Active SOS Alerts
-    active_sos_alerts = SOSAlert.objects.filter(status='active').order_by('-created_at')
-    acknowledged_sos_alerts = SOSAlert.objects.filter(status='acknowledged').order_by('-created_at')[:10]
+    sos_alerts = visible_sos_alerts(request.user)
+    active_sos_alerts = sos_alerts.filter(status='active').order_by('-created_at')
+    acknowledged_sos_alerts = sos_alerts.filter(status='acknowledged').order_by('-created_at')[:10]
 
     # 🧠 Render dashboard
     return render(request, 'core/doctor_dashboard.html', {
@@ -523,7 +611,6 @@ def doctor_dashboard(request):
         'confirmed_appointments': confirmed_appointments,
         'cancelled_appointments': cancelled_appointments,
         'completed_appointments': completed_appointments,
-        'recent_visits': recent_visits,
         'visit_records': visit_records,
         'active_sos_alerts': active_sos_alerts,
         'acknowledged_sos_alerts': acknowledged_sos_alerts,
@@ -532,35 +619,63 @@ def doctor_dashboard(request):
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import redirect, get_object_or_404
 from django.contrib import messages
+from core import appointments
 from core.models import Appointment
 
 @login_required
 def confirm_appointment(request, appointment_id):
-    # 🔐 Ensure only doctors can confirm appointments
     if request.user.role != 'doctor':
-        messages.error(request, "Access denied.")
-        return redirect('doctor_dashboard')
+        return redirect('login')
 
-    # 🔍 Fetch the appointment
-    appointment = get_object_or_404(Appointment, id=appointment_id, doctor=request.user)
+    if request.method != 'POST':
+        appointment = get_object_or_404(Appointment, id=appointment_id, doctor=request.user)
+        return render(request, 'core/confirm_appointment.html', {'appointment': appointment})
 
-    # ✅ Update status to confirmed
-    if appointment.status == 'pending':
-        appointment.status = 'confirmed'
-        appointment.save()
-        messages.success(request, f"Appointment with {appointment.patient.get_full_name()} confirmed.")
+    # ✅ Only a pending appointment can be confirmed; one UPDATE, no full-row save
+    if appointments.set_status(request.user, [appointment_id], 'confirmed'):
+        messages.success(request, "Appointment confirmed.")
     else:
+        get_object_or_404(Appointment, id=appointment_id, doctor=request.user)
         messages.warning(request, "This appointment is not pending or has already been processed.")
-
     return redirect('doctor_dashboard')
+
 @login_required
+@require_POST
 def cancel_appointment(request, appointment_id):
-    appointment = get_object_or_404(Appointment, id=appointment_id, doctor=request.user)
-    appointment.status = 'cancelled'
-    appointment.save()
-    messages.warning(request, "Appointment cancelled.")
+    if appointments.set_status(request.user, [appointment_id], 'cancelled'):
+        messages.warning(request, "Appointment cancelled.")
+    else:
+        get_object_or_404(Appointment, id=appointment_id, doctor=request.user)
+        messages.warning(request, "Only pending or confirmed appointments can be cancelled.")
     return redirect('doctor_dashboard')
 
+# 🔹 Bulk appointment actions (checkboxes on the doctor dashboard)
+from django.views.decorators.http import require_POST
+
+def _bulk_appointment_action(request, status, done):
+    if request.user.role != 'doctor':
+        messages.error(request, "Access denied.")
+        return redirect('login')
+    ids = [int(value) for value in request.POST.getlist('appointment_ids') if value.isdigit()]
+    if not ids:
+        messages.warning(request, "No appointments selected.")
+        return redirect('doctor_dashboard')
+    updated = appointments.set_status(request.user, ids, status)
+    messages.success(request, f"{updated} appointment{'s' if updated != 1 else ''} {done}.")
+    if updated < len(ids):
+        messages.warning(request, f"{len(ids) - updated} could not be {done} from their current status.")
+    return redirect('doctor_dashboard')
+
+@login_required
+@require_POST
+def bulk_confirm_appointments(request):
+    return _bulk_appointment_action(request, 'confirmed', 'confirmed')
+
+@login_required
+@require_POST
+def bulk_cancel_appointments(request):
+    return _bulk_appointment_action(request, 'cancelled', 'cancelled')
+
 
 
 @login_required
@@ -608,21 +723,6 @@ def book_appointment(request):
 
     return render(request, 'core/book_appointment.html', {'form': form})
 
-@login_required
-def confirm_appointment(request, appointment_id):
-    if request.user.role != 'doctor':
-        return redirect('login')
-
-    appointment = get_object_or_404(Appointment, id=appointment_id, doctor=request.user)
-
-    if request.method == 'POST':
-        appointment.status = 'confirmed'
-        appointment.save()
-        messages.success(request, "Appointment confirmed.")
-        return redirect('doctor_dashboard')
-
-    return render(request, 'core/confirm_appointment.html', {'appointment': appointment})
-
 from django.http import JsonResponse
 from .models import Hospital
 
@@ -631,6 +731,21 @@ def load_hospitals(request):
     hospitals = Hospital.objects.filter(location_id=location_id).values('id', 'name')
     return JsonResponse(list(hospitals), safe=False)
 
+from django.utils.dateparse import parse_date
+from core import geo
+
+def nearest_hospitals(request):
+    """k nearest hospitals with a free slot: ?lat=12.97&lng=77.59&k=5&date=YYYY-MM-DD (default today)"""
+    try:
+        latitude, longitude = float(request.GET['lat']), float(request.GET['lng'])
+        k = min(settings.HOSPITAL_NEAREST_MAX, max(1, int(request.GET.get('k', 5))))
+        day = parse_date(request.GET.get('date', '')) or timezone.localdate()
+    except (KeyError, ValueError):
+        return JsonResponse({'error': "lat and lng are required; k and date must be valid."}, status=400)
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return JsonResponse({'error': "Coordinates out of range."}, status=400)
+    return JsonResponse(geo.nearest_with_free_slots(latitude, longitude, k, day), safe=False)
+
 # views.py
 from django.shortcuts import get_object_or_404, redirect, render
 from .models import VisitRecord
@@ -659,17 +774,64 @@ def update_visit_record(request, visit_id):
         'visit': visit
     })
 from django.shortcuts import render
+from django.views.decorators.http import condition
 from .models import VisitRecord
+from core.series import SERIES, DOWNSAMPLERS, DEFAULT_POINTS, MAX_POINTS, fetch_series, series_version
 
+@login_required
 def patient_progress_chart(request, patient_id):
-    visits = VisitRecord.objects.filter(patient_id=patient_id).order_by('visit_date')
-    dates = [v.visit_date.strftime('%d %b') for v in visits]  # e.g. "08 Oct"
-    scores = [v.improvement_score for v in visits]            # e.g. [20, 40, 60]
-    return render(request, 'core/progress_chart.html', {
-        'dates': dates,
-        'scores': scores,
-        'patient': visits[0].patient if visits else None
-    })
+    # 📈 Chart page only; the series itself loads asynchronously from progress_series
+    patient = get_object_or_404(User, pk=patient_id, role='patient')
+    if not can_view_patient(request.user, patient):
+        messages.error(request, "Access denied.")
+        return redirect('login')
+    return render(request, 'core/progress_chart.html', {'patient': patient})
+
+
+def _series_params(request):
+    name = request.GET.get('series', 'visits')
+    method = request.GET.get('method', 'lttb')
+    try:
+        points = min(MAX_POINTS, max(3, int(request.GET.get('points', DEFAULT_POINTS))))
+    except ValueError:
+        points = DEFAULT_POINTS
+    return name, method, points
+
+
+def _series_etag(request, patient_id):
+    name, method, points = _series_params(request)
+    if name not in SERIES or method not in DOWNSAMPLERS:
+        return None
+    return f"{series_version(patient_id, name)}-{name}-{method}-{points}"
+
+
+@condition(etag_func=_series_etag)
+def _progress_series(request, patient_id):
+    name, method, points = _series_params(request)
+    raw = fetch_series(patient_id, name)
+    sampled = DOWNSAMPLERS[method](raw, points)
+    response = JsonResponse({
+        'series': name,
+        'method': method,
+        'total': len(raw),
+        'x': [x for x, _ in sampled],
+        'y': [y for _, y in sampled],
+    }, json_dumps_params={'separators': (',', ':')})
+    # Per-user data: browsers may keep it but must revalidate with the ETag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@login_required
+def progress_series(request, patient_id):
+    """Downsampled time series as compact JSON: ?series=visits|scores|moods&points=200&method=lttb|bucket"""
+    patient = get_object_or_404(User, pk=patient_id, role='patient')
+    if not can_view_patient(request.user, patient):
+        return JsonResponse({'error': "Access denied."}, status=403)
+    name, method, _ = _series_params(request)
+    if name not in SERIES or method not in DOWNSAMPLERS:
+        return JsonResponse({'error': "Unknown series or method."}, status=400)
+    return _progress_series(request, patient.pk)
 
 
 from core.models import Appointment, VisitRecord
@@ -732,9 +894,10 @@ def delete_profile_photo(request):
 
     # 🧹 Delete profile photo if it exists
     if user.profile_photo:
-        user.profile_photo.delete(save=False)
+        photo = user.profile_photo.name
         user.profile_photo = None
         user.save()
+        transaction.on_commit(lambda: delete_stored_files.delay([photo]))
         messages.success(request, "Profile photo deleted successfully.")
     else:
         messages.info(request, "No profile photo to delete.")
@@ -808,8 +971,13 @@ def log_mood(request):
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse
+from core import changes
+from core.archive import history, horizon, recent
+from core.auth import get_cached_user
 from core.models import Message, User
 
+MESSAGE_COLUMNS = ['id', 'sender_id', 'content', 'timestamp']
+
 @login_required
 def message_box(request):
     role = request.GET.get('role')
@@ -819,23 +987,32 @@ def message_box(request):
     users = User.objects.filter(role=role).exclude(id=request.user.id) if role else []
 
     # Selected chat partner
-    selected_user = User.objects.filter(id=selected_user_id).first()
+    selected_user = get_cached_user(selected_user_id)
 
-    # Fetch messages
+    # Fetch messages: recent ones from the hot table, archived history only on request
     messages = []
+    show_archive = request.GET.get('history') == 'all'
     if selected_user:
-        messages = Message.objects.filter(
+        conversation = Q(
             sender__in=[request.user, selected_user],
             receiver__in=[request.user, selected_user],
             is_deleted=False
-        ).order_by('timestamp')
+        )
+        if show_archive:
+            messages = history(Message, MESSAGE_COLUMNS, conversation, named=True)
+        else:
+            messages = recent(Message, MESSAGE_COLUMNS, conversation, named=True)
+        messages = messages.order_by('timestamp', 'id')
 
     return render(request, 'core/message_box.html', {
         'roles': ['doctor', 'therapist', 'patient'],
         'selected_role': role,
         'users': users,
         'selected_user': selected_user,
-        'messages': messages
+        'messages': messages,
+        'show_archive': show_archive,
+        # Older messages are archived and can no longer be deleted
+        'archive_horizon': horizon(Message),
     })
 
 @login_required
@@ -843,16 +1020,21 @@ def send_message(request):
     if request.method == 'POST':
         receiver_id = request.POST.get('receiver_id')
         content = request.POST.get('content')
-        receiver = get_object_or_404(User, id=receiver_id)
+        receiver = get_cached_user(receiver_id)
+        if receiver is None:
+            raise Http404("No such user")
         Message.objects.create(sender=request.user, receiver=receiver, content=content)
         return JsonResponse({'status': 'success'})
     return JsonResponse({'status': 'error'})
 
 @login_required
 def delete_message(request, message_id):
-    message = get_object_or_404(Message, id=message_id, sender=request.user)
-    message.is_deleted = True
-    message.save()
+    # A bulk UPDATE instead of a full-row save; changes.update records it for the change feed
+    deleted = changes.update(
+        Message.objects.filter(id=message_id, sender=request.user), is_deleted=True, deleted_at=timezone.now()
+    )
+    if not deleted:
+        raise Http404("No such message")
     return JsonResponse({'status': 'deleted'})
 
 # 🔹 Emergency SOS System
@@ -885,7 +1067,7 @@ def acknowledge_sos_alert(request, alert_id):
         messages.error(request, "Access denied.")
         return redirect('login')
 
-    sos_alert = get_object_or_404(SOSAlert, id=alert_id)
+    sos_alert = get_object_or_404(visible_sos_alerts(request.user), id=alert_id)
     
     # Update acknowledgment based on role
     if request.user.role == 'doctor':
@@ -917,7 +1099,7 @@ def resolve_sos_alert(request, alert_id):
         messages.error(request, "Access denied.")
         return redirect('login')
 
-    sos_alert = get_object_or_404(SOSAlert, id=alert_id)
+    sos_alert = get_object_or_404(visible_sos_alerts(request.user), id=alert_id)
     sos_alert.status = 'resolved'
     sos_alert.resolved_at = timezone.now()
     sos_alert.save()
@@ -951,6 +1133,10 @@ def upload_exercise_video(request):
 
     return render(request, 'core/upload_video.html', {'form': form})
 
+from django.http import HttpResponse
+from django.views.decorators.http import require_http_methods
+from core import watch
+
 @login_required
 def therapist_videos(request):
     """List all videos uploaded by the therapist"""
@@ -958,7 +1144,10 @@ def therapist_videos(request):
         messages.error(request, "Access denied.")
         return redirect('login')
 
-    videos = ExerciseVideo.objects.filter(therapist=request.user).order_by('-created_at')
+    videos = list(ExerciseVideo.objects.filter(therapist=request.user).order_by('-created_at'))
+    engagement = watch.engagement([video.id for video in videos])
+    for video in videos:
+        video.engagement = engagement.get(video.id)
     return render(request, 'core/therapist_videos.html', {'videos': videos})
 
 @login_required
@@ -1018,8 +1207,29 @@ def watch_video(request, video_id):
     return render(request, 'core/watch_video.html', {
         'video': video,
         'related_videos': related_videos,
+        'progress': watch.progress(request.user.id, video.id),
+        'heartbeat_seconds': settings.VIDEO_HEARTBEAT_SECONDS,
     })
 
+@login_required
+@require_http_methods(['GET', 'POST'])
+def video_progress(request, video_id):
+    """GET: the patient's progress on a video. POST: a player heartbeat, buffered rather than written
+
+    Body: {"position": 312.5, "played": 15.0, "duration": 600.0, "ended": false}
+    """
+    if request.user.role != 'patient':
+        return JsonResponse({'error': "Access denied."}, status=403)
+    if request.method == 'POST':
+        try:
+            entry = watch.parse_heartbeat(json.loads(request.body))
+        except ValueError as exc:
+            return JsonResponse({'error': str(exc) if isinstance(exc, watch.HeartbeatError) else "Invalid JSON."},
+                                status=400)
+        watch.record(request.user.id, video_id, entry)
+        return HttpResponse(status=204)
+    return JsonResponse(watch.progress(request.user.id, video_id))
+
 @login_required
 def delete_video(request, video_id):
     """Allow therapists to delete their uploaded videos"""
@@ -1031,11 +1241,108 @@ def delete_video(request, video_id):
     
     if request.method == 'POST':
         video_title = video.title
-        video.video_file.delete(save=False)
-        if video.thumbnail:
-            video.thumbnail.delete(save=False)
+        # 🗑️ Row goes now; the (possibly large) files are removed by a background worker
+        files = [video.video_file.name, video.thumbnail.name if video.thumbnail else None]
+        video_id = video.id
         video.delete()
+        delete_stored_files.delay(files, idempotency_key=f"delete-video-{video_id}")
         messages.success(request, f"Video '{video_title}' deleted successfully.")
         return redirect('therapist_videos')
     
     return render(request, 'core/delete_video.html', {'video': video})
+
+# 🔹 Patient Record Export
+from django.http import StreamingHttpResponse
+from core import exports
+
+@login_required
+def export_patient_record(request, unique_id):
+    """Stream a patient's full history as CSV (or one table as Arrow IPC)"""
+    patient = get_object_or_404(User, unique_id=unique_id, role='patient')
+    if not can_view_patient(request.user, patient):
+        messages.error(request, "Access denied.")
+        return redirect('login')
+
+    table = request.GET.get('table')
+    if table and table not in exports.EXPORT_TABLES:
+        raise Http404("Unknown table.")
+
+    if request.GET.get('format') == 'arrow':
+        if exports.pa is None or not table:
+            raise Http404("Arrow export needs pyarrow and a single ?table=.")
+        response = StreamingHttpResponse(
+            exports.stream_patient_arrow(patient, table),
+            content_type='application/vnd.apache.arrow.stream'
+        )
+        filename = f"{patient.unique_id}_{table}.arrows"
+    else:
+        response = StreamingHttpResponse(
+            exports.stream_patient_csv(patient, [table] if table else None),
+            content_type='text/csv'
+        )
+        filename = f"{patient.unique_id}_{table or 'record'}.csv"
+
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+# 🔹 Performance Metrics (Prometheus text format)
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
+from core.metrics import registry
+
+@staff_member_required
+def metrics(request):
+    """Per-view latency, query and size summaries for Prometheus to scrape"""
+    return HttpResponse(registry.render_prometheus(), content_type='text/plain; version=0.0.4')
+
+# 🔹 Cohort Analytics (staff)
+from core import analytics
+
+@staff_member_required
+def analytics_dashboard(request):
+    """Cross-patient adherence, score trajectories and time-to-recovery, as last computed by the daily job"""
+    return render(request, 'core/analytics_dashboard.html', {
+        'report': analytics.latest_cohort_analytics(),
+        'unavailable': not analytics.available(),
+    })
+
+# 🔹 Protected Media
+import os
+from django.contrib.auth.views import redirect_to_login
+from django.core.files.storage import default_storage
+from core import media
+
+def protected_media(request, name):
+    """Uploaded files, after a signature for this user or an ownership/caseload check; the proxy sends the bytes"""
+    if not media.is_servable(name):
+        raise Http404("File not found.")
+    if not request.user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    if not media.has_valid_signature(name, request.GET, request.user) and not media.can_access(request.user, name):
+        # Same answer as a missing file, so names can't be probed
+        raise Http404("File not found.")
+    path = default_storage.path(name)
+    if not os.path.isfile(path):
+        raise Http404("File not found.")
+    return media.serve(request, name, path)
+
+# 🔹 Change Feed (delta sync for web and mobile clients)
+@login_required
+def change_feed(request):
+    """Changes visible to the user after ?since=<seq>; without since, only the cursor to start from"""
+    since = request.GET.get('since')
+    if since is None:
+        # Clients load their pages first, then poll from here
+        return JsonResponse({'changes': [], 'next': changes.latest_seq(), 'more': False})
+    try:
+        since = max(0, int(since))
+    except ValueError:
+        return JsonResponse({'error': "since must be a sequence number."}, status=400)
+    if changes.is_expired(since):
+        return JsonResponse({'error': "Changes since then are no longer kept; reload.",
+                             'next': changes.latest_seq()}, status=410)
+    found, next_seq, more = changes.changes_for(request.user, since)
+    response = JsonResponse({'changes': found, 'next': next_seq, 'more': more},
+                            json_dumps_params={'separators': (',', ':')})
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,246 @@
+import atexit
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from core.models import ExerciseVideo, User, VideoProgress
+
+logger = logging.getLogger(__name__)
+
+# Playback this close to the end restarts the video rather than resuming it
+RESUME_TAIL = 0.95
+FLUSH_FIELDS = ['position_seconds', 'furthest_seconds', 'watched_seconds', 'duration_seconds', 'completed_at',
+                'last_watched_at']
+
+
+class HeartbeatError(ValueError):
+    """A heartbeat the server cannot use (not an object, or bad position, duration or played time)"""
+
+
+# 🔹 Parsing player heartbeats
+def _seconds(heartbeat, name, required=False):
+    value = heartbeat.get(name)
+    if value is None and not required:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+        raise HeartbeatError(f"'{name}' must be a non-negative number of seconds.")
+    return float(value)
+
+
+def parse_heartbeat(heartbeat):
+    """{"position": 312.5, "played": 15.0, "duration": 600.0, "ended": false} → buffer entry
+
+    ``played`` is playback since the previous heartbeat, so seeks add nothing to watch
+    time. It is capped at twice the heartbeat interval: a client cannot claim more.
+    """
+    if not isinstance(heartbeat, dict):
+        raise HeartbeatError("Expected a JSON object.")
+    position = _seconds(heartbeat, 'position', required=True)
+    duration = _seconds(heartbeat, 'duration') or None
+    played = min(_seconds(heartbeat, 'played') or 0.0, 2 * settings.VIDEO_HEARTBEAT_SECONDS)
+    if duration:
+        position = duration if heartbeat.get('ended') is True else min(position, duration)
+    return {'position': position, 'furthest': position, 'played': played, 'duration': duration,
+            'at': timezone.now()}
+
+
+def merge(older, newer):
+    """Two buffered entries for the same patient and video → one"""
+    return {
+        'position': newer['position'],
+        'furthest': max(older['furthest'], newer['furthest']),
+        'played': older['played'] + newer['played'],
+        'duration': newer['duration'] or older['duration'],
+        'at': newer['at'],
+    }
+
+
+def apply(row, entry):
+    """Fold a buffered entry into a VideoProgress row (saved or not)"""
+    row.position_seconds = entry['position']
+    row.furthest_seconds = max(row.furthest_seconds, entry['furthest'])
+    row.watched_seconds += entry['played']
+    row.duration_seconds = entry['duration'] or row.duration_seconds
+    row.last_watched_at = entry['at']
+    # Completion counts playback, not seeking to the end
+    if (row.completed_at is None and row.duration_seconds
+            and row.watched_seconds >= settings.VIDEO_COMPLETION_RATIO * row.duration_seconds):
+        row.completed_at = entry['at']
+    return row
+
+
+# 🔹 In-memory coalescing
+class HeartbeatBuffer:
+    """Latest state per (patient, video) since the last flush
+
+    A player heartbeating every 15 s for an hour becomes one row update per flush
+    interval instead of 240 writes. Heartbeats buffered when a process dies are lost,
+    at most ``max_age`` seconds of them.
+    """
+
+    def __init__(self, max_size, max_age):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.started = time.monotonic()
+
+    def add(self, key, entry):
+        """Buffer an entry; returns True when the buffer is due for a flush"""
+        with self.lock:
+            self.pending[key] = merge(self.pending[key], entry) if key in self.pending else entry
+            return len(self.pending) >= self.max_size or self.is_old()
+
+    def is_old(self):
+        return bool(self.pending) and time.monotonic() - self.started >= self.max_age
+
+    def get(self, key):
+        with self.lock:
+            return self.pending.get(key)
+
+    def drain(self):
+        with self.lock:
+            entries, self.pending = self.pending, {}
+            self.started = time.monotonic()
+        return entries
+
+    def restore(self, entries):
+        """Put back entries a failed flush drained, under anything buffered since"""
+        with self.lock:
+            for key, entry in entries.items():
+                self.pending[key] = merge(entry, self.pending[key]) if key in self.pending else entry
+
+    def __len__(self):
+        return len(self.pending)
+
+
+def write(entries):
+    """Fold buffered entries into VideoProgress in one transaction of five statements, however many there are"""
+    patient_ids = set(User.objects.filter(id__in={p for p, _ in entries}).values_list('id', flat=True))
+    video_ids = set(ExerciseVideo.objects.filter(id__in={v for _, v in entries}).values_list('id', flat=True))
+    # Patients or videos deleted since their heartbeats arrived
+    entries = {(p, v): entry for (p, v), entry in entries.items() if p in patient_ids and v in video_ids}
+    if not entries:
+        return 0
+    with transaction.atomic():
+        VideoProgress.objects.bulk_create([VideoProgress(patient_id=p, video_id=v) for p, v in entries],
+                                          ignore_conflicts=True)
+        rows = VideoProgress.objects.select_for_update().filter(
+            patient_id__in={p for p, _ in entries}, video_id__in={v for _, v in entries})
+        changed = [apply(row, entries[row.patient_id, row.video_id]) for row in rows
+                   if (row.patient_id, row.video_id) in entries]
+        _update(changed)
+    return len(changed)
+
+
+def _update(rows):
+    # One prepared UPDATE run per row: bulk_update's CASE expressions cost more to build than the write
+    fields = [VideoProgress._meta.get_field(name) for name in FLUSH_FIELDS]
+    quote = connection.ops.quote_name
+    sql = (f"UPDATE {quote(VideoProgress._meta.db_table)} SET "
+           + ', '.join(f"{quote(field.column)} = %s" for field in fields)
+           + f" WHERE {quote(VideoProgress._meta.pk.column)} = %s")
+    params = [[field.get_db_prep_value(getattr(row, field.attname), connection) for field in fields] + [row.pk]
+              for row in rows]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+# 🔹 Process-wide buffer and its flusher thread, rebuilt when VIDEO_PROGRESS_* settings change (override_settings)
+_lock = threading.Lock()
+_state = {}
+
+
+def buffer():
+    with _lock:
+        if 'buffer' not in _state:
+            _state['buffer'] = HeartbeatBuffer(settings.VIDEO_PROGRESS_FLUSH_SIZE,
+                                               settings.VIDEO_PROGRESS_FLUSH_SECONDS)
+            _state['stop'] = threading.Event()
+            threading.Thread(target=_flush_when_old, args=(_state['buffer'], _state['stop']),
+                             name='video-progress-flush', daemon=True).start()
+        return _state['buffer']
+
+
+def _flush_when_old(heartbeats, stop):
+    """Flusher thread: writes entries once they are ``max_age`` old, even with no heartbeat arriving to do it"""
+    while not stop.wait(min(heartbeats.max_age, 5)):
+        if heartbeats.is_old():
+            flush()
+            close_old_connections()
+
+
+def flush():
+    """Write everything buffered in this process; on failure the entries stay buffered"""
+    entries = buffer().drain()
+    if not entries:
+        return 0
+    try:
+        return write(entries)
+    except Exception:
+        logger.exception("Flushing %d video progress entries failed; keeping them buffered", len(entries))
+        buffer().restore(entries)
+        return 0
+
+
+def record(patient_id, video_id, entry):
+    """Buffer a parsed heartbeat, flushing this process's buffer when it is due"""
+    if buffer().add((patient_id, video_id), entry):
+        flush()
+
+
+def reset(setting=None, **kwargs):
+    if setting is None or setting.startswith('VIDEO_PROGRESS_'):
+        flush()
+        with _lock:
+            if 'stop' in _state:
+                _state['stop'].set()
+            _state.clear()
+
+
+setting_changed.connect(reset, dispatch_uid='core.watch.reset')
+atexit.register(flush)
+
+
+# 🔹 Reads
+def progress(patient_id, video_id):
+    """The patient's progress on a video, including heartbeats not yet flushed by this process"""
+    row = VideoProgress.objects.filter(patient_id=patient_id, video_id=video_id).first()
+    row = row or VideoProgress(patient_id=patient_id, video_id=video_id)
+    pending = buffer().get((patient_id, video_id))
+    if pending:
+        apply(row, pending)
+    resume_at = row.position_seconds
+    if row.duration_seconds and resume_at >= RESUME_TAIL * row.duration_seconds:
+        resume_at = 0.0
+    return {
+        'position_seconds': row.position_seconds,
+        'resume_at': resume_at,
+        'watched_seconds': round(row.watched_seconds, 1),
+        'duration_seconds': row.duration_seconds,
+        'completed': row.completed_at is not None,
+    }
+
+
+def engagement(video_ids):
+    """video id → viewers, completions, completion rate and average minutes watched, from flushed rows"""
+    rows = (
+        VideoProgress.objects.filter(video_id__in=video_ids).values('video_id')
+        .annotate(viewers=Count('id'), completions=Count('completed_at'), watched=Sum('watched_seconds'))
+    )
+    return {
+        row['video_id']: {
+            'viewers': row['viewers'],
+            'completions': row['completions'],
+            'completion_rate': row['completions'] / row['viewers'],
+            'average_minutes': round(row['watched'] / row['viewers'] / 60, 1),
+        }
+        for row in rows
+    }
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smart_health.settings')
+# Route the I/O-bound endpoints to core/async_views.py (e.g. `uvicorn smart_health.asgi:application`)
+os.environ.setdefault('SMART_HEALTH_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
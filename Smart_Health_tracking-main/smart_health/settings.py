@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -26,11 +27,15 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'core.User'
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.MediaSigningMiddleware',
+    'core.middleware.AdmissionControlMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -39,7 +44,8 @@ ROOT_URLCONF = 'smart_health.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Stock Django templates plus render timing for PerformanceMiddleware
+        'BACKEND': 'core.template_backends.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'core' / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -55,11 +61,183 @@ TEMPLATES = [
 WSGI_APPLICATION = 'smart_health.wsgi.application'
 
 # Database
-DATABASES = {
-    'default': {
+# 🔹 Selected by environment: SMART_HEALTH_DB_ENGINE=sqlite (default) or postgres
+DB_ENGINE = os.environ.get('SMART_HEALTH_DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    _primary = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('SMART_HEALTH_DB_NAME', 'smart_health'),
+        'USER': os.environ.get('SMART_HEALTH_DB_USER', 'smart_health'),
+        'PASSWORD': os.environ.get('SMART_HEALTH_DB_PASSWORD', ''),
+        'HOST': os.environ.get('SMART_HEALTH_DB_HOST', 'localhost'),
+        'PORT': os.environ.get('SMART_HEALTH_DB_PORT', '5432'),
+        # Pooled connections are returned to psycopg's pool, so Django must not keep them
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.environ.get('SMART_HEALTH_DB_POOL_MIN', 2)),
+                'max_size': int(os.environ.get('SMART_HEALTH_DB_POOL_MAX', 10)),
+                'timeout': 10,
+            },
+        },
+    }
+    DATABASES = {'default': _primary}
+    if os.environ.get('SMART_HEALTH_DB_REPLICA_HOST'):
+        DATABASES['replica'] = {
+            **_primary,
+            'HOST': os.environ['SMART_HEALTH_DB_REPLICA_HOST'],
+            'PORT': os.environ.get('SMART_HEALTH_DB_REPLICA_PORT', _primary['PORT']),
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    _primary = {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('SMART_HEALTH_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        # Keep connections open between requests instead of reconnecting every time
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Seconds a writer waits for the lock before "database is locked"
+            'timeout': 20,
+            # Take the write lock at BEGIN so read-then-write transactions wait instead of failing
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
+    DATABASES = {'default': _primary}
+    # A second SQLite file can stand in for a read replica when developing locally
+    if os.environ.get('SMART_HEALTH_SQLITE_REPLICA_PATH'):
+        DATABASES['replica'] = {
+            **_primary,
+            'NAME': os.environ['SMART_HEALTH_SQLITE_REPLICA_PATH'],
+            'TEST': {'MIRROR': 'default'},
+        }
+
+# 🔹 Read replica routing (see core/routers.py)
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+# Read-heavy GET views whose queries may be served by the replica
+REPLICA_READ_VIEWS = [
+    'doctor_dashboard',
+    'therapist_dashboard',
+    'view_patient_profile',
+    'view_exercise_videos',
+]
+# After a write, the same client reads from the primary for this many seconds
+REPLICA_PIN_SECONDS = 5
+
+# 🔹 SQLite tuning, applied to each new connection (see core/db.py)
+SQLITE_PRAGMAS = {
+    'auto_vacuum': 'INCREMENTAL',  # new files only (must precede WAL); see `compact_messages`
+    'journal_mode': 'WAL',        # readers no longer block the writer
+    'synchronous': 'NORMAL',      # safe with WAL, far fewer fsyncs
+    'busy_timeout': 20000,        # ms
+    'cache_size': -20000,         # ~20 MB page cache
+    'mmap_size': 134217728,       # 128 MB memory-mapped reads
+    'temp_store': 'MEMORY',
+}
+
+# 🔹 Performance instrumentation (core/middleware.py, metrics at /metrics/)
+PERF_SLOW_REQUEST_MS = 500
+PERF_QUERY_BUDGET = 30
+# Identical SQL repeated this often within one request is reported as a likely N+1
+PERF_N_PLUS_ONE_REPEATS = 5
+
+# 🔹 Async views (core/async_views.py); asgi.py turns this on for ASGI servers
+ASYNC_VIEWS = os.environ.get('SMART_HEALTH_ASYNC_VIEWS', '') == '1'
+
+# 🔹 Background jobs (core/jobs.py, run workers with `manage.py run_job_worker`)
+# Set SMART_HEALTH_JOBS_EAGER=1 to run jobs inline when no worker is running (development)
+BACKGROUND_JOBS_EAGER = os.environ.get('SMART_HEALTH_JOBS_EAGER', '') == '1'
+
+# 🔹 Hot/cold tiering (core/archive.py, run `manage.py archive_history` daily)
+# Health logs, moods, scores, messages and resolved SOS alerts older than this move to archive tables
+ARCHIVE_HORIZON_DAYS = int(os.environ.get('SMART_HEALTH_ARCHIVE_DAYS', 365))
+ARCHIVE_BATCH_SIZE = 1000
+# Soft-deleted messages are purged this long after deletion (`manage.py compact_messages`)
+MESSAGE_PURGE_DAYS = 30
+
+# 🔹 Change feed (core/changes.py, served at /changes/?since=<seq>)
+CHANGE_FEED_PAGE_SIZE = 500
+# Clients further behind than this get 410 and reload in full (`manage.py prune_changes`)
+CHANGE_FEED_RETENTION_DAYS = 14
+
+# 🔹 Offline task sync (POST /tasks/sync/): events accepted per batch
+TASK_SYNC_MAX_EVENTS = 200
+
+# 🔹 Video watch progress (core/watch.py): players heartbeat every VIDEO_HEARTBEAT_SECONDS; each process
+# buffers them and writes when this many patient/video pairs are pending or the oldest is this old
+VIDEO_HEARTBEAT_SECONDS = 15
+VIDEO_PROGRESS_FLUSH_SIZE = 500
+VIDEO_PROGRESS_FLUSH_SECONDS = 30
+# Share of the video's length actually played for it to count as completed
+VIDEO_COMPLETION_RATIO = 0.9
+
+# 🔹 Nearest-hospital search (core/geo.py): in-memory KD-tree per process, rebuilt when a hospital or location
+# is saved or deleted, and after this many seconds to pick up writes that send no signals
+HOSPITAL_INDEX_MAX_AGE = 3600
+HOSPITAL_NEAREST_MAX = 50
+# Hospitals examined per query at most when the nearest ones are fully booked
+HOSPITAL_CANDIDATES_MAX = 2000
+
+# 🔹 Admission control (core/admission.py, AdmissionControlMiddleware); limits are per worker process
+ADMISSION_ENABLED = os.environ.get('SMART_HEALTH_ADMISSION', '1') == '1'
+# Requests in flight per process; set to the server's worker threads
+ADMISSION_CAPACITY = int(os.environ.get('SMART_HEALTH_ADMISSION_CAPACITY', 32))
+# Slots only the SOS views may use
+ADMISSION_RESERVED = 4
+ADMISSION_CRITICAL_VIEWS = {'send_sos_alert', 'acknowledge_sos_alert', 'resolve_sos_alert'}
+# Shed first: may hold at most this share of the remaining slots
+ADMISSION_LOW_PRIORITY_SHARE = 0.5
+ADMISSION_LOW_PRIORITY_VIEWS = {
+    'message_box', 'change_feed', 'doctor_dashboard', 'therapist_dashboard', 'analytics_dashboard',
+    'view_exercise_videos', 'watch_video', 'protected_media', 'export_patient_record', 'progress_series',
+}
+# Per-view concurrency caps for expensive endpoints
+ADMISSION_ENDPOINT_LIMITS = {
+    'export_patient_record': 2,
+    'analytics_dashboard': 2,
+    'protected_media': 8,
+}
+# Per-user token bucket (per IP when logged out); SOS views are exempt
+ADMISSION_RATE = 10    # requests per second
+ADMISSION_BURST = 40
+ADMISSION_RETRY_AFTER = 2   # seconds
+
+# 🔹 Cache, sessions and auth
+# Local memory by default; set SMART_HEALTH_CACHE_DIR to share one file cache between worker processes
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'smart-health',
+    }
+}
+if os.environ.get('SMART_HEALTH_CACHE_DIR'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['SMART_HEALTH_CACHE_DIR'],
+    }
+# cached_db when the cache is shared between processes (SMART_HEALTH_CACHE_DIR), else plain db
+# (core/sessions.py): with local memory, a logout would only reach the cache of the worker handling it
+SESSION_ENGINE = 'core.sessions'
+# request.user is loaded from the cache (core/auth.py) only when the cache is shared between
+# processes (SMART_HEALTH_CACHE_DIR); with local memory it is read from the database, as a change
+# to a user could not be invalidated in other workers. ModelBackend stays listed so sessions
+# created before the switch still resolve
+AUTHENTICATION_BACKENDS = [
+    'core.auth.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+AUTH_USER_CACHE_SECONDS = 300
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core': {'handlers': ['console'], 'level': 'INFO'},
+    },
 }
 
 # Password validation
@@ -84,5 +262,22 @@ STATICFILES_DIRS = [BASE_DIR / 'core' / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# 🔹 Uploads are stored once per distinct content (core/storage.py); hashes are taken while uploading
+STORAGES = {
+    'default': {'BACKEND': 'core.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+FILE_UPLOAD_HANDLERS = [
+    'core.storage.HashingMemoryFileUploadHandler',
+    'core.storage.HashingTemporaryFileUploadHandler',
+]
+
+# 🔹 Protected media (core/media.py): URLs are signed for the viewing user and stay valid for one to two
+# windows of this many seconds
+MEDIA_URL_MAX_AGE = 3600
+# 'nginx' (X-Accel-Redirect) or 'apache' (X-Sendfile) hands file transfer to the proxy; empty serves from Django
+MEDIA_ACCEL = os.environ.get('SMART_HEALTH_MEDIA_ACCEL', '')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
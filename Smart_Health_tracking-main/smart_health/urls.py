@@ -1,7 +1,5 @@
 from django.contrib import admin
 from django.urls import path, include
-from django.conf import settings
-from django.conf.urls.static import static
 
 urlpatterns = [
     # 🔹 Admin Panel
@@ -11,6 +9,4 @@ urlpatterns = [
     path('', include('core.urls')),
 ]
 
-# 🔹 Serve media files during development (e.g., profile photos)
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Media is served by core.views.protected_media (access-checked), never as static files